@@ -1,13 +1,54 @@
 import os
+from openai import AsyncOpenAI, AsyncAzureOpenAI
 from agno.models.openai import OpenAIChat
 from agno.models.azure import AzureOpenAI
 from agno.memory.v2 import Memory
-from agno.storage.sqlite import SqliteStorage
 from azure.identity import EnvironmentCredential, get_bearer_token_provider
 from dotenv import load_dotenv
+from session_store import get_session_store
+from utils.tracing import instrument_openai
 
 load_dotenv()
 
+# Process-wide resources shared by every agent of every chat session; agents themselves are
+# cheap to construct once these exist, so each session gets its own Team without paying for them
+token_provider = None
+async_client = None
+
+def get_token_provider():
+    global token_provider
+    if token_provider is None:
+        token_provider = get_bearer_token_provider(
+            EnvironmentCredential(), 
+            "https://cognitiveservices.azure.com/.default"
+        )
+    return token_provider
+
+def get_async_client():
+    """Single OpenAI client (and connection pool) behind every chat model"""
+    global async_client
+    if async_client is None:
+        if os.environ.get("LOCAL_MODEL_OVERRIDE", False):
+            async_client = AsyncOpenAI(
+                api_key="localhost",
+                base_url=os.environ.get("LOCAL_MODEL_BASE_URL", "http://localhost:11434/v1")
+            )
+        else:
+            async_client = AsyncAzureOpenAI(
+                azure_ad_token_provider=get_token_provider(),
+                azure_endpoint=os.getenv("OPENAI_ENDPOINT"),
+                api_version=os.getenv("OPENAI_API_VERSION")
+            )
+        # Every completion is timed and its token usage recorded as an "llm" trace span
+        instrument_openai(async_client)
+    return async_client
+
+class SharedClientOpenAIChat(OpenAIChat):
+    """OpenAIChat on the shared client; unlike AzureOpenAI it takes no async_client and builds a new one per call"""
+
+    def get_async_client(self):
+        return get_async_client()
+
 def get_chat_model():
     """Get configured chat model based on environment settings
     
@@ -17,46 +58,36 @@ def get_chat_model():
     local_model_override = os.environ.get("LOCAL_MODEL_OVERRIDE", False)
     
     if local_model_override:
-        return OpenAIChat(
+        return SharedClientOpenAIChat(
             id=local_model_override,
             api_key="localhost",
-            base_url="http://localhost:11434/v1"
+            base_url=os.environ.get("LOCAL_MODEL_BASE_URL", "http://localhost:11434/v1")
         )
     else:
         # Azure OpenAI configuration
-        chat_endpoint = os.getenv("OPENAI_ENDPOINT")
-        model_deployment_name = os.getenv("OPENAI_DEPLOYMENT_NAME")
-        api_version = os.getenv("OPENAI_API_VERSION")
-        provider = get_bearer_token_provider(
-            EnvironmentCredential(), 
-            "https://cognitiveservices.azure.com/.default"
-        )
-        
         return AzureOpenAI(
-            id=model_deployment_name,
-            azure_ad_token_provider=provider,
-            azure_endpoint=chat_endpoint,
-            api_version=api_version
+            id=os.getenv("OPENAI_DEPLOYMENT_NAME"),
+            azure_ad_token_provider=get_token_provider(),
+            azure_endpoint=os.getenv("OPENAI_ENDPOINT"),
+            api_version=os.getenv("OPENAI_API_VERSION"),
+            async_client=get_async_client()
         )
 
 def get_memory_config():
     """Get configured memory for session support
     
     Returns:
-        Memory instance configured for multi-user, multi-session support
+        New Memory instance for one agent of one session; agno keeps every run of every session
+        in a Memory, so a shared one would grow for the life of the process
     """
     return Memory()
 
-def get_storage_config():
+def get_storage_config(mode: str = "agent"):
     """Get configured storage for session persistence
     
+    Args:
+        mode: "agent" for agents, "team" for the orchestration team
     Returns:
-        SqliteStorage instance for persisting sessions
+        Shared session store for the mode (pooled WAL SQLite with batched writes by default)
     """
-    # Create storage directory if it doesn't exist
-    os.makedirs("data", exist_ok=True)
-    
-    return SqliteStorage(
-        table_name="agno_sessions",
-        db_file="data/sessions.db"
-    ) 
\ No newline at end of file
+    return get_session_store(mode)
@@ -2,6 +2,7 @@ from agno.agent import Agent
 from vena_tools import VenaTools
 from chat_service import get_chat_model, get_memory_config, get_storage_config
 from dotenv import load_dotenv
+from utils.structured_output import MemberPrediction
 
 load_dotenv()
 
@@ -17,7 +18,7 @@ def get_member_prediction_agent():
         model=model,
         memory=get_memory_config(),  # Enable conversation memory
         storage=get_storage_config(),  # Enable session persistence
-        tools=[tools.get_top_level_members, tools.get_children_of_member, tools.search_members],
+        tools=[tools.get_top_level_members, tools.get_children_of_member, tools.get_children_of_members, tools.search_members],
         description="A helpful assistant that translates natural language questions into extracted members from a hierarchy in an OLAP cube.",
         instructions="""<task>
         You are a helpful assistant that translates natural language questions into extracted members from a hierarchy in an OLAP cube.
@@ -42,7 +43,7 @@ def get_member_prediction_agent():
         Phase 3: Member Search
         6. If a member looks promising, you can use the search_members(model_id: int, dimension_id: int, query: str) function to search members until you have a list of all relevant members.
         7. If you require more information, the query is unclear or there are no obvious candidates, call the get_top_level_members(model_id: int, dimension_number: int) function to start your search from the root of the dimension hierarchy.
-        8. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member.
+        8. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member. To expand several members (or several levels) at once, call get_children_of_members(model_id: int, dimension_number: int, member_ids: list[str], depth: int) instead of one call per member.
         9. TERMINATION CONDITIONS: Stop searching when you have:
            - Found at least 1 relevant member per dimension needed for the query, OR
            - Exhausted 5 tool calls per dimension, OR  
@@ -51,21 +52,11 @@ def get_member_prediction_agent():
         </instructions>
         
         <format>
-        You should return a list of members in the following format:
-        [
-            {
-                "dimension": <dimension name>,
-                "members": [
-                    {
-                        "name": <member name>,
-                        "alias": <member alias>
-                    },
-                    ...
-                ]
-            }
-        ]
+        Return the structured member prediction: the model id and name, every predicted member with its dimension, name and alias exactly as the tools returned them, and a clarification question only if you cannot proceed without one.
         </format>
         """,
+        # Schema-constrained output the team leader passes on without re-reading prose
+        response_model=MemberPrediction,
+        structured_outputs=True,
         add_history_to_messages=True,  # Include conversation history in context
-        markdown=True
     ) 
\ No newline at end of file
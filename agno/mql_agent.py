@@ -16,7 +16,7 @@ def get_mql_agent():
         model=model,
         memory=get_memory_config(),  # Enable conversation memory
         storage=get_storage_config(),  # Enable session persistence
-        tools=[tools.list_models, tools.get_model_info],
+        tools=[tools.list_models, tools.get_model_info, tools.evaluate_mql],
         description="A helpful assistant that generates Vena Model Query Language (MQL) based on member information from OLAP cubes.",
         instructions="""<task>
         You are a helpful assistant that generates Vena Model Query Language (MQL) based on member information from OLAP cubes.
@@ -43,7 +43,7 @@ def get_mql_agent():
         Phase 3: Validation & Completion
         8. Review the generated MQL for syntax errors
         9. Ensure all referenced members and dimensions are valid
-        10. Provide clear explanations of what the MQL will return
+        10. Provide clear explanations of what the MQL will return, using evaluate_mql to report how many members it selects per dimension
         11. ALWAYS provide final MQL output even if member information is incomplete - generate best-effort query
         </instructions>
         
@@ -23,7 +23,7 @@ def get_orchestration_team():
         mode="coordinate",  # Team leader delegates tasks and synthesizes outputs
         model=get_chat_model(),
         memory=get_memory_config(),  # Enable conversation memory
-        storage=get_storage_config(),  # Enable session persistence
+        storage=get_storage_config("team"),  # Enable session persistence
         tools=[tools.list_models, tools.get_model_info],
         members=[model_selection_agent, member_prediction_agent, mql_agent],
         description="A team of specialists that help analyze OLAP cube data for answering financial questions.",
@@ -1,7 +1,32 @@
+import asyncio
 import chainlit as cl
 import uuid
 from agno.team import Team
 from orchestration_team import get_orchestration_team
+from session_store import close_session_store, compact_sessions
+from utils.async_vena_client import close_async_client
+from utils.prefetch import stop_prefetch
+from utils.snapshot_store import load_snapshots, start_snapshot_reload, stop_snapshot_reload
+from utils.tracing import close_tracer, print_trace_stats, traced
+
+@cl.on_app_startup
+async def on_app_startup():
+    """Memory-map stored hierarchy snapshots so member lookups are served locally from the first turn"""
+    load_snapshots()
+    # Snapshots refreshed later by the CLI replace the loaded ones without a restart
+    start_snapshot_reload()
+    # Drop sessions past the retention period before the first chat opens the store
+    await asyncio.to_thread(compact_sessions)
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Flush session writes still waiting for the next batch, and report where the time went per stage"""
+    await asyncio.to_thread(close_session_store)
+    await stop_snapshot_reload()
+    await stop_prefetch()
+    await close_async_client()
+    print_trace_stats()
+    close_tracer()
 
 @cl.set_starters
 async def set_starters():
@@ -36,6 +61,7 @@ async def on_chat_start():
     cl.user_session.set("session_id", session_id)
 
 @cl.on_message
+@traced("turn", "agno")
 async def on_message(message: cl.Message):
     """Handle incoming messages and process them through the financial planning team with session context"""
     team: Team = cl.user_session.get("team")
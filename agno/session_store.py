@@ -0,0 +1,425 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from agno.storage.base import Storage
+from agno.storage.session.agent import AgentSession
+from agno.storage.session.team import TeamSession
+from agno.storage.session.workflow import WorkflowSession
+
+SESSION_CLASSES = {
+    "agent": AgentSession,
+    "team": TeamSession,
+    "workflow": WorkflowSession
+}
+ENTITY_FIELDS = {
+    "agent": "agent_id",
+    "team": "team_id",
+    "workflow": "workflow_id"
+}
+
+def session_class(mode: str):
+    return SESSION_CLASSES.get(mode, AgentSession)
+
+def entity_field(mode: str) -> str:
+    return ENTITY_FIELDS.get(mode, "agent_id")
+
+class ConnectionPool:
+    """Fixed set of SQLite connections in WAL mode, shared by every store on the same file
+
+    WAL lets readers proceed while a write is in progress, and reusing connections avoids
+    reopening the database (and re-reading its schema) on every session write.
+    """
+
+    def __init__(self, db_file: str, size: int = 4):
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_file = db_file
+        self.size = size
+        self.connections = queue.Queue()
+        for _ in range(size):
+            self.connections.put(self.connect())
+
+    def connect(self) -> sqlite3.Connection:
+        # Autocommit mode; writes open their own BEGIN IMMEDIATE transaction
+        connection = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=30000")
+        return connection
+
+    @contextmanager
+    def connection(self):
+        connection = self.connections.get()
+        try:
+            yield connection
+        finally:
+            self.connections.put(connection)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get().close()
+
+class SqliteSessionStore(Storage):
+    """agno storage backend on a pooled WAL SQLite file, with batched upserts
+
+    Sessions of every mode share one table keyed by (mode, session_id), and are stored as
+    the JSON of agno's own session objects so reads round-trip through from_dict.
+    """
+
+    def __init__(self, pool: ConnectionPool, table_name: str = "agno_session_store", mode: str = "agent"):
+        super().__init__(mode)
+        self.pool = pool
+        self.table_name = table_name
+        self.create()
+
+    def create(self) -> None:
+        with self.pool.transaction() as connection:
+            connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    mode TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    user_id TEXT,
+                    entity_id TEXT,
+                    data TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    updated_at INTEGER NOT NULL,
+                    PRIMARY KEY (mode, session_id)
+                )
+            """)
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_user ON {self.table_name} (mode, user_id, updated_at)")
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_updated ON {self.table_name} (updated_at)")
+
+    def to_row(self, session) -> Tuple:
+        now = int(time.time())
+        data = session.to_dict()
+        return (
+            self.mode,
+            session.session_id,
+            session.user_id,
+            data.get(entity_field(self.mode)),
+            json.dumps(data, default=str),
+            data.get("created_at") or now,
+            now
+        )
+
+    def to_session(self, data: str):
+        return session_class(self.mode).from_dict(json.loads(data))
+
+    def query(self, where: str, parameters: List, limit: int = None) -> List:
+        sql = f"SELECT data FROM {self.table_name} WHERE mode = ?{where} ORDER BY updated_at DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self.pool.connection() as connection:
+            rows = connection.execute(sql, [self.mode, *parameters]).fetchall()
+        return [self.to_session(row[0]) for row in rows]
+
+    def filters(self, user_id: Optional[str], entity_id: Optional[str]) -> Tuple[str, List]:
+        where, parameters = "", []
+        if user_id is not None:
+            where += " AND user_id = ?"
+            parameters.append(user_id)
+        if entity_id is not None:
+            where += " AND entity_id = ?"
+            parameters.append(entity_id)
+        return where, parameters
+
+    def read(self, session_id: str, user_id: Optional[str] = None):
+        where, parameters = self.filters(user_id, None)
+        sessions = self.query(" AND session_id = ?" + where, [session_id, *parameters])
+        return sessions[0] if sessions else None
+
+    def get_all_session_ids(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[str]:
+        return [session.session_id for session in self.get_all_sessions(user_id, entity_id)]
+
+    def get_all_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List:
+        return self.query(*self.filters(user_id, entity_id))
+
+    def get_recent_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None, limit: Optional[int] = 2) -> List:
+        return self.query(*self.filters(user_id, entity_id), limit=limit)
+
+    def upsert(self, session, create_and_retry: bool = True):
+        self.upsert_many([self.to_row(session)])
+        return session
+
+    def upsert_many(self, rows: List[Tuple]):
+        """Write many sessions in a single transaction; created_at survives updates"""
+        with self.pool.transaction() as connection:
+            connection.executemany(f"""
+                INSERT INTO {self.table_name} (mode, session_id, user_id, entity_id, data, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (mode, session_id) DO UPDATE SET
+                    user_id = excluded.user_id,
+                    entity_id = excluded.entity_id,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+            """, rows)
+
+    def delete_session(self, session_id: Optional[str] = None):
+        if session_id is None:
+            return
+        with self.pool.transaction() as connection:
+            connection.execute(f"DELETE FROM {self.table_name} WHERE mode = ? AND session_id = ?", (self.mode, session_id))
+
+    def drop(self) -> None:
+        with self.pool.transaction() as connection:
+            connection.execute(f"DROP TABLE IF EXISTS {self.table_name}")
+
+    def upgrade_schema(self) -> None:
+        pass
+
+    def compact(self, max_age_seconds: float) -> int:
+        """Delete sessions of every mode idle for longer than max_age_seconds and shrink the WAL"""
+        cutoff = int(time.time() - max_age_seconds)
+        with self.pool.transaction() as connection:
+            deleted = connection.execute(f"DELETE FROM {self.table_name} WHERE updated_at < ?", (cutoff,)).rowcount
+        with self.pool.connection() as connection:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if deleted:
+                connection.execute("PRAGMA optimize")
+        return deleted
+
+class SessionWriter:
+    """Background writer that coalesces session upserts and flushes them in batches
+
+    A session written several times between flushes (the team and its members each save
+    after every run) costs one row write, and the agents' event loop never waits on disk.
+    """
+
+    def __init__(self, interval: float = 0.2, batch_size: int = 100):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending: Dict[Tuple[int, str], Tuple] = {}
+        self.wakeup = threading.Event()
+        # Serializes flushes so an older snapshot of a session never overwrites a newer one
+        self.flush_lock = threading.Lock()
+        self.writes = 0
+        self.flushes = 0
+        self.errors = 0
+        self.thread = None
+        self.stopped = False
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="agno-session-writer", daemon=True)
+                self.thread.start()
+
+    def submit(self, store: "BatchedSessionStore", session_id: str, item):
+        self.start()
+        with self.lock:
+            self.pending[(id(store), session_id)] = (store, session_id, item)
+            self.writes += 1
+            full = len(self.pending) >= self.batch_size
+        if self.stopped:
+            self.flush()
+        elif full:
+            self.wakeup.set()
+
+    def lookup(self, store: "BatchedSessionStore", session_id: str):
+        with self.lock:
+            entry = self.pending.get((id(store), session_id))
+        return entry[2] if entry is not None else None
+
+    def run(self):
+        while not self.stopped:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            self.write_pending()
+
+    def write_pending(self):
+        with self.lock:
+            batch = list(self.pending.values())
+        if not batch:
+            return
+        # Group by target store so SQLite gets one transaction per store
+        groups: Dict[int, List] = {}
+        for store, session_id, item in batch:
+            groups.setdefault(id(store), []).append((store, session_id, item))
+        for entries in groups.values():
+            store = entries[0][0]
+            try:
+                store.write(entries)
+            except Exception as e:
+                self.errors += 1
+                print(f"Session write failed for {len(entries)} sessions: {e}")
+                continue
+            with self.lock:
+                # Drop only what was written; sessions updated meanwhile stay pending
+                for store, session_id, item in entries:
+                    if self.pending.get((id(store), session_id), (None, None, None))[2] is item:
+                        del self.pending[(id(store), session_id)]
+        with self.lock:
+            self.flushes += 1
+
+    def close(self):
+        self.stopped = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"writes": self.writes, "flushes": self.flushes, "pending": len(self.pending), "errors": self.errors}
+
+class BatchedSessionStore(Storage):
+    """Write-behind wrapper around any agno storage
+
+    Upserts return immediately and are written by the shared SessionWriter; reads see
+    pending sessions first, and listing methods flush so they never miss a session.
+    """
+
+    def __init__(self, inner: Storage, writer: SessionWriter):
+        super().__init__(inner.mode)
+        self.inner = inner
+        self.writer = writer
+
+    @property
+    def mode(self):
+        return self.inner.mode
+
+    @mode.setter
+    def mode(self, value):
+        # agno sets the mode on the storage it is given, pass it through to the backend
+        if hasattr(self, "inner"):
+            self.inner.mode = value
+        else:
+            self._mode = value
+
+    def write(self, entries: List):
+        if isinstance(self.inner, SqliteSessionStore):
+            self.inner.upsert_many([row for _, _, (_, row) in entries])
+        else:
+            for _, _, (session, _) in entries:
+                self.inner.upsert(session)
+
+    def create(self) -> None:
+        self.inner.create()
+
+    def read(self, session_id: str, user_id: Optional[str] = None):
+        pending = self.writer.lookup(self, session_id)
+        if pending is not None:
+            session, row = pending
+            if user_id is None or session.user_id == user_id:
+                # Hand out a copy, as a read from the database would
+                return self.inner.to_session(row[4]) if row is not None else session
+        return self.inner.read(session_id, user_id)
+
+    def get_all_session_ids(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List[str]:
+        self.writer.flush()
+        return self.inner.get_all_session_ids(user_id, entity_id)
+
+    def get_all_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None) -> List:
+        self.writer.flush()
+        return self.inner.get_all_sessions(user_id, entity_id)
+
+    def get_recent_sessions(self, user_id: Optional[str] = None, entity_id: Optional[str] = None, limit: Optional[int] = 2) -> List:
+        self.writer.flush()
+        return self.inner.get_recent_sessions(user_id, entity_id, limit)
+
+    def upsert(self, session, create_and_retry: bool = True):
+        # Serialize now: agno keeps mutating the session object after the call returns
+        row = self.inner.to_row(session) if isinstance(self.inner, SqliteSessionStore) else None
+        self.writer.submit(self, session.session_id, (session, row))
+        return session
+
+    def delete_session(self, session_id: Optional[str] = None):
+        self.writer.flush()
+        self.inner.delete_session(session_id)
+
+    def drop(self) -> None:
+        self.writer.flush()
+        self.inner.drop()
+
+    def upgrade_schema(self) -> None:
+        self.inner.upgrade_schema()
+
+def get_session_db() -> str:
+    return os.environ.get("AGNO_SESSION_DB", os.path.join("data", "sessions.db"))
+
+def get_flush_interval() -> float:
+    """Seconds between batched session writes, 0 writes through on every upsert"""
+    return float(os.environ.get("AGNO_SESSION_FLUSH_INTERVAL", 0.2))
+
+def get_retention_days() -> float:
+    return float(os.environ.get("AGNO_SESSION_RETENTION_DAYS", 30))
+
+# One pool, writer and store per mode for the whole process
+pool = None
+writer = None
+stores = {}
+stores_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global pool
+    if pool is None:
+        pool = ConnectionPool(get_session_db(), int(os.environ.get("AGNO_SESSION_POOL_SIZE", 4)))
+    return pool
+
+def get_writer() -> SessionWriter:
+    global writer
+    if writer is None:
+        writer = SessionWriter(get_flush_interval(), int(os.environ.get("AGNO_SESSION_BATCH_SIZE", 100)))
+        atexit.register(writer.close)
+    return writer
+
+def create_backend(mode: str) -> Storage:
+    """SQLite by default; AGNO_SESSION_DB_URL switches to a local PostgreSQL server"""
+    db_url = os.environ.get("AGNO_SESSION_DB_URL")
+    if not db_url:
+        return SqliteSessionStore(get_pool(), mode=mode)
+    if not db_url.startswith("postgresql"):
+        raise Exception(f"Unsupported session database URL: {db_url} (expected postgresql://...)")
+    from agno.storage.postgres import PostgresStorage
+    # agno's table schema depends on the mode, so each mode gets its own table
+    return PostgresStorage(table_name=f"agno_sessions_{mode}", db_url=db_url, mode=mode)
+
+def get_session_store(mode: str = "agent") -> Storage:
+    """Shared session storage for one agno mode ("agent", "team" or "workflow")
+
+    Agents and teams set storage.mode on the instance they are given, so sharing one
+    instance between them would flip its mode mid-run; each mode gets its own store.
+    """
+    with stores_lock:
+        if mode not in stores:
+            backend = create_backend(mode)
+            stores[mode] = BatchedSessionStore(backend, get_writer()) if get_flush_interval() > 0 else backend
+        return stores[mode]
+
+def compact_sessions(max_age_days: float = None) -> int:
+    """Delete sessions idle for longer than the retention period (SQLite backend only)"""
+    max_age_days = get_retention_days() if max_age_days is None else max_age_days
+    if max_age_days <= 0 or os.environ.get("AGNO_SESSION_DB_URL"):
+        return 0
+    get_writer().flush()
+    deleted = SqliteSessionStore(get_pool()).compact(max_age_days * 86400)
+    if deleted:
+        print(f"Compacted {deleted} agno sessions older than {max_age_days:g} days")
+    return deleted
+
+def close_session_store():
+    if writer is not None:
+        writer.close()
@@ -1,10 +1,18 @@
 from typing import List, Dict, Any
-from utils import vena_client as vc
+from utils.async_vena_client import get_async_client
+from utils.prefetch import start_prefetch
+from utils.tracing import traced
+from utils.context_packing import compact, pack_members, pack_model, pack_models, pack_search_results, pack_subtree
 
 class VenaTools:
-    """Tools for querying and searching Vena model information"""
+    """Tools for querying and searching Vena model information
 
-    def get_model_info(self, id: int, model_name: str) -> str:
+    The tools are coroutines on the shared async Vena client, so agno awaits them on the
+    event loop instead of blocking it while Vena responds.
+    """
+
+    @traced("tool")
+    async def get_model_info(self, id: int, model_name: str) -> str:
         """Get information about a specific model by its ID
         
         Args:
@@ -13,17 +21,22 @@ class VenaTools:
         Returns:
             JSON string containing model dimension information
         """
-        return str(vc.get_model(id, model_name))
+        model = await get_async_client().get_model(id, model_name)
+        # Looking at a model usually means it was picked: its likely dimensions load while the agent decides
+        start_prefetch(id, model_name)
+        return pack_model(model)
 
-    def list_models(self) -> str:
+    @traced("tool")
+    async def list_models(self) -> str:
         """List all available models with their basic information
         
         Returns:
             JSON string containing list of models with id, name, and description
         """
-        return str(vc.list_models())
+        return pack_models(await get_async_client().list_models())
     
-    def get_top_level_members(self, model_id: int, dimension_number: int) -> str:
+    @traced("tool")
+    async def get_top_level_members(self, model_id: int, dimension_number: int) -> str:
         """Fetch top-level members from a dimension
         
         Args:
@@ -33,9 +46,10 @@ class VenaTools:
         Returns:
             JSON string containing list of top-level members with id, name, alias, and numChildren
         """
-        return str(vc.get_children_of_member(model_id, dimension_number, "root"))
+        return pack_members(await get_async_client().get_children_of_member(model_id, dimension_number, "root"))
     
-    def get_children_of_member(self, model_id: int, dimension_number: int, member_id: str) -> str:
+    @traced("tool")
+    async def get_children_of_member(self, model_id: int, dimension_number: int, member_id: str) -> str:
         """Fetch child members of a member from a dimension
         
         Args:
@@ -46,9 +60,25 @@ class VenaTools:
         Returns:
             JSON string containing list of child members with id, name, alias, and numChildren
         """
-        return str(vc.get_children_of_member(model_id, dimension_number, member_id))
+        return pack_members(await get_async_client().get_children_of_member(model_id, dimension_number, member_id))
+    
+    @traced("tool")
+    async def get_children_of_members(self, model_id: int, dimension_number: int, member_ids: List[str], depth: int = 1) -> str:
+        """Fetch the children of several members at once, optionally several levels deep
+        
+        Args:
+            model_id: The model ID
+            dimension_number: The dimension number
+            member_ids: The parent member IDs
+            depth: How many levels below each member to return (default 1)
+            
+        Returns:
+            JSON string containing rows of parent, id, name, alias, and numChildren
+        """
+        return pack_subtree(await get_async_client().get_children_of_members(model_id, dimension_number, member_ids, depth))
     
-    def search_members(self, model_id: int, dimension_id: int, query: str) -> str:
+    @traced("tool")
+    async def search_members(self, model_id: int, dimension_id: int, query: str) -> str:
         """Search for members in a model given model ID, dimension ID, and a search query
         
         Args:
@@ -59,4 +89,17 @@ class VenaTools:
         Returns:
             JSON string containing search results
         """
-        return str(vc.search_members(model_id, dimension_id, query)) 
\ No newline at end of file
+        return pack_search_results(await get_async_client().search_members(model_id, dimension_id, query))
+
+    @traced("tool")
+    async def evaluate_mql(self, model_id: int, mql: str) -> str:
+        """Count the members an MQL query selects in each dimension, using the local hierarchy
+        
+        Args:
+            model_id: The model ID
+            mql: The MQL expression
+            
+        Returns:
+            JSON string containing the member count and example members per dimension
+        """
+        return compact(await get_async_client().evaluate_mql(model_id, mql))
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""Sessions per second of agno session storage backends under concurrent chat sessions
+
+Each worker thread plays one chat session: every turn reads the team session, then the
+team and its three member agents each save their session, as agno does after a run.
+
+    python benchmarks/agno_session_store.py --workers 32 --turns 20
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agno"))
+
+from agno.storage.session.agent import AgentSession
+from agno.storage.session.team import TeamSession
+from session_store import BatchedSessionStore, ConnectionPool, SessionWriter, SqliteSessionStore
+
+AGENTS = ["ModelSelectionAgent", "MemberPredictionAgent", "ModelQueryLanguageAgent"]
+
+def agno_sqlite(directory: str, args):
+    """agno's own SqliteStorage, one instance per mode as chat_service used to create"""
+    from agno.storage.sqlite import SqliteStorage
+    db_file = os.path.join(directory, "sessions.db")
+    return (
+        SqliteStorage(table_name="agno_team_sessions", db_file=db_file, mode="team"),
+        SqliteStorage(table_name="agno_agent_sessions", db_file=db_file, mode="agent"),
+        None
+    )
+
+def pooled(directory: str, args):
+    pool = ConnectionPool(os.path.join(directory, "sessions.db"), args.pool_size)
+    return SqliteSessionStore(pool, mode="team"), SqliteSessionStore(pool, mode="agent"), None
+
+def batched(directory: str, args):
+    pool = ConnectionPool(os.path.join(directory, "sessions.db"), args.pool_size)
+    writer = SessionWriter(args.flush_interval, args.batch_size)
+    return (
+        BatchedSessionStore(SqliteSessionStore(pool, mode="team"), writer),
+        BatchedSessionStore(SqliteSessionStore(pool, mode="agent"), writer),
+        writer
+    )
+
+BACKENDS = {"agno-sqlite": agno_sqlite, "pooled": pooled, "batched": batched}
+
+def run_payload(turn: int, size: int) -> dict:
+    return {"runs": [{"message": f"turn {i}", "content": "x" * size} for i in range(turn + 1)]}
+
+def chat_session(team_store, agent_store, turns: int, size: int) -> list:
+    user_id = f"user_{uuid.uuid4().hex[:8]}"
+    session_id = f"session_{uuid.uuid4().hex[:8]}"
+    latencies = []
+    for turn in range(turns):
+        started = time.perf_counter()
+        team_store.read(session_id, user_id)
+        memory = run_payload(turn, size)
+        team_store.upsert(TeamSession.from_dict({
+            "session_id": session_id, "team_id": "orchestration", "user_id": user_id, "memory": memory
+        }))
+        for agent in AGENTS:
+            # One row per member agent, as each agent saves its own session
+            agent_store.upsert(AgentSession.from_dict({
+                "session_id": f"{session_id}_{agent}", "agent_id": agent, "user_id": user_id, "memory": memory
+            }))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def benchmark(name: str, args) -> dict:
+    directory = tempfile.mkdtemp(prefix="agno-sessions-")
+    try:
+        team_store, agent_store, writer = BACKENDS[name](directory, args)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.workers) as executor:
+            results = list(executor.map(
+                lambda _: chat_session(team_store, agent_store, args.turns, args.payload),
+                range(args.workers)
+            ))
+        if writer is not None:
+            # Count the time to get every pending write on disk
+            writer.close()
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for result in results for latency in result)
+        writes = args.workers * args.turns * (1 + len(AGENTS))
+        return {
+            "backend": name,
+            "seconds": elapsed,
+            "sessions_per_second": writes / elapsed,
+            "turns_per_second": args.workers * args.turns / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            "stored": len(team_store.get_all_sessions()) + len(agent_store.get_all_sessions())
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=32, help="concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=20, help="turns per chat session")
+    parser.add_argument("--payload", type=int, default=500, help="characters per run in the session memory")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma separated: " + ", ".join(BACKENDS))
+    args = parser.parse_args()
+
+    print(f"{args.workers} concurrent sessions x {args.turns} turns, {1 + len(AGENTS)} session writes per turn")
+    print(f"{'backend':<12} {'seconds':>8} {'sessions/s':>11} {'turns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'stored':>7}")
+    for name in args.backends.split(","):
+        result = benchmark(name.strip(), args)
+        print(f"{result['backend']:<12} {result['seconds']:>8.2f} {result['sessions_per_second']:>11.0f} "
+              f"{result['turns_per_second']:>9.0f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['stored']:>7}")
+
+if __name__ == "__main__":
+    main()
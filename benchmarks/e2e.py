@@ -0,0 +1,125 @@
+"""End-to-end latency, model calls, tool calls and tokens per question of every pipeline
+
+Starts a fake Vena API over synthetic models and a scripted OpenAI-compatible model, then
+asks the question corpus through each framework (one process each, see pipelines.py) so
+the pipelines can be compared, and optimizations measured, without Vena or a real model.
+
+    python benchmarks/e2e.py --pipelines langgraph,agno --repeat 3 --llm-latency 0.5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from fake_llm import start_fake_llm
+from fake_vena import start_fake_vena
+from pipelines import PIPELINES
+from synthetic import SyntheticCatalog
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[max(int(round(len(values) * fraction)) - 1, 0)]
+
+def pipeline_environment(vena, llm, directory: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "VENA_ENDPOINT": vena.url,
+        "VENA_USER": "benchmark",
+        "VENA_KEY": "benchmark",
+        "LOCAL_MODEL_OVERRIDE": "fake",
+        "LOCAL_MODEL_BASE_URL": f"{llm.url}/v1",
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_AGENTS_DISABLE_TRACING": "1",
+        # Measure the pipelines themselves, not background warming or state from earlier runs
+        "VENA_PREWARM": "0",
+        "VENA_DATA_DIR": os.path.join(directory, "snapshots"),
+        "AGNO_SESSION_DB": os.path.join(directory, "sessions.db"),
+        # Keep Chainlit from writing its default config into the framework's directory
+        "CHAINLIT_APP_ROOT": directory
+    })
+    return env
+
+def run_pipeline(name: str, args, vena, llm) -> list:
+    directory = tempfile.mkdtemp(prefix=f"e2e-{name}-")
+    try:
+        output = os.path.join(directory, "results.jsonl")
+        command = [
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipelines.py"), name,
+            "--vena-url", vena.url, "--llm-url", llm.url, "--repeat", str(args.repeat), "--output", output
+        ]
+        completed = subprocess.run(command, env=pipeline_environment(vena, llm, directory), timeout=args.timeout)
+        if completed.returncode != 0 or not os.path.exists(output):
+            print(f"{name}: pipeline process exited with {completed.returncode}")
+            return []
+        with open(output) as results:
+            return [json.loads(line) for line in results if line.strip()]
+    except subprocess.TimeoutExpired:
+        print(f"{name}: no result within {args.timeout}s")
+        return []
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def summarize(name: str, results: list) -> dict:
+    if not results:
+        return {"pipeline": name, "questions": 0}
+    seconds = [result["seconds"] for result in results]
+
+    def mean(key):
+        return statistics.mean(result[key] for result in results)
+
+    return {
+        "pipeline": name,
+        "questions": len(results),
+        "errors": sum(1 for result in results if result["error"]),
+        "answered": sum(1 for result in results if result["answered"]),
+        "members": mean("members"),
+        "p50_s": statistics.median(seconds),
+        "p95_s": percentile(seconds, 0.95),
+        "llm_calls": mean("llm_calls"),
+        "tool_calls": mean("tool_calls"),
+        "vena_requests": mean("vena_requests"),
+        "prompt_tokens": mean("prompt_tokens"),
+        "completion_tokens": mean("completion_tokens")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help="comma separated: " + ", ".join(PIPELINES))
+    parser.add_argument("--repeat", type=int, default=1, help="times the corpus is asked per pipeline")
+    parser.add_argument("--models", type=int, default=2)
+    parser.add_argument("--members", type=int, default=1000, help="members per dimension")
+    parser.add_argument("--vena-latency", type=float, default=0.05, help="seconds added to every Vena request")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="generation speed, 0 for instant")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds allowed per pipeline")
+    parser.add_argument("--json", help="also write every question's result to this JSON lines file")
+    args = parser.parse_args()
+
+    vena = start_fake_vena(models=args.models, members=args.members, latency=args.vena_latency)
+    llm = start_fake_llm(SyntheticCatalog(args.models, members_per_dimension=0), latency=args.llm_latency, tokens_per_second=args.tokens_per_second)
+    print(f"Fake Vena API on {vena.url}, fake model on {llm.url}/v1")
+
+    results = {name.strip(): run_pipeline(name.strip(), args, vena, llm) for name in args.pipelines.split(",")}
+    if args.json:
+        with open(args.json, "w") as output:
+            for result in (result for pipeline in results.values() for result in pipeline):
+                output.write(json.dumps(result) + "\n")
+
+    print(f"{'pipeline':<16} {'questions':>9} {'errors':>6} {'answered':>8} {'members':>7} {'p50 s':>7} {'p95 s':>7} "
+          f"{'llm calls':>9} {'tool calls':>10} {'vena reqs':>9} {'prompt tok':>10} {'compl tok':>9}")
+    for name, pipeline in results.items():
+        summary = summarize(name, pipeline)
+        if not summary["questions"]:
+            print(f"{name:<16} {0:>9}")
+            continue
+        print(f"{name:<16} {summary['questions']:>9} {summary['errors']:>6} {summary['answered']:>8} {summary['members']:>7.0%} "
+              f"{summary['p50_s']:>7.2f} {summary['p95_s']:>7.2f} {summary['llm_calls']:>9.1f} {summary['tool_calls']:>10.1f} "
+              f"{summary['vena_requests']:>9.1f} {summary['prompt_tokens']:>10.0f} {summary['completion_tokens']:>9.0f}")
+    print("answered: answers with the question's MQL, members: share of its members named (openai-agents stops at the members)")
+    print("llm calls, tool calls, vena requests and tokens are per question")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Scripted OpenAI-compatible chat completions endpoint for benchmarks
+
+It answers the question corpus deterministically: while the request offers tools it has
+not called yet since the last user message (models, model info, member search, delegation
+to member prediction and MQL agents, MQL evaluation) it calls them in that order, then
+answers with the corpus members and MQL, as JSON when a response schema is requested.
+
+    python benchmarks/fake_llm.py --port 8082 --latency 0.3
+    LOCAL_MODEL_OVERRIDE=fake LOCAL_MODEL_BASE_URL=http://127.0.0.1:8082/v1 chainlit run server.py
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from fake_server import FakeHandler, start_server
+from synthetic import SyntheticCatalog, get_corpus
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.context_packing import count_tokens
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MEMBER_ID_PATTERN = re.compile(r"ID:\s*([\w-]+)")
+
+def content_text(message: dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+def compact_name(name: str) -> str:
+    return name.replace("_", "").replace("-", "").lower()
+
+class ScriptedModel:
+    """Decides each completion from the corpus question the conversation is about"""
+
+    def __init__(self, catalog: SyntheticCatalog, corpus: List[dict]):
+        self.catalog = catalog
+        self.corpus = corpus
+
+    def find_entry(self, messages: List[dict]) -> dict:
+        users = [content_text(message) for message in messages if message.get("role") == "user"]
+        for text in reversed(users):
+            for entry in self.corpus:
+                if entry["question"].lower() in text.lower():
+                    return entry
+        # Delegated tasks may rephrase the question, fall back to the closest one by shared words
+        words = set(WORD_PATTERN.findall((users[-1] if users else "").lower()))
+        return max(self.corpus, key=lambda entry: len(words & set(WORD_PATTERN.findall(entry["question"].lower()))))
+
+    def step_of(self, name: str, arguments: dict) -> Optional[str]:
+        """Which scripted step a tool call is, None for tools the script never calls"""
+        plain = compact_name(name)
+        if plain.endswith("transfertasktomember"):
+            member = compact_name(str(arguments.get("member_id", "")))
+            return "mql" if "mql" in member or "query" in member else "member_prediction" if "prediction" in member else None
+        if plain.endswith("listmodels"):
+            return "list_models"
+        if plain.endswith("getmodelinfo"):
+            return "get_model_info"
+        if plain.endswith("searchmembers"):
+            return "search_members"
+        if "memberprediction" in plain:
+            return "member_prediction"
+        if plain.endswith("evaluatemql") or plain.endswith("validatemql"):
+            return "evaluate_mql"
+        if "mql" in plain:
+            return "mql"
+        return None
+
+    def respond(self, request: dict) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        entry = self.find_entry(messages)
+        tools = [tool["function"] for tool in request.get("tools") or [] if tool.get("type") == "function"]
+
+        last_user = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=-1)
+        done = set()
+        for message in messages[last_user + 1:]:
+            for call in message.get("tool_calls") or []:
+                try:
+                    arguments = json.loads(call["function"].get("arguments") or "{}")
+                except ValueError:
+                    arguments = {}
+                done.add(self.step_of(call["function"]["name"], arguments))
+
+        system = " ".join(content_text(message) for message in messages if message.get("role") in ("system", "developer"))
+        for step in ("list_models", "get_model_info", "search_members", "member_prediction", "mql", "evaluate_mql"):
+            if step in done:
+                continue
+            calls = self.tool_calls(step, tools, entry, system)
+            if calls:
+                return {"content": None, "tool_calls": calls}
+
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"].get("schema", {})
+            return {"content": json.dumps(self.instance(schema, entry, schema)), "tool_calls": []}
+        return {"content": self.answer(entry, system), "tool_calls": []}
+
+    def tool_calls(self, step: str, tools: List[dict], entry: dict, system: str) -> List[dict]:
+        for tool in tools:
+            name = tool["name"]
+            if compact_name(name).endswith("transfertasktomember"):
+                # agno teams delegate through one tool; its system prompt lists the member ids
+                wanted = ("mql", "query") if step == "mql" else ("prediction",) if step == "member_prediction" else ()
+                member_id = next((found for found in MEMBER_ID_PATTERN.findall(system) if any(word in found.lower() for word in wanted)), None)
+                if member_id is None:
+                    continue
+                return [self.call(name, {
+                    "member_id": member_id,
+                    "task_description": entry["question"],
+                    "expected_output": "The relevant members and the MQL"
+                })]
+            if self.step_of(name, {}) != step:
+                continue
+            if step == "search_members":
+                # One search per dimension of the question, issued as parallel tool calls
+                return [
+                    self.call(name, self.arguments(tool, entry, dimension, names[0]))
+                    for dimension, names in entry["members"].items()
+                ]
+            return [self.call(name, self.arguments(tool, entry, next(iter(entry["members"])), entry["question"]))]
+        return []
+
+    def call(self, name: str, arguments: dict) -> dict:
+        return {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+    def arguments(self, tool: dict, entry: dict, dimension_name: str, query: str) -> dict:
+        model = self.catalog.model(entry["model_id"])
+        dimension = model.dimension_by_name(dimension_name)
+        known = {
+            "id": model.id,
+            "model_id": model.id,
+            "model_name": model.name,
+            "dimension_id": dimension.id,
+            "dimension_number": dimension.number,
+            "member_id": "root",
+            "member_ids": ["root"],
+            "depth": 1,
+            "mql": entry["mql"],
+            "query": query,
+            "members": [{"dimension": name, "name": member} for name, members in entry["members"].items() for member in members]
+        }
+        arguments = {}
+        for name, schema in (tool.get("parameters") or {}).get("properties", {}).items():
+            if name in known:
+                arguments[name] = known[name]
+            else:
+                kind = schema.get("type")
+                arguments[name] = {"integer": 1, "number": 1, "boolean": False, "array": [], "object": {}}.get(kind, entry["question"])
+        return arguments
+
+    def answer(self, entry: dict, system: str) -> str:
+        if "SELECTED_MODEL_ID" in system:
+            return f"SELECTED_MODEL_ID: {entry['model_id']}"
+        if "MODEL_SELECTION" in system and "MEMBER_PREDICTION" in system:
+            return "MEMBER_PREDICTION"
+        members = "; ".join(f"{dimension}: {', '.join(names)}" for dimension, names in entry["members"].items())
+        return f"The relevant members are {members}.\n\n```\n{entry['mql']}\n```\n\nThis query selects them from {self.catalog.model(entry['model_id']).name}."
+
+    def instance(self, schema: dict, entry: dict, root: dict, name: str = None) -> Any:
+        """A value matching a JSON schema, filled from the corpus entry"""
+        schema = self.resolve(schema, root)
+        options = schema.get("anyOf") or schema.get("oneOf")
+        if options:
+            options = [self.resolve(option, root) for option in options]
+            values = [option for option in options if option.get("type") != "null"]
+            if not values or name == "clarification":
+                return None
+            schema = values[0]
+        kind = schema.get("type")
+        if isinstance(kind, list):
+            if name == "clarification" or kind == ["null"]:
+                return None
+            kind = next(value for value in kind if value != "null")
+        model = self.catalog.model(entry["model_id"])
+        names = [member for members in entry["members"].values() for member in members]
+
+        if "enum" in schema:
+            matches = [value for value in schema["enum"] if str(value).lower() in [member.lower() for member in names]]
+            return matches[0] if matches else schema["enum"][0]
+        if kind == "object":
+            return {key: self.instance(value, entry, root, key) for key, value in schema.get("properties", {}).items()}
+        if kind == "array":
+            items = self.resolve(schema.get("items", {}), root)
+            properties = items.get("properties", {})
+            if "dimension" in properties:
+                allowed = self.resolve(properties["dimension"], root).get("enum")
+                dimensions = [dimension for dimension in entry["members"] if allowed is None or dimension in allowed]
+                if "name" in properties:
+                    return [
+                        {"dimension": dimension, "name": member, "alias": member}
+                        for dimension in dimensions for member in entry["members"][dimension]
+                    ]
+                return [{"dimension": dimension, "queries": entry["members"][dimension]} for dimension in dimensions]
+            if "enum" in items:
+                lowered = [member.lower() for member in names]
+                return [value for value in items["enum"] if str(value).lower() in lowered] or items["enum"][:1]
+            if items.get("type") == "string":
+                return names
+            return [self.instance(items, entry, root)]
+        if kind == "string":
+            if name == "model_name":
+                return model.name
+            if name == "dimension":
+                return next(iter(entry["members"]))
+            if name in ("name", "alias"):
+                return names[0]
+            return entry["question"]
+        if kind == "integer":
+            return model.id if name and "id" in name else 1
+        if kind == "number":
+            return 1.0
+        if kind == "boolean":
+            return False
+        return None
+
+    def resolve(self, schema: dict, root: dict) -> dict:
+        reference = schema.get("$ref")
+        if not reference:
+            return schema
+        target = root
+        for part in reference.lstrip("#/").split("/"):
+            target = target[part]
+        return target
+
+class FakeLLMHandler(FakeHandler):
+    def route(self, method: str, path: str, body: bytes):
+        if method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            return self.completion(json.loads(body))
+        if method == "GET" and path.rstrip("/").endswith("/models"):
+            return self.send_json({"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "benchmarks"}]})
+        self.send_text(f"No route for {method} {path}", 404)
+
+    def completion(self, request: dict):
+        started = time.perf_counter()
+        reply = self.server.model.respond(request)
+        prompt_tokens = sum(count_tokens(content_text(message)) for message in request.get("messages", []))
+        prompt_tokens += count_tokens(json.dumps(request.get("tools") or []))
+        completion_tokens = count_tokens(reply["content"] or json.dumps(reply["tool_calls"]))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        finish_reason = "tool_calls" if reply["tool_calls"] else "stop"
+        identifier = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "fake")
+
+        time.sleep(self.server.latency)
+        per_token = 1 / self.server.tokens_per_second if self.server.tokens_per_second > 0 else 0
+        if request.get("stream"):
+            self.stream(identifier, model, reply, finish_reason, usage, per_token, request)
+        else:
+            time.sleep(completion_tokens * per_token)
+            message = {"role": "assistant", "content": reply["content"]}
+            if reply["tool_calls"]:
+                message["tool_calls"] = reply["tool_calls"]
+            self.send_json({
+                "id": identifier, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage
+            })
+        self.server.stats.add(
+            calls=1,
+            streamed=1 if request.get("stream") else 0,
+            structured=1 if (request.get("response_format") or {}).get("type") == "json_schema" else 0,
+            tool_calls=len(reply["tool_calls"]),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            seconds=time.perf_counter() - started
+        )
+
+    def stream(self, identifier: str, model: str, reply: dict, finish_reason: str, usage: dict, per_token: float, request: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(choices, **extra):
+            chunk = {"id": identifier, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": choices, **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        if reply["content"]:
+            pieces = re.findall(r"\S+\s*|\s+", reply["content"])
+            for start in range(0, len(pieces), 4):
+                piece = "".join(pieces[start:start + 4])
+                time.sleep(count_tokens(piece) * per_token)
+                send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        for index, call in enumerate(reply["tool_calls"]):
+            time.sleep(count_tokens(call["function"]["arguments"]) * per_token)
+            send([{"index": 0, "delta": {"tool_calls": [{"index": index, **call}]}, "finish_reason": None}])
+        send([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+def start_fake_llm(catalog: SyntheticCatalog, port: int = 0, latency: float = 0.3, tokens_per_second: float = 200, corpus: List[dict] = None):
+    """Start the scripted chat endpoint in a background thread; point LOCAL_MODEL_BASE_URL at server.url + "/v1" """
+    model = ScriptedModel(catalog, corpus or get_corpus())
+    return start_server(FakeLLMHandler, port=port, model=model, latency=latency, tokens_per_second=tokens_per_second)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--models", type=int, default=2, help="must match the fake Vena API")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="generation speed, 0 for instant")
+    args = parser.parse_args()
+    server = start_fake_llm(SyntheticCatalog(args.models, members_per_dimension=0), args.port, args.latency, args.tokens_per_second)
+    print(f"Fake LLM on {server.url}/v1 (set LOCAL_MODEL_OVERRIDE=fake and LOCAL_MODEL_BASE_URL to it)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
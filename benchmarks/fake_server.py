@@ -0,0 +1,90 @@
+"""Shared plumbing of the local stand-in servers: threaded HTTP server, counters and latency"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+class Stats:
+    """Thread-safe counters exposed at /_bench/stats and cleared by POST /_bench/reset"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+
+    def add(self, **counts):
+        with self.lock:
+            for name, count in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+
+    def snapshot(self) -> Dict[str, float]:
+        with self.lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+def delay(latency: float, jitter: float = 0.2):
+    """Sleep for latency seconds, give or take jitter (a fraction of it)"""
+    if latency > 0:
+        time.sleep(latency * (1 + random.uniform(-jitter, jitter)))
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Base request handler; subclasses implement route(method, path, body)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_body(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, value, status: int = 200):
+        self.send_body(status, json.dumps(value).encode(), "application/json")
+
+    def send_text(self, text: str, status: int = 200):
+        self.send_body(status, text.encode(), "text/plain")
+
+    def handle_method(self, method: str):
+        body = self.read_body()
+        path = self.path
+        if path == "/_bench/stats":
+            return self.send_json(self.server.stats.snapshot())
+        if path == "/_bench/reset":
+            self.server.stats.reset()
+            return self.send_json({})
+        try:
+            self.route(method, path, body)
+        except Exception as e:
+            self.send_text(f"{type(e).__name__}: {e}", 500)
+
+    def do_GET(self):
+        self.handle_method("GET")
+
+    def do_POST(self):
+        self.handle_method("POST")
+
+    def route(self, method: str, path: str, body: bytes):
+        self.send_text("Not found", 404)
+
+def start_server(handler, host: str = "127.0.0.1", port: int = 0, **attributes) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; attributes are set on the server for the handler to use"""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stats = Stats()
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return server
@@ -0,0 +1,140 @@
+"""Local stand-in for the Vena API endpoints utils.vena_client calls, over synthetic models
+
+    python benchmarks/fake_vena.py --port 8081 --members 5000 --latency 0.05
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import time
+from urllib.parse import unquote, urlparse
+from fake_server import FakeHandler, delay, start_server
+from synthetic import SyntheticCatalog
+
+ROUTES = [
+    ("GET", re.compile(r"^/api/models/withDimensions$"), "models"),
+    ("GET", re.compile(r"^/api/models/(\d+)/dimensions$"), "dimensions"),
+    ("GET", re.compile(r"^/api/models/(\d+)/dimensions/(\d+)/members/([^/]+)/children$"), "children"),
+    ("GET", re.compile(r"^/api/models/(\d+)/dimensions/(\d+)/members/([^/]+)$"), "member"),
+    ("POST", re.compile(r"^/api/search/suggestions$"), "search"),
+    ("POST", re.compile(r"^/api/models/(\d+)/mql/validate$"), "validate"),
+    ("POST", re.compile(r"^/api/models/(\d+)/etl/query/hierarchies$"), "hierarchies")
+]
+QUOTED_PATTERN = re.compile(r"'((?:[^']|'')*)'|\"((?:[^\"]|\"\")*)\"")
+
+class FakeVenaHandler(FakeHandler):
+    def route(self, method: str, path: str, body: bytes):
+        path = urlparse(path).path
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                started = time.perf_counter()
+                delay(self.server.route_latency.get(name, self.server.latency))
+                getattr(self, name)(*[unquote(group) for group in match.groups()], body=body)
+                self.server.stats.add(requests=1, **{f"requests.{name}": 1, "seconds": time.perf_counter() - started})
+                return
+        self.send_text(f"No route for {method} {path}", 404)
+
+    def model(self, model_id: str):
+        model = self.server.catalog.model(model_id)
+        if model is None:
+            raise KeyError(f"Unknown model {model_id}")
+        return model
+
+    def dimension(self, model_id: str, number: str):
+        dimension = self.model(model_id).dimension_by_number(int(number))
+        if dimension is None:
+            raise KeyError(f"Unknown dimension {number}")
+        return dimension
+
+    def models(self, body: bytes):
+        self.send_json([
+            {"id": model.id, "name": model.name, "desc": f"Synthetic {model.name.lower()}", "dimensions": model.to_dimensions()}
+            for model in self.server.catalog.models.values()
+        ])
+
+    def dimensions(self, model_id: str, body: bytes):
+        self.send_json(self.model(model_id).to_dimensions())
+
+    def children(self, model_id: str, number: str, member_id: str, body: bytes):
+        dimension = self.dimension(model_id, number)
+        parent = "root" if member_id.lower() == "root" else member_id
+        if parent not in dimension.children:
+            return self.send_text(f"Unknown member {member_id}", 404)
+        self.send_json([dimension.to_member(child) for child in dimension.children[parent]])
+
+    def member(self, model_id: str, number: str, member_id: str, body: bytes):
+        dimension = self.dimension(model_id, number)
+        if member_id not in dimension.members:
+            return self.send_text(f"Unknown member {member_id}", 404)
+        self.send_json(dimension.to_member(member_id))
+
+    def search(self, body: bytes):
+        results = []
+        for query in json.loads(body or b"[]"):
+            if query.get("type") != "MEMBER":
+                continue
+            dimension = self.model(query["modelId"]).dimension_by_id(query["dimensionId"])
+            text = str(query.get("name") or "").lower()
+            limit = int(query.get("limit") or 500)
+            for member_id, member in dimension.members.items():
+                if len(results) >= limit:
+                    break
+                if text in member["name"].lower() or text in member["alias"].lower():
+                    results.append({**dimension.to_member(member_id), "type": "MEMBER", "dimensionId": dimension.id})
+        self.send_json(results)
+
+    def validate(self, model_id: str, body: bytes):
+        """Accepts MQL whose quoted names are all dimensions or members of the model"""
+        model = self.model(model_id)
+        for match in QUOTED_PATTERN.finditer(body.decode()):
+            name = (match.group(1) or match.group(2) or "").replace("''", "'")
+            if model.dimension_by_name(name) is None and not any(dimension.find(name) for dimension in model.dimensions):
+                return self.send_text(f"Unknown member '{name}'", 400)
+        self.send_body(204, b"", "text/plain")
+
+    def hierarchies(self, model_id: str, body: bytes):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["_dim", "_member_id", "_member_name", "_member_alias", "_parent_id", "_parent_name"])
+        for dimension in self.model(model_id).dimensions:
+            for member_id in dimension.preorder():
+                member = dimension.members[member_id]
+                parent = dimension.members.get(member["parent"])
+                writer.writerow([
+                    dimension.name, member_id, member["name"], member["alias"],
+                    parent["id"] if parent else "", parent["name"] if parent else ""
+                ])
+        self.send_body(200, output.getvalue().encode(), "text/csv")
+
+def start_fake_vena(port: int = 0, models: int = 2, members: int = 1000, fanout: int = 8, latency: float = 0.05, route_latency: dict = None):
+    """Start the fake Vena API in a background thread; its base URL is server.url
+
+    route_latency overrides the latency of single routes by name, e.g. {"search": 2.0}
+    """
+    return start_server(
+        FakeVenaHandler, port=port, catalog=SyntheticCatalog(models, members, fanout),
+        latency=latency, route_latency=dict(route_latency or {})
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--models", type=int, default=2)
+    parser.add_argument("--members", type=int, default=1000, help="members per dimension")
+    parser.add_argument("--fanout", type=int, default=8, help="children per generated member")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--route-latency", action="append", default=[], metavar="ROUTE=SECONDS", help="latency of one route, e.g. search=2 (repeatable)")
+    args = parser.parse_args()
+    route_latency = {route: float(seconds) for route, seconds in (value.split("=", 1) for value in args.route_latency)}
+    server = start_fake_vena(args.port, args.models, args.members, args.fanout, args.latency, route_latency)
+    print(f"Fake Vena API on {server.url} (set VENA_ENDPOINT to it)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Throughput, latency, event-loop lag and memory of one server process under concurrent chat sessions
+
+Starts the fake Vena API and the scripted model, then for each server runs simulated Chainlit
+sessions against its handlers in a process of its own (see sessions.py), ramping the number
+of concurrent sessions. Loop lag well above the probe interval points at blocking calls on
+the event loop; throughput that stops growing with sessions marks the process's capacity.
+
+    python benchmarks/load_test.py --servers langgraph,agno --levels 1,4,16,64 --turns 3
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from e2e import pipeline_environment
+from fake_llm import start_fake_llm
+from fake_vena import start_fake_vena
+from sessions import SERVERS
+from synthetic import SyntheticCatalog
+
+def run_server(name: str, args, vena, llm) -> list:
+    directory = tempfile.mkdtemp(prefix=f"load-{name}-")
+    try:
+        output = os.path.join(directory, "results.jsonl")
+        env = pipeline_environment(vena, llm, directory)
+        command = [
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.py"), name,
+            "--levels", ",".join(str(level) for level in args.levels), "--turns", str(args.turns),
+            "--warmup", str(args.warmup), "--output", output
+        ] + (["--cached"] if args.cached else [])
+        completed = subprocess.run(command, env=env, timeout=args.timeout)
+        if completed.returncode != 0 or not os.path.exists(output):
+            print(f"{name}: load test process exited with {completed.returncode}")
+            return []
+        with open(output) as results:
+            return [json.loads(line) for line in results if line.strip()]
+    except subprocess.TimeoutExpired:
+        print(f"{name}: no result within {args.timeout}s")
+        return []
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", default="langgraph,agno", help="comma separated: " + ", ".join(SERVERS))
+    parser.add_argument("--levels", type=lambda value: [int(level) for level in value.split(",")], default=[1, 4, 16, 64], help="concurrent sessions per step")
+    parser.add_argument("--turns", type=int, default=3, help="questions per session")
+    parser.add_argument("--warmup", type=int, default=1, help="turns of one session before measuring")
+    parser.add_argument("--cached", action="store_true", help="ask the corpus verbatim so answer caches can hit")
+    parser.add_argument("--models", type=int, default=2)
+    parser.add_argument("--members", type=int, default=1000, help="members per dimension")
+    parser.add_argument("--vena-latency", type=float, default=0.05, help="seconds added to every Vena request")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="generation speed, 0 for instant")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds allowed per server")
+    parser.add_argument("--json", help="also write every level's result to this JSON lines file")
+    args = parser.parse_args()
+
+    vena = start_fake_vena(models=args.models, members=args.members, latency=args.vena_latency)
+    llm = start_fake_llm(SyntheticCatalog(args.models, members_per_dimension=0), latency=args.llm_latency, tokens_per_second=args.tokens_per_second)
+    print(f"Fake Vena API on {vena.url}, fake model on {llm.url}/v1")
+
+    results = [result for name in args.servers.split(",") for result in run_server(name.strip(), args, vena, llm)]
+    if args.json:
+        with open(args.json, "w") as output:
+            for result in results:
+                output.write(json.dumps(result) + "\n")
+
+    print(f"{'server':<14} {'sessions':>8} {'turns':>6} {'errors':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'1st tok s':>9} {'lag p99 ms':>10} {'lag max ms':>10} {'MB/session':>10}")
+    for result in results:
+        first_token = f"{result['first_token_p50_s']:>9.2f}" if result["first_token_p50_s"] is not None else f"{'-':>9}"
+        print(f"{result['server']:<14} {result['sessions']:>8} {result['turns']:>6} {result['errors']:>6} {result['turns_per_second']:>8.2f} "
+              f"{result['p50_s']:>7.2f} {result['p95_s']:>7.2f} {result['p99_s']:>7.2f} {first_token} "
+              f"{result['loop_lag_p99_ms']:>10.1f} {result['loop_lag_max_ms']:>10.1f} {result['memory_per_session_mb']:>10.2f}")
+        for error in result["errors_sample"]:
+            print(f"    {error}")
+
+if __name__ == "__main__":
+    main()
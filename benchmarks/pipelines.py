@@ -0,0 +1,155 @@
+"""Asks the question corpus through one framework's pipeline and writes one JSON line per question
+
+The frameworks share module names (chat_service, server, ...), so each one runs in its own
+process started by benchmarks/e2e.py, with VENA_ENDPOINT and LOCAL_MODEL_BASE_URL pointing
+at the fakes. Counters of the fakes are read before and after every question.
+
+"answered" means the answer carries the question's MQL and "members" is the share of its
+members the answer names. A single openai-agents run ends at the MemberPrediction handoff,
+as in its server, where the MQL only follows on the user's next turn, so that pipeline is
+measured by "members" and never counts as answered.
+
+    python benchmarks/pipelines.py langgraph --vena-url http://127.0.0.1:8081 --llm-url http://127.0.0.1:8082 --output results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+import uuid
+from urllib.request import urlopen
+from synthetic import get_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def langgraph_pipeline():
+    from graph import app, get_run_config
+    from state import create_initial_state
+
+    async def ask(question: str):
+        state = await app.ainvoke(create_initial_state(question), config=get_run_config())
+        # The graph calls its tools itself, so they are counted from the state rather than the model's requests
+        return state.get("response") or state.get("error"), len(state.get("tool_calls", []))
+    return ask
+
+def agno_pipeline():
+    from orchestration_team import get_orchestration_team
+    team = get_orchestration_team()
+
+    async def ask(question: str):
+        response = await team.arun(message=question, user_id="benchmark", session_id=f"session_{uuid.uuid4().hex[:8]}")
+        return response.content, None
+    return ask
+
+def openai_agents_pipeline():
+    from agents import RunConfig, Runner
+    from chat_service import get_model
+    from orchestration_agent import get_orchestration_agent
+    from utils.structured_output import MemberPrediction
+
+    async def ask(question: str):
+        result = await Runner.run(
+            get_orchestration_agent(),
+            question,
+            run_config=RunConfig(model=get_model()),
+            max_turns=int(os.environ.get("OPENAI_AGENTS_MAX_TURNS", 100))
+        )
+        if isinstance(result.final_output, MemberPrediction):
+            return result.final_output.to_markdown(), None
+        return str(result.final_output), None
+    return ask
+
+def semantic_kernel_pipeline():
+    import chainlit as cl
+    from chainlit.context import init_http_context
+    from semantic_kernel.agents import ChatHistoryAgentThread
+    from semantic_kernel.contents import ChatHistory
+    from orchestration_agent import get_orchestration_agent
+    agent = get_orchestration_agent()
+
+    async def ask(question: str):
+        # The delegating functions read the thread from the Chainlit session, so each question gets one
+        init_http_context()
+        thread = ChatHistoryAgentThread(ChatHistory())
+        cl.user_session.set("thread", thread)
+        response = await agent.get_response(messages=question, thread=thread)
+        return str(response.content), None
+    return ask
+
+PIPELINES = {
+    "langgraph": langgraph_pipeline,
+    "agno": agno_pipeline,
+    "openai-agents": openai_agents_pipeline,
+    "semantic-kernel": semantic_kernel_pipeline
+}
+
+def members_named(answer: str, entry: dict) -> float:
+    names = [name for names in entry["members"].values() for name in names]
+    return sum(1 for name in names if name.lower() in answer.lower()) / len(names)
+
+def read_stats(url: str) -> dict:
+    with urlopen(f"{url}/_bench/stats") as response:
+        return json.loads(response.read())
+
+def difference(after: dict, before: dict) -> dict:
+    return {name: value - before.get(name, 0) for name, value in after.items() if value != before.get(name, 0)}
+
+async def run(args) -> list:
+    ask = PIPELINES[args.pipeline]()
+    results = []
+    for repeat in range(args.repeat):
+        for entry in get_corpus():
+            llm_before, vena_before = read_stats(args.llm_url), read_stats(args.vena_url)
+            started = time.perf_counter()
+            answer, tool_calls, error = None, None, None
+            try:
+                answer, tool_calls = await ask(entry["question"])
+            except Exception as e:
+                traceback.print_exc()
+                error = f"{type(e).__name__}: {e}"
+            seconds = time.perf_counter() - started
+            llm = difference(read_stats(args.llm_url), llm_before)
+            vena = difference(read_stats(args.vena_url), vena_before)
+            results.append({
+                "pipeline": args.pipeline,
+                "repeat": repeat,
+                "question": entry["question"],
+                "seconds": seconds,
+                "error": error,
+                # Whether the answer carries the MQL the scripted model wrote for the question
+                "answered": bool(answer) and entry["mql"] in str(answer),
+                "members": members_named(str(answer or ""), entry),
+                "llm_calls": llm.get("calls", 0),
+                "tool_calls": tool_calls if tool_calls is not None else llm.get("tool_calls", 0),
+                "prompt_tokens": llm.get("prompt_tokens", 0),
+                "completion_tokens": llm.get("completion_tokens", 0),
+                "vena_requests": vena.get("requests", 0),
+                "vena": {name.split(".", 1)[1]: count for name, count in vena.items() if name.startswith("requests.")}
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pipeline", choices=PIPELINES)
+    parser.add_argument("--vena-url", required=True)
+    parser.add_argument("--llm-url", required=True)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", required=True, help="JSON lines file to write")
+    args = parser.parse_args()
+
+    # Import the framework's modules by their bare names, as its server does
+    # The repo root goes last: ahead of site-packages its langgraph/ would shadow the langgraph package
+    directory = os.path.join(ROOT, args.pipeline)
+    sys.path.insert(0, directory)
+    sys.path.append(ROOT)
+    os.chdir(directory)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as output:
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+
+if __name__ == "__main__":
+    main()
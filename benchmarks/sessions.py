@@ -0,0 +1,185 @@
+"""Simulated Chainlit sessions against one server's on_chat_start/on_message handlers, in-process
+
+Each session gets its own Chainlit HTTP context, whose emitter records streamed tokens instead
+of sending them to a browser, and asks the question corpus turn after turn. Concurrency levels
+run one after another in the same process (warm caches and clients, as in production), while
+a probe measures how late the event loop wakes up. Started per server by benchmarks/load_test.py.
+
+    python benchmarks/sessions.py langgraph --levels 1,8,32 --turns 3 --output results.jsonl
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import traceback
+from synthetic import get_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVERS = ["langgraph", "agno", "openai-agents"]
+
+def rss_bytes() -> int:
+    """Resident memory of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # Peak rather than current outside Linux, in kilobytes (bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[max(int(round(len(values) * fraction)) - 1, 0)] if values else 0.0
+
+class LoopProbe:
+    """Sleeps for a fixed interval in a loop and records how late it wakes up; blocking calls show up as lag"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self.peak_rss = 0
+        self.task = None
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - started - self.interval, 0))
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+
+    def start(self):
+        self.lags = []
+        self.peak_rss = rss_bytes()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+def recording_emitter(session, tokens: list):
+    """Chainlit emitter that drops every message but the time of each streamed token"""
+    from chainlit.emitter import BaseChainlitEmitter
+
+    class RecordingEmitter(BaseChainlitEmitter):
+        async def send_token(self, *args, **kwargs):
+            tokens.append(time.perf_counter())
+
+    return RecordingEmitter(session)
+
+async def chat_session(server, number: int, turns: int, unique: bool, corpus: list) -> list:
+    """One user: open the chat, then ask a question per turn and wait for the full answer"""
+    import chainlit as cl
+    from chainlit.context import init_http_context
+
+    tokens = []
+    context = init_http_context()
+    context.emitter = recording_emitter(context.session, tokens)
+    results = []
+    try:
+        await server.on_chat_start()
+    except Exception as e:
+        traceback.print_exc()
+        return [{"seconds": 0, "first_token": None, "error": f"on_chat_start: {type(e).__name__}: {e}"}]
+
+    for turn in range(turns):
+        question = corpus[(number + turn) % len(corpus)]["question"]
+        if unique:
+            # Distinct text per session and turn, so answer caches do not short-circuit the pipeline
+            question = f"{question} (session {number}, turn {turn})"
+        tokens.clear()
+        started = time.perf_counter()
+        error = None
+        try:
+            await server.on_message(cl.Message(content=question))
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+        results.append({
+            "seconds": time.perf_counter() - started,
+            "first_token": tokens[0] - started if tokens else None,
+            "error": error
+        })
+    return results
+
+async def run_level(server, sessions: int, args, corpus: list) -> dict:
+    gc.collect()
+    probe = LoopProbe()
+    baseline = rss_bytes()
+    probe.start()
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        chat_session(server, number, args.turns, not args.cached, corpus) for number in range(sessions)
+    ])
+    elapsed = time.perf_counter() - started
+    await probe.stop()
+
+    turns = [turn for session in results for turn in session]
+    seconds = [turn["seconds"] for turn in turns if not turn["error"]]
+    first_tokens = [turn["first_token"] for turn in turns if turn["first_token"] is not None]
+    return {
+        "server": args.server,
+        "sessions": sessions,
+        "turns": len(turns),
+        "errors": sum(1 for turn in turns if turn["error"]),
+        "seconds": elapsed,
+        "turns_per_second": len(seconds) / elapsed,
+        "p50_s": percentile(seconds, 0.5),
+        "p95_s": percentile(seconds, 0.95),
+        "p99_s": percentile(seconds, 0.99),
+        "first_token_p50_s": percentile(first_tokens, 0.5) if first_tokens else None,
+        "loop_lag_p99_ms": percentile(probe.lags, 0.99) * 1000,
+        "loop_lag_max_ms": max(probe.lags, default=0) * 1000,
+        "memory_per_session_mb": max(probe.peak_rss - baseline, 0) / sessions / 2 ** 20,
+        "errors_sample": [turn["error"] for turn in turns if turn["error"]][:3]
+    }
+
+async def run(args) -> list:
+    import server
+    corpus = get_corpus()
+    if hasattr(server, "on_app_startup"):
+        await server.on_app_startup()
+    try:
+        if args.warmup:
+            # Build the lazily created clients, agents and caches before anything is measured
+            await chat_session(server, 0, args.warmup, not args.cached, corpus)
+        results = []
+        for sessions in args.levels:
+            result = await run_level(server, sessions, args, corpus)
+            print(f"{args.server}: {sessions} sessions, {result['turns_per_second']:.2f} turns/s, p95 {result['p95_s']:.2f}s", file=sys.stderr)
+            results.append(result)
+        return results
+    finally:
+        if hasattr(server, "on_app_shutdown"):
+            await server.on_app_shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("server", choices=SERVERS)
+    parser.add_argument("--levels", type=lambda value: [int(level) for level in value.split(",")], default=[1, 4, 16])
+    parser.add_argument("--turns", type=int, default=3, help="questions per session")
+    parser.add_argument("--warmup", type=int, default=1, help="turns of one session before measuring")
+    parser.add_argument("--cached", action="store_true", help="ask the corpus verbatim so answer caches can hit")
+    parser.add_argument("--output", required=True, help="JSON lines file to write, one line per level")
+    args = parser.parse_args()
+
+    # Import the server's modules by their bare names, as chainlit run does
+    # The repo root goes last: ahead of site-packages its langgraph/ would shadow the langgraph package
+    directory = os.path.join(ROOT, args.server)
+    sys.path.insert(0, directory)
+    sys.path.append(ROOT)
+    os.chdir(directory)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as output:
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Synthetic Vena models and the question corpus the benchmarks ask about them"""
+from typing import Dict, List, Optional
+
+# Named members every model has, as {name: children}; the questions only refer to these
+SEED_HIERARCHIES = {
+    "Account": {
+        "Net Income": {
+            "Revenue": {"Product Revenue": {}, "Services Revenue": {}},
+            "Cost of Revenue": {},
+            "Operating Expenses": {"Salaries": {}, "Marketing Expense": {}, "Rent": {}}
+        },
+        "Balance Sheet": {"Assets": {}, "Liabilities": {}, "Equity": {}}
+    },
+    "Period": {
+        "All Periods": {
+            str(year): {f"{year} Q{quarter}": {} for quarter in range(1, 5)}
+            for year in range(2020, 2025)
+        }
+    },
+    "Department": {
+        "All Departments": {
+            "Sales": {}, "Marketing": {}, "Research and Development": {}, "General and Administrative": {}, "Finance": {}
+        }
+    },
+    "Scenario": {"Actual": {}, "Budget": {}, "Forecast": {}},
+    "Entity": {"Consolidated": {"US": {}, "Canada": {}, "UK": {}}}
+}
+
+MODEL_NAMES = ["Foundation Model", "Workforce Model", "Capital Model", "Sales Model"]
+
+CORPUS = [
+    {
+        "question": "What is total revenue in 2022 in my foundation model?",
+        "model_id": 1,
+        "members": {"Account": ["Revenue"], "Period": ["2022"]}
+    },
+    {
+        "question": "Show me operating expenses by department for 2023 Q4",
+        "model_id": 1,
+        "members": {"Account": ["Operating Expenses"], "Period": ["2023 Q4"], "Department": ["All Departments"]}
+    },
+    {
+        "question": "What were salaries for Sales in 2021 in the Foundation Model?",
+        "model_id": 1,
+        "members": {"Account": ["Salaries"], "Department": ["Sales"], "Period": ["2021"]}
+    },
+    {
+        "question": "Compare budget and actual net income for 2024",
+        "model_id": 1,
+        "members": {"Account": ["Net Income"], "Scenario": ["Budget", "Actual"], "Period": ["2024"]}
+    },
+    {
+        "question": "What are the total assets for Canada in 2022?",
+        "model_id": 1,
+        "members": {"Account": ["Assets"], "Entity": ["Canada"], "Period": ["2022"]}
+    },
+    {
+        "question": "Show me marketing expense for the Marketing department in 2020",
+        "model_id": 1,
+        "members": {"Account": ["Marketing Expense"], "Department": ["Marketing"], "Period": ["2020"]}
+    },
+    {
+        "question": "What is cost of revenue for the US in 2023 Q2 in the Workforce Model?",
+        "model_id": 2,
+        "members": {"Account": ["Cost of Revenue"], "Entity": ["US"], "Period": ["2023 Q2"]}
+    },
+    {
+        "question": "Give me the services revenue forecast for 2024",
+        "model_id": 1,
+        "members": {"Account": ["Services Revenue"], "Scenario": ["Forecast"], "Period": ["2024"]}
+    }
+]
+
+def quote(name: str) -> str:
+    return "'" + name.replace("'", "''") + "'"
+
+def to_mql(members: Dict[str, List[str]]) -> str:
+    clauses = []
+    for dimension, names in members.items():
+        expression = quote(names[0]) if len(names) == 1 else "union(" + " ".join(quote(name) for name in names) + ")"
+        clauses.append(f"dimension({quote(dimension)}: {expression})")
+    return " ".join(clauses)
+
+def get_corpus() -> List[dict]:
+    return [{**entry, "mql": to_mql(entry["members"])} for entry in CORPUS]
+
+class SyntheticDimension:
+    """One dimension: the seed members plus generated filler members up to the requested size"""
+
+    def __init__(self, model_id: int, number: int, name: str, size: int, fanout: int):
+        self.id = model_id * 100 + number
+        self.number = number
+        self.name = name
+        # member id -> {"id", "name", "alias", "parent"}, children lists keyed by parent id ("root" at the top)
+        self.members: Dict[str, dict] = {}
+        self.children: Dict[str, List[str]] = {"root": []}
+        self.by_name: Dict[str, str] = {}
+        self.next_id = number * 1000000
+        self.add_tree(SEED_HIERARCHIES[name], "root")
+
+        # Filler members hang under one extra top-level member, fanout wide at every level
+        parents = [self.add(f"{name} Detail", "root")]
+        count = 0
+        while len(self.members) < size:
+            parent = parents.pop(0)
+            for _ in range(fanout):
+                if len(self.members) >= size:
+                    break
+                count += 1
+                parents.append(self.add(f"{name} Member {count:05d}", parent))
+
+    def add(self, name: str, parent: str) -> str:
+        self.next_id += 1
+        member_id = str(self.next_id)
+        self.members[member_id] = {"id": member_id, "name": name, "alias": name, "parent": parent}
+        self.by_name.setdefault(name.lower(), member_id)
+        self.children.setdefault(parent, []).append(member_id)
+        self.children.setdefault(member_id, [])
+        return member_id
+
+    def add_tree(self, tree: dict, parent: str):
+        for name, subtree in tree.items():
+            self.add_tree(subtree, self.add(name, parent))
+
+    def to_member(self, member_id: str) -> dict:
+        member = self.members[member_id]
+        return {"id": member_id, "name": member["name"], "alias": member["alias"], "numChildren": len(self.children[member_id])}
+
+    def find(self, name: str) -> Optional[str]:
+        return self.by_name.get(name.strip().lower())
+
+    def preorder(self, parent: str = "root"):
+        for member_id in self.children[parent]:
+            yield member_id
+            yield from self.preorder(member_id)
+
+class SyntheticModel:
+    def __init__(self, model_id: int, name: str, size: int, fanout: int):
+        self.id = model_id
+        self.name = name
+        self.dimensions = [
+            SyntheticDimension(model_id, number, dimension, size, fanout)
+            for number, dimension in enumerate(SEED_HIERARCHIES, start=1)
+        ]
+
+    def dimension_by_number(self, number: int) -> Optional[SyntheticDimension]:
+        return next((dimension for dimension in self.dimensions if dimension.number == int(number)), None)
+
+    def dimension_by_id(self, id: int) -> Optional[SyntheticDimension]:
+        return next((dimension for dimension in self.dimensions if dimension.id == int(id)), None)
+
+    def dimension_by_name(self, name: str) -> Optional[SyntheticDimension]:
+        return next((dimension for dimension in self.dimensions if dimension.name.lower() == name.strip().lower()), None)
+
+    def to_dimensions(self) -> List[dict]:
+        """Vena's /dimensions payload"""
+        return [
+            {"id": dimension.id, "number": dimension.number, "name": dimension.name, "typeDefinition": {"type": dimension.name}}
+            for dimension in self.dimensions
+        ]
+
+def model_name(model_id: int) -> str:
+    return MODEL_NAMES[model_id - 1] if model_id <= len(MODEL_NAMES) else f"Model {model_id}"
+
+class SyntheticCatalog:
+    """Models with identical dimension layouts, each dimension holding members_per_dimension members"""
+
+    def __init__(self, models: int = 2, members_per_dimension: int = 1000, fanout: int = 8):
+        self.models = {
+            model_id: SyntheticModel(model_id, model_name(model_id), members_per_dimension, fanout)
+            for model_id in range(1, models + 1)
+        }
+
+    def model(self, model_id: int) -> Optional[SyntheticModel]:
+        return self.models.get(int(model_id))
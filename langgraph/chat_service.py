@@ -1,7 +1,9 @@
 import os
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError
 from dotenv import load_dotenv
 from azure.identity import EnvironmentCredential, get_bearer_token_provider
+from utils.structured_output import response_format
+from utils.tracing import instrument_openai
 
 load_dotenv()
 
@@ -10,6 +12,17 @@ model_deployment_name=os.getenv("OPENAI_DEPLOYMENT_NAME")
 api_version=os.getenv("OPENAI_API_VERSION")
 provider = get_bearer_token_provider(EnvironmentCredential(), "https://cognitiveservices.azure.com/.default")
 
+# Wording of errors from backends that cannot do JSON-schema response formats at all
+UNSUPPORTED_PHRASES = ("not supported", "unsupported", "does not support", "is enabled only", "only supported", "not available")
+
+def is_structured_output_error(error: Exception) -> bool:
+    return "response_format" in str(error) or "json_schema" in str(error)
+
+def is_structured_output_unsupported(error: Exception) -> bool:
+    """A rejected request naming the response format as something the backend lacks, rather than a one-off failure"""
+    message = str(error).lower()
+    return isinstance(error, BadRequestError) and is_structured_output_error(error) and any(phrase in message for phrase in UNSUPPORTED_PHRASES)
+
 class ChatService:
     def __init__(self):
         self.local_model_override = os.environ.get("LOCAL_MODEL_OVERRIDE", False)
@@ -17,7 +30,7 @@ class ChatService:
         if self.local_model_override:
             self.client = AsyncOpenAI(
                 api_key="localhost",
-                base_url="http://localhost:11434/v1"
+                base_url=os.environ.get("LOCAL_MODEL_BASE_URL", "http://localhost:11434/v1")
             )
             self.model = self.local_model_override
         else:
@@ -29,6 +42,11 @@ class ChatService:
                 api_version=api_version
             )
             self.model = model_deployment_name
+        # Every completion is timed and its token usage recorded as an "llm" trace span
+        instrument_openai(self.client)
+        
+        # Switched off for the process once the backend says it does not support JSON-schema response formats
+        self.structured_output = os.environ.get("LANGGRAPH_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
     
     async def get_completion(self, messages, temperature=0.7):
         """Get completion from configured LLM service"""
@@ -42,6 +60,46 @@ class ChatService:
         except Exception as e:
             raise Exception(f"Error getting completion: {str(e)}")
 
+    async def stream_completion(self, messages, temperature=0.7):
+        """Stream a completion from the configured LLM service, yielding its text as it is generated"""
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"Error getting completion: {str(e)}")
+
+    async def get_structured_completion(self, messages, name, schema, temperature=0.7):
+        """Get a completion constrained to a JSON schema where the backend supports structured output
+        
+        Backends without it get the plain prompt; callers parse either reply with utils.structured_output.
+        """
+        if self.structured_output:
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    response_format=response_format(name, schema)
+                )
+                return response.choices[0].message.content
+            except Exception as e:
+                if not is_structured_output_error(e):
+                    raise Exception(f"Error getting completion: {str(e)}")
+                if is_structured_output_unsupported(e):
+                    print(f"Structured output unsupported by {self.model}, falling back to JSON repair: {e}")
+                    self.structured_output = False
+                else:
+                    # e.g. a schema the backend could not follow this time; only this request falls back
+                    print(f"Structured output failed for this request, falling back to JSON repair: {e}")
+        return await self.get_completion(messages, temperature)
+
 # Global instance - initialize lazily to avoid credential errors during import
 chat_service = None
 
@@ -1,17 +1,28 @@
+import os
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from state import GraphState
 from nodes import (
+    cache_lookup_node,
     orchestration_node,
     model_selection_node, 
     member_prediction_node,
+    dimension_prediction_node,
+    merge_members_node,
     mql_generation_node,
     response_generation_node,
     error_node
 )
 
+def route_cache_lookup(state: GraphState) -> str:
+    """Router function for the response cache lookup at the start of the graph"""
+    if state.get("next_step") == "RESPONSE_GENERATION":
+        return "response_generation"
+    return "orchestration"
+
 def route_orchestration(state: GraphState) -> str:
     """Router function for orchestration node"""
-    next_step = state.get("next_step")
+    next_step = (state.get("next_step") or "").strip().upper()
     if next_step == "MODEL_SELECTION":
         return "model_selection"
     elif next_step == "MEMBER_PREDICTION":
@@ -31,8 +42,29 @@ def route_model_selection(state: GraphState) -> str:
     else:
         return END
 
-def route_member_prediction(state: GraphState) -> str:
-    """Router function for member prediction node"""
+def route_member_prediction(state: GraphState):
+    """Router function for member prediction node, fans out one sub-task per relevant dimension"""
+    next_step = state.get("next_step")
+    if next_step == "DIMENSION_PREDICTION":
+        dimensions = state.get("relevant_dimensions", [])
+        if not dimensions:
+            return "merge_members"
+        return [
+            Send("dimension_prediction", {
+                "user_query": state["user_query"],
+                "model_id": state["selected_model"].id,
+                "dimension": item["dimension"],
+                "queries": item["queries"]
+            })
+            for item in dimensions
+        ]
+    elif next_step == "ERROR":
+        return "error_handler"
+    else:
+        return END
+
+def route_merge_members(state: GraphState) -> str:
+    """Router function for the node merging per-dimension member predictions"""
     next_step = state.get("next_step")
     if next_step == "MQL_GENERATION":
         return "mql_generation"
@@ -62,15 +94,27 @@ def create_graph():
     workflow = StateGraph(GraphState)
     
     # Add nodes
+    workflow.add_node("cache_lookup", cache_lookup_node)
     workflow.add_node("orchestration", orchestration_node)
     workflow.add_node("model_selection", model_selection_node)
     workflow.add_node("member_prediction", member_prediction_node)
+    workflow.add_node("dimension_prediction", dimension_prediction_node)
+    workflow.add_node("merge_members", merge_members_node)
     workflow.add_node("mql_generation", mql_generation_node)
     workflow.add_node("response_generation", response_generation_node)
     workflow.add_node("error_handler", error_node)
     
-    # Set entry point
-    workflow.add_edge(START, "orchestration")
+    # Set entry point; repeat questions skip straight to the response
+    workflow.add_edge(START, "cache_lookup")
+    
+    workflow.add_conditional_edges(
+        "cache_lookup",
+        route_cache_lookup,
+        {
+            "orchestration": "orchestration",
+            "response_generation": "response_generation"
+        }
+    )
     
     # Add conditional edges
     workflow.add_conditional_edges(
@@ -94,9 +138,23 @@ def create_graph():
         }
     )
     
+    # Dimension sub-tasks run in the same superstep, so latency is bounded by the slowest dimension
     workflow.add_conditional_edges(
         "member_prediction", 
         route_member_prediction,
+        {
+            "dimension_prediction": "dimension_prediction",
+            "merge_members": "merge_members",
+            "error_handler": "error_handler",
+            END: END
+        }
+    )
+    
+    workflow.add_edge("dimension_prediction", "merge_members")
+    
+    workflow.add_conditional_edges(
+        "merge_members", 
+        route_merge_members,
         {
             "mql_generation": "mql_generation",
             "error_handler": "error_handler",
@@ -120,5 +178,9 @@ def create_graph():
     # Compile the graph
     return workflow.compile()
 
+def get_run_config() -> dict:
+    """Run configuration bounding how many nodes (e.g. dimension sub-tasks) execute concurrently per request"""
+    return {"max_concurrency": int(os.environ.get("LANGGRAPH_MAX_CONCURRENCY", 4))}
+
 # Create the compiled graph
 app = create_graph()
\ No newline at end of file
@@ -1,36 +1,120 @@
-import json
-from typing import Dict, Any
+import asyncio
+from dataclasses import asdict
+from typing import Dict, Any, List, Optional
+from langgraph.config import get_stream_writer
 from state import GraphState, Member, ModelInfo
 from chat_service import get_chat_service
 from tool_calls import make_tool_call
+from router import get_confidence_threshold, parse_route, route_query, routing_metrics
+from utils.async_vena_client import get_async_client
+from utils.context_packing import pack_members, pack_model, pack_models
+from utils.mql import extract_mql
+from utils.prefetch import start_prefetch
+from utils.structured_output import dimension_plan_schema, member_selection_schema, parse_items
+from utils.response_cache import response_cache
+
+MODEL_SELECTED = "SELECTED_MODEL_ID:"
+
+async def stream_completion(messages: List[Dict[str, str]], temperature: float, node: str) -> str:
+    """Stream a completion as {"node": ..., "token": ...} events on the graph's custom stream, returns the whole text"""
+    writer = get_stream_writer()
+    text = ""
+    async for token in get_chat_service().stream_completion(messages, temperature=temperature):
+        text += token
+        writer({"node": node, "token": token})
+    return text
+
+async def stream_model_selection(messages: List[Dict[str, str]]) -> str:
+    """Stream the model selection reply as answer tokens unless it is a model id rather than a question for the user"""
+    writer = get_stream_writer()
+    text = ""
+    shown = 0
+    async for token in get_chat_service().stream_completion(messages, temperature=0.1):
+        text += token
+        reply = text.lstrip()
+        # Held back while the reply may still turn out to be the selection marker
+        if not MODEL_SELECTED.startswith(reply) and not reply.startswith(MODEL_SELECTED):
+            writer({"answer": text[shown:]})
+            shown = len(text)
+    return text
+
+async def guess_model_id(user_query: str) -> Optional[int]:
+    """The model the query will be answered from, when the local router can already tell; answers are cached per model"""
+    try:
+        models = await get_async_client().list_models()
+    except Exception:
+        return None
+    decision = route_query(user_query, models)
+    if decision.model is not None:
+        return decision.model["id"]
+    if decision.route == "MEMBER_PREDICTION" and models:
+        # The default model, as member prediction picks it
+        return models[0]["id"]
+    return None
+
+async def cache_lookup_node(state: GraphState) -> Dict[str, Any]:
+    """Entry node answering repeat questions from the response cache without any LLM call"""
+    cached = response_cache.get(state["user_query"], await guess_model_id(state["user_query"]))
+    if cached is None:
+        return {"next_step": "ORCHESTRATION"}
+    
+    return {
+        "selected_model": ModelInfo(**cached["model"]),
+        "predicted_members": [Member(**member) for member in cached["members"]],
+        "generated_mql": cached["mql"],
+        "mql_selection": cached["selection"],
+        "tool_calls": state.get("tool_calls", []),
+        "next_step": "RESPONSE_GENERATION"
+    }
 
 async def orchestration_node(state: GraphState) -> Dict[str, Any]:
     """Main orchestration node that decides the workflow path"""
     user_query = state["user_query"]
+    tool_calls = state.get("tool_calls", [])
     
-    # Determine if we need model selection
-    messages = [
-        {"role": "system", "content": """You are a helpful assistant that routes user queries to the appropriate agent.
+    try:
+        # The model list is cached, so routing locally costs no round-trip at all
+        tool_call = await make_tool_call("list_models", {})
+        tool_calls.append(tool_call)
+        decision = route_query(user_query, tool_call["result"] if tool_call["success"] else [])
+        
+        if decision.confidence >= get_confidence_threshold():
+            routing_metrics.record(decision.route, fallback=False)
+            result = {
+                "next_step": decision.route,
+                "tool_calls": tool_calls
+            }
+            if decision.model is not None:
+                result["selected_model"] = ModelInfo(
+                    id=decision.model["id"],
+                    name=decision.model["name"],
+                    description=decision.model["description"]
+                )
+            return result
+        
+        # Low confidence: fall back to the LLM
+        messages = [
+            {"role": "system", "content": """You are a helpful assistant that routes user queries to the appropriate agent.
         
         Analyze the user query and determine the next step:
         - "MODEL_SELECTION" if the user doesn't specify a model or you need to clarify which model
         - "MEMBER_PREDICTION" if the user has specified a model or is asking about a foundation/default model
         """},
-        {"role": "user", "content": user_query}
-    ]
-    
-    try:
+            {"role": "user", "content": user_query}
+        ]
+        
         response = await get_chat_service().get_completion(messages, temperature=0.1)
-        next_step = response.strip()
+        next_step = parse_route(response)
+        routing_metrics.record(next_step, fallback=True)
         
         return {
             "next_step": next_step,
-            "tool_calls": state.get("tool_calls", [])
+            "tool_calls": tool_calls
         }
     except Exception as e:
         return {
             "error": f"Orchestration error: {str(e)}",
-            "tool_calls": state.get("tool_calls", []),
+            "tool_calls": tool_calls,
             "next_step": "ERROR"
         }
 
@@ -49,7 +133,7 @@ async def model_selection_node(state: GraphState) -> Dict[str, Any]:
             {"role": "system", "content": f"""You are a helpful assistant that helps users select the appropriate financial model.
 
 Available models:
-{json.dumps(models, indent=2)}
+{pack_models(models)}
 
 Determine which model the user is asking about. If it is unclear which model the user is talking about, clarify with the user. Once a SINGLE model is selected, respond with exactly: "SELECTED_MODEL_ID: <id>"
 
@@ -58,10 +142,11 @@ If you need clarification, ask the user which model they want to use.
             {"role": "user", "content": state["user_query"]}
         ]
         
-        response = await get_chat_service().get_completion(messages, temperature=0.1)
+        # A clarifying question reaches the user token by token, while the model is still writing it
+        response = await stream_model_selection(messages)
         
-        if "SELECTED_MODEL_ID:" in response:
-            model_id = int(response.split("SELECTED_MODEL_ID:")[1].strip())
+        if MODEL_SELECTED in response:
+            model_id = int(response.split(MODEL_SELECTED)[1].strip())
             selected_model = next((m for m in models if m["id"] == model_id), None)
             
             return {
@@ -92,14 +177,15 @@ If you need clarification, ask the user which model they want to use.
         }
 
 async def member_prediction_node(state: GraphState) -> Dict[str, Any]:
-    """Node for predicting relevant OLAP members"""
+    """Node for planning member prediction: picks the relevant dimensions and what to search for in each"""
     try:
         # Track tool calls for UI
         tool_calls = state.get("tool_calls", [])
         
         # Get model info if we have a selected model
-        if state.get("selected_model"):
-            model_id = state["selected_model"].id
+        selected_model = state.get("selected_model")
+        if selected_model:
+            model_id = selected_model.id
             tool_call = await make_tool_call("get_model_info", {"id": model_id})
             model_info = tool_call["result"]
             tool_calls.append(tool_call)
@@ -109,74 +195,66 @@ async def member_prediction_node(state: GraphState) -> Dict[str, Any]:
             models = list_tool_call["result"]  # Already a Python list, no JSON parsing needed
             model_id = models[0]["id"]  # Use first model as default
             tool_calls.append(list_tool_call)
+            selected_model = ModelInfo(
+                id=models[0]["id"],
+                name=models[0]["name"],
+                description=models[0]["description"]
+            )
             
             model_tool_call = await make_tool_call("get_model_info", {"id": model_id})
             model_info = model_tool_call["result"]
             tool_calls.append(model_tool_call)
         
+        # Top-level members of the likely dimensions load while the LLM plans, so the dimension sub-tasks hit the cache
+        start_prefetch(model_id, selected_model.name)
+        
         messages = [
             {"role": "system", "content": f"""<task>
-You are a helpful assistant that translates natural language questions into extracted members from a hierarchy in an OLAP cube.
+You are a helpful assistant that plans how to find the members of an OLAP cube that answer a natural language question.
 </task>
 
 <tips>
 - The Account dimension type is almost always the most relevant dimension to answer questions about revenue.
+- Only list dimensions the question actually filters or breaks down by; omitted dimensions include all of their members.
 </tips>
 
 <instructions>
-Phase 1: Model Selection
-1. First, you should determine which model the user is asking about. Use the list_models() function to get a list of all available models.
-2. You can then use the get_model_info(model_id: int) function to get dimension information about a specific model.
-3. If it is unclear which model the user is talking about, clarify with the user. Once a SINGLE model is selected, you can move on to the next step.
-
-Phase 2: Planning
-4. Let's take is step by step. Reflect on the user's question and create a plan to predict which members from each dimension are relevant.
-
-Phase 3: Member Search
-5. If a member looks promising, you can use the search_members(model_id: int, dimension_id: int, query: str) function to search members until you have a list of all relevant members.
-6. If you require more information, the query is unclear or there are no obvious candidates, call the get_top_level_members(model_id: int, dimension_number: int) function to start your search from the root of the dimension hierarchy (this will return the top-level members of the dimension).
-7. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member.
-8. Once you have a list of members, reflect on the user's question and evaluate if you have enough information to answer the question.
+1. Reflect on the user's question and decide which dimensions of the model are relevant.
+2. For each relevant dimension, list one to three short search queries that would find the relevant members (e.g. "revenue", "2022").
 </instructions>
 
 <format>
-You should return a list of members in the following format:
-[
-    {{
-        "dimension": <dimension name>,
-        "members": [
-            {{
-                "name": <member name>,
-                "alias": <member alias>
-            }},
-            ...
-        ]
-    }}
-]
+Respond with JSON only, in the following format:
+{{
+    "dimensions": [
+        {{
+            "dimension": <dimension name>,
+            "queries": [<search query>, ...]
+        }}
+    ]
+}}
 </format>
 
 Model Information:
-{model_info}
+{pack_model(model_info)}
 
 User Query: {state["user_query"]}
 """},
-            {"role": "user", "content": f"Find relevant members for this query: {state['user_query']}"}
+            {"role": "user", "content": f"Plan the member search for this query: {state['user_query']}"}
         ]
         
-        # For now, simulate member prediction - in a full implementation,
-        # this would use the Vena API functions to search and find members
-        response = await get_chat_service().get_completion(messages, temperature=0.1)
-        
-        # Parse predicted members (simplified for this example)
-        predicted_members = [
-            Member(name="Revenue", alias="Revenue", dimension="Account"),
-            Member(name="2022", alias="2022", dimension="Period")
-        ]
+        response = await get_chat_service().get_structured_completion(
+            messages,
+            "dimension_plan",
+            dimension_plan_schema([dimension["name"] for dimension in model_info["dimensions"]]),
+            temperature=0.1
+        )
         
         return {
-            "predicted_members": predicted_members,
+            "selected_model": selected_model,
+            "relevant_dimensions": plan_dimensions(response, model_info["dimensions"], state["user_query"]),
             "tool_calls": tool_calls,
-            "next_step": "MQL_GENERATION"
+            "next_step": "DIMENSION_PREDICTION"
         }
         
     except Exception as e:
@@ -186,6 +264,122 @@ User Query: {state["user_query"]}
             "next_step": "ERROR"
         }
 
+def plan_dimensions(response: str, dimensions: List[Dict[str, Any]], user_query: str) -> List[Dict[str, Any]]:
+    """Match the planned dimension names to the model's dimensions, one sub-task per dimension"""
+    by_name = {dimension["name"].lower(): dimension for dimension in dimensions}
+    plan = []
+    for item in parse_items(response, "dimensions"):
+        if not isinstance(item, dict):
+            continue
+        dimension = by_name.pop(str(item.get("dimension", "")).strip().lower(), None)
+        if dimension is None:
+            continue
+        queries = [str(query) for query in item.get("queries") or [] if str(query).strip()]
+        plan.append({"dimension": dimension, "queries": queries or [user_query]})
+    return plan
+
+def select_members(items: List[Any], candidates: List[Dict[str, Any]], dimension: str) -> List[Member]:
+    """Typed members for the picked names; aliases come from the hierarchy and unknown names are dropped"""
+    by_name = {member["name"].lower(): member for member in candidates}
+    members = []
+    for item in items:
+        # Plain names from the schema, or {"name": ...} objects from a backend without structured output
+        name = item.get("name") if isinstance(item, dict) else item
+        candidate = by_name.pop(str(name or "").strip().lower(), None)
+        if candidate is not None:
+            members.append(Member(name=candidate["name"], alias=candidate.get("alias") or candidate["name"], dimension=dimension))
+    return members
+
+async def dimension_prediction_node(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Sub-task predicting the members of a single dimension; one runs per relevant dimension in parallel"""
+    dimension = task["dimension"]
+    model_id = task["model_id"]
+    tool_calls = []
+    try:
+        # Top-level members and every search for this dimension are independent, so they run together
+        calls = [make_tool_call("get_top_level_members", {"model_id": model_id, "dimension_number": dimension["number"]})]
+        calls += [
+            make_tool_call("search_members", {"model_id": model_id, "dimension_id": dimension["id"], "query": query})
+            for query in task["queries"]
+        ]
+        tool_calls = list(await asyncio.gather(*calls))
+        
+        candidates = []
+        seen = set()
+        for tool_call in tool_calls:
+            if not tool_call["success"] or not isinstance(tool_call["result"], list):
+                continue
+            for member in tool_call["result"]:
+                if isinstance(member, dict) and member.get("name") and member["name"] not in seen:
+                    seen.add(member["name"])
+                    candidates.append(member)
+        
+        messages = [
+            {"role": "system", "content": f"""<task>
+You are a helpful assistant that picks the members of the {dimension["name"]} dimension of an OLAP cube that answer a question.
+</task>
+
+<instructions>
+1. Only pick members from the candidates below; never invent member names.
+2. Prefer the most specific members that answer the question.
+</instructions>
+
+<format>
+Respond with JSON only, in the following format:
+{{
+    "members": [<member name>, ...]
+}}
+</format>
+
+Candidates:
+{pack_members(candidates)}
+"""},
+            {"role": "user", "content": task["user_query"]}
+        ]
+        
+        response = await get_chat_service().get_structured_completion(
+            messages,
+            "member_selection",
+            member_selection_schema([member["name"] for member in candidates]),
+            temperature=0.1
+        )
+        
+        members = select_members(parse_items(response, "members"), candidates, dimension["name"])
+        
+        return {"dimension_results": [{"dimension": dimension["name"], "members": members, "tool_calls": tool_calls, "error": None}]}
+    
+    except Exception as e:
+        return {"dimension_results": [{"dimension": dimension["name"], "members": [], "tool_calls": tool_calls, "error": str(e)}]}
+
+async def merge_members_node(state: GraphState) -> Dict[str, Any]:
+    """Merge the parallel per-dimension results into predicted_members, in planning order"""
+    tool_calls = state.get("tool_calls", [])
+    results = {result["dimension"]: result for result in state.get("dimension_results", [])}
+    
+    predicted_members = []
+    errors = []
+    for item in state.get("relevant_dimensions", []):
+        result = results.get(item["dimension"]["name"])
+        if result is None:
+            continue
+        tool_calls.extend(result["tool_calls"])
+        predicted_members.extend(result["members"])
+        if result["error"]:
+            errors.append(f"{result['dimension']}: {result['error']}")
+    
+    if errors and not predicted_members:
+        return {
+            "error": "Member prediction error: " + "; ".join(errors),
+            "tool_calls": tool_calls,
+            "next_step": "ERROR"
+        }
+    
+    return {
+        "predicted_members": predicted_members,
+        "tool_calls": tool_calls,
+        "next_step": "MQL_GENERATION"
+    }
+
 async def mql_generation_node(state: GraphState) -> Dict[str, Any]:
     """Node for generating Vena MQL queries"""
     try:
@@ -273,11 +467,36 @@ Return:
             {"role": "user", "content": f"Generate MQL for:\nQuery: {state['user_query']}\nMembers: {members_str}"}
         ]
         
-        mql = await get_chat_service().get_completion(messages, temperature=0.1)
+        # The MQL shows up in the node's step as it is written
+        mql = extract_mql(await stream_completion(messages, 0.1, "mql_generation"))
+        
+        # Syntax and member names are checked locally first, so invalid MQL never costs a Vena round-trip
+        tool_calls = state.get("tool_calls", [])
+        mql_selection = None
+        if state.get("selected_model"):
+            args = {"model_id": state["selected_model"].id, "mql": mql}
+            validate_tool_call = await make_tool_call("validate_mql", args)
+            tool_calls.append(validate_tool_call)
+            if validate_tool_call["success"]:
+                # Resolve what the query selects from the local hierarchy, no Vena call involved
+                evaluate_tool_call = await make_tool_call("evaluate_mql", args)
+                tool_calls.append(evaluate_tool_call)
+                if evaluate_tool_call["success"]:
+                    mql_selection = evaluate_tool_call["result"]
+                
+                # Only answers that passed validation are worth replaying
+                selected_model = state["selected_model"]
+                response_cache.set(state["user_query"], selected_model.id, {
+                    "model": asdict(selected_model),
+                    "members": [asdict(member) for member in state.get("predicted_members", [])],
+                    "mql": mql,
+                    "selection": mql_selection
+                })
         
         return {
             "generated_mql": mql,
-            "tool_calls": state.get("tool_calls", []),
+            "mql_selection": mql_selection,
+            "tool_calls": tool_calls,
             "next_step": "RESPONSE_GENERATION"
         }
         
@@ -305,6 +524,18 @@ Generated MQL Query:
 
 This query can be executed against your Vena model to retrieve the requested financial data."""
         
+        selection = state.get("mql_selection")
+        if selection:
+            lines = []
+            for dimension in selection["dimensions"]:
+                if dimension["all_members"]:
+                    lines.append(f"- {dimension['dimension']}: all {dimension['count']} members")
+                else:
+                    sample = ", ".join(dimension["sample"])
+                    more = "" if dimension["count"] <= len(dimension["sample"]) else ", ..."
+                    lines.append(f"- {dimension['dimension']}: {dimension['count']} members ({sample}{more})")
+            response += "\n\nThe query selects:\n" + "\n".join(lines) + f"\n\n{selection['combinations']:,} member combinations in total."
+        
         return {
             "response": response,
             "tool_calls": state.get("tool_calls", []),
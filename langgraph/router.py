@@ -0,0 +1,106 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from utils.tracing import count
+
+ROUTES = ("MODEL_SELECTION", "MEMBER_PREDICTION")
+
+# Phrases that settle the route on their own, with the confidence they carry
+DEFAULT_MODEL_PHRASES = ["foundation model", "default model", "my model", "this model", "same model"]
+MODEL_SELECTION_PHRASES = ["which model", "which models", "what model", "what models", "list models", "list the models", "available models", "switch model", "change model", "another model", "different model"]
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+@dataclass
+class RouteDecision:
+    route: str
+    confidence: float
+    reason: str
+    model: Optional[Dict[str, Any]] = None
+
+def normalize(text: str) -> str:
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+def contains(text: str, phrase: str) -> bool:
+    return f" {phrase} " in f" {text} "
+
+def route_query(query: str, models: List[Dict[str, Any]]) -> RouteDecision:
+    """Decide the orchestration route locally from the query and the (cached) model list"""
+    text = normalize(query)
+
+    for phrase in MODEL_SELECTION_PHRASES:
+        if contains(text, phrase):
+            return RouteDecision("MODEL_SELECTION", 0.9, f"asks about models ('{phrase}')")
+
+    # Longest name first so "Foundation Model 2" wins over "Foundation Model"
+    for model in sorted(models, key=lambda model: -len(str(model.get("name", "")))):
+        name = normalize(str(model.get("name", "")))
+        if name and contains(text, name):
+            return RouteDecision("MEMBER_PREDICTION", 0.95, f"names model '{model['name']}'", model)
+        if contains(text, f"model {model.get('id')}"):
+            return RouteDecision("MEMBER_PREDICTION", 0.9, f"names model id {model['id']}", model)
+
+    if len(models) == 1:
+        return RouteDecision("MEMBER_PREDICTION", 0.9, "only one model is available", models[0])
+
+    for phrase in DEFAULT_MODEL_PHRASES:
+        if contains(text, phrase):
+            return RouteDecision("MEMBER_PREDICTION", 0.8, f"refers to the default model ('{phrase}')")
+
+    # Mentions a model we cannot identify: ambiguous, let the LLM decide
+    if "model" in text.split() or "models" in text.split():
+        return RouteDecision("MODEL_SELECTION", 0.5, "mentions an unknown model")
+
+    # No model mentioned at all, which the routing prompt itself sends to model selection
+    return RouteDecision("MODEL_SELECTION", 0.75, "no model mentioned")
+
+def parse_route(response: str) -> str:
+    """Pull the route out of an LLM reply that may carry extra whitespace, quotes or prose"""
+    text = response.upper().replace(" ", "_")
+    positions = [(text.find(route), route) for route in ROUTES if route in text]
+    return min(positions)[1] if positions else "MODEL_SELECTION"
+
+def get_confidence_threshold() -> float:
+    return float(os.environ.get("LANGGRAPH_ROUTER_CONFIDENCE", 0.7))
+
+class RoutingMetrics:
+    """Counts of routing decisions made locally versus by the LLM fallback
+
+    Each decision is also counted on the current trace span.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = 0
+        self.fallback = 0
+        self.routes = {}
+
+    def record(self, route: str, fallback: bool):
+        with self.lock:
+            if fallback:
+                self.fallback += 1
+            else:
+                self.local += 1
+            self.routes[route] = self.routes.get(route, 0) + 1
+        count(**{"llm_routes" if fallback else "local_routes": 1})
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.local + self.fallback
+            return {
+                "local": self.local,
+                "fallback": self.fallback,
+                "fallback_rate": self.fallback / total if total else 0.0,
+                "routes": dict(self.routes)
+            }
+
+routing_metrics = RoutingMetrics()
+
+def print_routing_stats():
+    """Print how often routing needed the LLM, e.g. on server shutdown"""
+    stats = routing_metrics.stats()
+    if stats["local"] or stats["fallback"]:
+        routes = ", ".join(f"{route}={decisions}" for route, decisions in sorted(stats["routes"].items()))
+        print(f"Routing: {stats['local']} local, {stats['fallback']} by LLM ({stats['fallback_rate']:.0%} fallback); {routes}")
@@ -1,8 +1,14 @@
 import chainlit as cl
 import json
 from contextlib import AsyncExitStack
-from graph import app
-from state import GraphState
+from graph import app, get_run_config
+from router import print_routing_stats
+from state import GraphState, create_initial_state
+from utils.async_vena_client import close_async_client
+from utils.prefetch import stop_prefetch
+from utils.prewarm import start_prewarm, stop_prewarm
+from utils.snapshot_store import load_snapshots, start_snapshot_reload, stop_snapshot_reload
+from utils.tracing import close_tracer, print_trace_stats, traced
 
 # Global context manager for cleanup
 exit_stack = AsyncExitStack()
@@ -10,7 +16,22 @@ exit_stack = AsyncExitStack()
 @cl.on_app_startup
 async def on_app_startup():
     """Initialize any required services on app startup"""
-    pass
+    # Close the shared Vena connection pool together with everything else on shutdown
+    exit_stack.push_async_callback(close_async_client)
+    # Speculative prefetches still running are cancelled before the pool closes
+    exit_stack.push_async_callback(stop_prefetch)
+    # Memory-map stored hierarchy snapshots so member lookups are served locally from the first turn
+    load_snapshots()
+    # Pick up snapshots the refresh CLI writes later; cached answers for the old hierarchy are dropped then
+    start_snapshot_reload()
+    exit_stack.push_async_callback(stop_snapshot_reload)
+    # Warm models, dimensions and top-level members in the background, refreshed periodically
+    start_prewarm()
+    exit_stack.push_async_callback(stop_prewarm)
+    # Print where the time went per stage and how often routing needed the LLM on shutdown, then flush the trace sinks
+    exit_stack.callback(close_tracer)
+    exit_stack.callback(print_routing_stats)
+    exit_stack.callback(print_trace_stats)
     
 @cl.on_app_shutdown
 async def on_app_shutdown():
@@ -44,21 +65,28 @@ async def on_chat_start():
     """Initialize chat session"""
     cl.user_session.set("initialized", True)
 
+def node_step(node_name: str, output: str = "🔄 Processing...") -> cl.Step:
+    """Step showing one node's progress"""
+    step = cl.Step(name=f"Agent: {node_name.replace('_', ' ').title()}")
+    step.start = True
+    step.output = output
+    return step
+
+async def show_answer(answer: cl.Message, text: str):
+    """Stream the final answer, continuing after the tokens that were already streamed"""
+    if text.startswith(answer.content):
+        await answer.stream_token(text[len(answer.content):])
+    else:
+        # The streamed tokens were not the answer after all; sending the message replaces them
+        answer.content = text
+
 @cl.on_message
+@traced("turn", "langgraph")
 async def on_message(message: cl.Message):
     """Handle incoming messages"""
     
     # Create initial state
-    initial_state: GraphState = {
-        "user_query": message.content,
-        "selected_model": None,
-        "predicted_members": [],
-        "generated_mql": None,
-        "response": None,
-        "error": None,
-        "next_step": None,
-        "tool_calls": []
-    }
+    initial_state: GraphState = create_initial_state(message.content)
     
     # Create a Chainlit message for the response stream
     answer = cl.Message(content="")
@@ -66,22 +94,37 @@ async def on_message(message: cl.Message):
     try:
         # Process through the LangGraph workflow with step visualization
         current_step = None
-        previous_tool_calls = []
+        shown_tool_calls = 0
+        # Steps opened by a node's streamed tokens before the node finished
+        streaming_steps = {}
         
-        async for chunk in app.astream(initial_state):
+        # "custom" carries LLM tokens as the nodes receive them, "updates" each node's result once it is done
+        async for mode, chunk in app.astream(initial_state, config=get_run_config(), stream_mode=["updates", "custom"]):
+            if mode == "custom":
+                if "answer" in chunk:
+                    await answer.stream_token(chunk["answer"])
+                else:
+                    step = streaming_steps.get(chunk["node"])
+                    if step is None:
+                        step = streaming_steps[chunk["node"]] = node_step(chunk["node"], output="")
+                    await step.stream_token(chunk["token"])
+                continue
+            
             for node_name, node_state in chunk.items():
                 # Create step for each node execution
                 if node_name not in ["__start__", "__end__"]:
                     if current_step:
                         await current_step.send()
                     
-                    current_step = cl.Step(name=f"Agent: {node_name.replace('_', ' ').title()}")
-                    current_step.start = True
-                    current_step.output = "🔄 Processing..."
+                    current_step = streaming_steps.pop(node_name, None) or node_step(node_name)
                     
                     # Show new tool calls if present
-                    current_tool_calls = node_state.get("tool_calls", [])
-                    new_tool_calls = current_tool_calls[len(previous_tool_calls):]
+                    if "tool_calls" in node_state:
+                        new_tool_calls = node_state["tool_calls"][shown_tool_calls:]
+                    else:
+                        # Parallel dimension sub-tasks report their own calls, merged into tool_calls afterwards
+                        new_tool_calls = [call for result in node_state.get("dimension_results", []) for call in result["tool_calls"]]
+                    shown_tool_calls += len(new_tool_calls)
                     
                     for tool_call in new_tool_calls:
                         tool_name = tool_call.get('name', 'Unknown Tool')
@@ -112,9 +155,6 @@ async def on_message(message: cl.Message):
                         
                         await tool_step.send()
                     
-                    # Update previous tool calls count
-                    previous_tool_calls = current_tool_calls
-                    
                     # Show node progress
                     if node_state.get("status"):
                         current_step.output = node_state["status"]
@@ -125,13 +165,13 @@ async def on_message(message: cl.Message):
                     if current_step:
                         current_step.output = "✅ Completed"
                         await current_step.send()
-                    await answer.stream_token(node_state["response"])
+                    await show_answer(answer, node_state["response"])
                     break
                 elif node_state.get("error"):
                     if current_step:
                         current_step.output = f"❌ Error: {node_state['error']}"
                         await current_step.send()
-                    await answer.stream_token(f"Error: {node_state['error']}")
+                    await show_answer(answer, f"Error: {node_state['error']}")
                     break
         
         # Complete any remaining step
@@ -140,11 +180,9 @@ async def on_message(message: cl.Message):
                 current_step.output = "✅ Completed"
             await current_step.send()
         
-        # If no streaming response was found, get the final state
+        # The graph ended without answering, e.g. when orchestration routed nowhere
         if not answer.content:
-            final_result = await app.ainvoke(initial_state)
-            final_response = final_result.get("response", "No response generated")
-            await answer.stream_token(final_response)
+            await answer.stream_token("No response generated")
     
     except Exception as e:
         await answer.stream_token(f"An error occurred: {str(e)}")
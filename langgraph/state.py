@@ -1,3 +1,4 @@
+import operator
 from typing import TypedDict, List, Dict, Optional, Annotated, Any
 from dataclasses import dataclass
 
@@ -22,12 +23,21 @@ class GraphState(TypedDict):
     # Model information
     selected_model: Optional[ModelInfo]
     
+    # Member prediction plan: [{"dimension": <model dimension>, "queries": [...]}], one sub-task each
+    relevant_dimensions: List[Dict[str, Any]]
+    
+    # Per-dimension sub-task results, appended concurrently by the parallel sub-tasks
+    dimension_results: Annotated[List[Dict[str, Any]], operator.add]
+    
     # Member prediction results
     predicted_members: Annotated[List[Member], "List of predicted OLAP members"]
     
     # MQL generation
     generated_mql: Optional[str]
     
+    # Members selected per dimension by the generated MQL, resolved against the local hierarchy
+    mql_selection: Optional[Dict[str, Any]]
+    
     # Final response
     response: Optional[str]
     
@@ -38,4 +48,20 @@ class GraphState(TypedDict):
     next_step: Optional[str]
     
     # Tool calls for UI display
-    tool_calls: Annotated[List[Dict[str, Any]], "List of tool calls made during processing"]
\ No newline at end of file
+    tool_calls: Annotated[List[Dict[str, Any]], "List of tool calls made during processing"]
+
+def create_initial_state(user_query: str) -> GraphState:
+    """Empty state for a new user query"""
+    return {
+        "user_query": user_query,
+        "selected_model": None,
+        "relevant_dimensions": [],
+        "dimension_results": [],
+        "predicted_members": [],
+        "generated_mql": None,
+        "mql_selection": None,
+        "response": None,
+        "error": None,
+        "next_step": None,
+        "tool_calls": []
+    }
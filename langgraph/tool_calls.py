@@ -1,21 +1,37 @@
 import json
 import os
 from typing import Dict, Any, List
-from utils import vena_client as vc
+from utils.async_vena_client import get_async_client
+from utils.tracing import span
 
 async def make_tool_call(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     """Make a tool call and return structured information for UI display"""
+    with span("tool", name) as current:
+        call = await invoke_tool(name, args)
+        current.set(result_bytes=len(json.dumps(call["result"], default=str).encode()))
+        if not call["success"]:
+            current.error = call["result"]
+        return call
+
+async def invoke_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     try:
+        client = get_async_client()
         if name == "list_models":
-            result = vc.list_models()
+            result = await client.list_models()
         elif name == "get_model_info":
-            result = vc.get_model(args["id"], args.get("model_name", ""))
+            result = await client.get_model(args["id"], args.get("model_name", ""))
         elif name == "get_top_level_members":
-            result = vc.get_children_of_member(args["model_id"], args["dimension_number"], "root")
+            result = await client.get_children_of_member(args["model_id"], args["dimension_number"], "root")
         elif name == "get_children_of_member":
-            result = vc.get_children_of_member(args["model_id"], args["dimension_number"], args["member_id"])
+            result = await client.get_children_of_member(args["model_id"], args["dimension_number"], args["member_id"])
+        elif name == "get_children_of_members":
+            result = await client.get_children_of_members(args["model_id"], args["dimension_number"], args["member_ids"], args.get("depth", 1))
         elif name == "search_members":
-            result = vc.search_members(args["model_id"], args["dimension_id"], args["query"])
+            result = await client.search_members(args["model_id"], args["dimension_id"], args["query"])
+        elif name == "validate_mql":
+            result = await client.validate_mql(args["model_id"], args["mql"])
+        elif name == "evaluate_mql":
+            result = await client.evaluate_mql(args["model_id"], args["mql"])
         else:
             raise ValueError(f"Unknown tool: {name}")
         
@@ -3,6 +3,7 @@ from agents import OpenAIChatCompletionsModel
 from openai import AsyncOpenAI, AsyncAzureOpenAI
 from azure.identity import EnvironmentCredential, get_bearer_token_provider
 from dotenv import load_dotenv
+from utils.tracing import instrument_openai
 
 load_dotenv()
 
@@ -13,24 +14,34 @@ model_deployment_name=os.getenv("OPENAI_DEPLOYMENT_NAME")
 api_version=os.getenv("OPENAI_API_VERSION")
 provider = get_bearer_token_provider(EnvironmentCredential(), "https://cognitiveservices.azure.com/.default")
 
+# One model (and HTTP client) shared by every session, built on first use
+model = None
+
 def get_model() -> OpenAIChatCompletionsModel:
+    """Get the shared model, creating it on first use."""
+    global model
+    if model is None:
+        model = create_model()
+    return model
+
+def create_model() -> OpenAIChatCompletionsModel:
     """Get the appropriate OpenAI client based on configuration."""
     
     if local_model_override:
         # Local model (e.g., Ollama)
         return OpenAIChatCompletionsModel( 
             model=local_model_override,
-            openai_client=AsyncOpenAI(
+            openai_client=instrument_openai(AsyncOpenAI(
                 api_key="localhost",
-                base_url="http://localhost:11434/v1"
-            )
+                base_url=os.environ.get("LOCAL_MODEL_BASE_URL", "http://localhost:11434/v1")
+            ))
         )
     else:
         return OpenAIChatCompletionsModel( 
             model=model_deployment_name,
-            openai_client=AsyncAzureOpenAI(
+            openai_client=instrument_openai(AsyncAzureOpenAI(
                 azure_ad_token_provider=provider,
                 azure_endpoint=chat_endpoint,
                 api_version=api_version or "2024-02-15-preview",
-            )
+            ))
         )
\ No newline at end of file
@@ -0,0 +1,161 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Union
+from utils.context_packing import count_tokens
+from utils.mql import Member, MQLError, extract_mql, parse_mql, walk
+from utils.structured_output import MemberPrediction
+
+def get_window_tokens() -> int:
+    return int(os.environ.get("OPENAI_AGENTS_HISTORY_TOKENS", 2000))
+
+def get_summary_tokens() -> int:
+    return int(os.environ.get("OPENAI_AGENTS_SUMMARY_TOKENS", 500))
+
+def clip(text: str, tokens: int) -> str:
+    """First line of text, cut to roughly the given number of tokens"""
+    line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+    if count_tokens(line) <= tokens:
+        return line
+    return line[:tokens * 4].rstrip() + "..."
+
+def head(text: str, tokens: int) -> str:
+    """Start of text within roughly the given number of tokens"""
+    if count_tokens(text) <= tokens:
+        return text
+    cut = text[:max(tokens, 0) * 4]
+    while cut and count_tokens(cut) > tokens:
+        cut = cut[:len(cut) * 9 // 10]
+    return cut.rstrip() + "..." if cut else ""
+
+def query_members(mql: str) -> Optional[Dict[str, List[str]]]:
+    """Member names per dimension referenced by an MQL query, None if it does not parse"""
+    try:
+        query = parse_mql(mql)
+    except MQLError:
+        return None
+    members = {}
+    for clause in query.clauses:
+        members[clause.dimension] = [node.name for node in walk(clause.expression) if isinstance(node, Member)]
+    return members
+
+class ConversationHistory:
+    """Per-session history sent to the agents with a bounded token cost
+
+    Recent turns are kept verbatim within a token window. Older turns are folded into a
+    short rolling summary, and the facts later turns depend on (selected model, members,
+    last MQL) are kept as structured state, so the input stays flat as a session grows.
+    """
+
+    def __init__(self, window_tokens: int = None, summary_tokens: int = None):
+        self.window_tokens = window_tokens or get_window_tokens()
+        self.summary_tokens = summary_tokens or get_summary_tokens()
+        self.turns: List[List[Dict[str, str]]] = []
+        self.summary: List[str] = []
+        self.folded = 0
+        self.facts: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.turns) + self.folded
+
+    def clear(self):
+        self.turns = []
+        self.summary = []
+        self.folded = 0
+        self.facts = {}
+
+    def state(self) -> Optional[str]:
+        lines = []
+        if "model_id" in self.facts:
+            name = self.facts.get("model_name")
+            lines.append(f"Selected model: {name} (id {self.facts['model_id']})" if name else f"Selected model id: {self.facts['model_id']}")
+        if self.facts.get("members"):
+            lines.append("Members: " + "; ".join(f"{dimension}: {', '.join(names)}" for dimension, names in self.facts["members"].items()))
+        if self.facts.get("mql"):
+            lines.append(f"Last MQL: {self.facts['mql']}")
+        if self.summary:
+            omitted = self.folded - len(self.summary)
+            lines.append("Earlier turns" + (f" ({omitted} older ones omitted)" if omitted > 0 else "") + ":")
+            lines.extend(f"- {line}" for line in self.summary)
+        if not lines:
+            return None
+        return "Conversation state from earlier turns:\n" + "\n".join(lines)
+
+    def build_input(self, message: str) -> Union[str, List[Dict[str, str]]]:
+        """Runner input for a new user message: state, recent turns, then the message"""
+        state = self.state()
+        items = [{"role": "system", "content": state}] if state else []
+        for turn in self.turns:
+            items.extend(turn)
+        if not items:
+            return message
+        return items + [{"role": "user", "content": message}]
+
+    def tokens(self) -> int:
+        return sum(count_tokens(item["content"]) for turn in self.turns for item in turn)
+
+    def record(self, user: str, assistant: str, items: List[Any] = (), prediction: MemberPrediction = None):
+        """Add a completed turn, update the facts from its tool calls and fold what no longer fits"""
+        self.update_facts(items, assistant)
+        if prediction is not None:
+            self.set_prediction(prediction)
+        turn = [{"role": "user", "content": user}]
+        if assistant:
+            turn.append({"role": "assistant", "content": assistant})
+        self.turns.append(turn)
+
+        while len(self.turns) > 1 and self.tokens() > self.window_tokens:
+            self.fold(self.turns.pop(0))
+        if self.tokens() > self.window_tokens:
+            self.fit(turn)
+
+    def fit(self, turn: List[Dict[str, str]]):
+        """Cut a single turn over the window to the head of each message, leaving the answer at least half of it"""
+        answer = turn[1]["content"] if len(turn) > 1 else ""
+        answer_tokens = min(count_tokens(answer), self.window_tokens // 2)
+        turn[0]["content"] = head(turn[0]["content"], self.window_tokens - answer_tokens)
+        if answer:
+            turn[1]["content"] = head(answer, self.window_tokens - count_tokens(turn[0]["content"]))
+
+    def fold(self, turn: List[Dict[str, str]]):
+        user = turn[0]["content"]
+        assistant = turn[1]["content"] if len(turn) > 1 else ""
+        self.summary.append(f"User: {clip(user, 40)} | Answer: {clip(assistant, 60)}" if assistant else f"User: {clip(user, 40)}")
+        self.folded += 1
+        while len(self.summary) > 1 and sum(count_tokens(line) for line in self.summary) > self.summary_tokens:
+            self.summary.pop(0)
+
+    def update_facts(self, items: List[Any], assistant: str):
+        for item in items:
+            if getattr(item, "type", None) != "tool_call_item":
+                continue
+            raw = item.raw_item
+            try:
+                arguments = json.loads(getattr(raw, "arguments", None) or "{}")
+            except ValueError:
+                continue
+            model_id = arguments.get("model_id", arguments.get("id"))
+            if model_id is not None:
+                if model_id != self.facts.get("model_id"):
+                    self.facts.pop("model_name", None)
+                self.facts["model_id"] = model_id
+            if arguments.get("model_name"):
+                self.facts["model_name"] = arguments["model_name"]
+            if getattr(raw, "name", None) == "evaluate_mql" and arguments.get("mql"):
+                self.set_mql(arguments["mql"])
+        # The final answer wins over queries the agent only tried out
+        if assistant and "```" in assistant:
+            self.set_mql(extract_mql(assistant))
+
+    def set_prediction(self, prediction: MemberPrediction):
+        if prediction.model_id is not None:
+            self.facts["model_id"] = prediction.model_id
+        if prediction.model_name:
+            self.facts["model_name"] = prediction.model_name
+        if prediction.members:
+            self.facts["members"] = prediction.by_dimension()
+
+    def set_mql(self, mql: str):
+        members = query_members(mql)
+        if members is not None:
+            self.facts["mql"] = mql
+            self.facts["members"] = members
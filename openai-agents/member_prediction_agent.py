@@ -1,9 +1,11 @@
 from agents import Agent
+from utils.structured_output import MemberPrediction
 from vena_tools import (
     get_model_info, 
     list_models, 
     get_top_level_members, 
     get_children_of_member, 
+    get_children_of_members, 
     search_members
 )
 
@@ -36,9 +38,15 @@ def create_member_prediction_agent():
         Phase 3: Member Search
         5. If a member looks promising, you can use the search_members(model_id: int, dimension_id: int, query: str) function to search members until you have a list of all relevant members.
         6. If you require more information, the query is unclear or there are no obvious candidates, call the get_top_level_members(model_id: int, dimension_number: int) function to start your search from the root of the dimension hierarchy (this will return the top-level members of the dimension).
-        7. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member.
+        7. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member. To expand several members (or several levels) at once, call get_children_of_members(model_id: int, dimension_number: int, member_ids: list[str], depth: int) instead of one call per member.
         8. Once you have a list of members, reflect on the user's question and evaluate if you have enough information to answer the question.
         </instructions>
+        
+        <format>
+        Return the structured member prediction: the model id and name, every predicted member with its dimension, name and alias exactly as the tools returned them, and a clarification question only if you cannot proceed without one.
+        </format>
         """,
-        tools=[get_model_info, list_models, get_top_level_members, get_children_of_member, search_members],
+        tools=[get_model_info, list_models, get_top_level_members, get_children_of_member, get_children_of_members, search_members],
+        # Schema-constrained final output instead of prose
+        output_type=MemberPrediction,
     )   
\ No newline at end of file
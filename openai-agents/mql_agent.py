@@ -1,4 +1,5 @@
 from agents import Agent
+from vena_tools import evaluate_mql
 
 def create_mql_agent():
     """Create an MQL agent that generates syntactically-correct Vena MQL."""
@@ -16,6 +17,7 @@ You are an expert FP&A assistant who writes syntactically-correct Vena MQL.
 • Separate multiple dimension clauses and multiple items inside a clause with a single space.  
 • If a dimension is omitted the query assumes *all* members of that dimension.  
 • When defining a Calculated Member, omit the leading dimension("…": …) wrapper and provide only the member expression.
+• Use evaluate_mql(model_id, mql) to check how many members the query selects per dimension before returning it.
 
 ### Components you may use
 
@@ -82,5 +84,6 @@ Return:
 - Within the Account dimension, all members that are descendants of Net Income, except for children of Cost of Revenue.
 - The members of all other dimensions.
 - This example illustrates how the intersection operator can be used as a filter to include all members under a given parent except the children of one of its children. The same could also be achieved with the union and not operators.
-"""
+""",
+        tools=[evaluate_mql]
     ) 
\ No newline at end of file
@@ -24,4 +24,13 @@ You are a helpful assistant that routes user queries to the appropriate agent.
 </tips>
 """,
         handoffs=[member_prediction_agent, mql_agent]
-    ) 
\ No newline at end of file
+    ) 
+
+# Agents are immutable definitions (run state lives in the Runner), so one graph serves every session
+orchestration_agent = None
+
+def get_orchestration_agent():
+    global orchestration_agent
+    if orchestration_agent is None:
+        orchestration_agent = create_orchestration_agent()
+    return orchestration_agent
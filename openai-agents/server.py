@@ -1,8 +1,31 @@
+import os
 import chainlit as cl
 from agents import ItemHelpers, RunConfig, Runner
 from openai.types.responses import ResponseTextDeltaEvent
-from orchestration_agent import create_orchestration_agent
+from orchestration_agent import get_orchestration_agent
 from chat_service import get_model
+from history import ConversationHistory
+from utils.structured_output import MemberPrediction
+from utils.async_vena_client import close_async_client
+from utils.prefetch import stop_prefetch
+from utils.snapshot_store import load_snapshots, start_snapshot_reload, stop_snapshot_reload
+from utils.tracing import close_tracer, print_trace_stats, traced
+
+@cl.on_app_startup
+async def on_app_startup():
+    """Memory-map stored hierarchy snapshots so member lookups are served locally from the first turn"""
+    load_snapshots()
+    # Snapshots refreshed later by the CLI replace the loaded ones without a restart
+    start_snapshot_reload()
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Close the shared Vena connection pool, report where the time went per stage and flush the trace sinks"""
+    await stop_snapshot_reload()
+    await stop_prefetch()
+    await close_async_client()
+    print_trace_stats()
+    close_tracer()
 
 @cl.set_starters
 async def set_starters():
@@ -28,27 +51,28 @@ async def set_starters():
 @cl.on_chat_start
 async def on_chat_start():
     """Initialize the chat session with the orchestration agent."""
-    # Create the orchestration agent
-    agent = create_orchestration_agent()
+    # The orchestration agent is shared, only the conversation history is per session
+    agent = get_orchestration_agent()
     cl.user_session.set("agent", agent)
     
     # Store the run configuration for Azure OpenAI
     run_config = RunConfig(model=get_model()) 
     cl.user_session.set("run_config", run_config)
     
-    # Initialize conversation history for chat threads
-    cl.user_session.set("conversation_history", [])
+    # Token-bounded conversation history for chat threads
+    cl.user_session.set("conversation_history", ConversationHistory())
     
 @cl.on_message
+@traced("turn", "openai-agents")
 async def on_message(message: cl.Message):
     """Handle incoming user messages with streaming support."""
     agent = cl.user_session.get("agent")
     run_config = cl.user_session.get("run_config")
-    conversation_history = cl.user_session.get("conversation_history")
+    conversation_history: ConversationHistory = cl.user_session.get("conversation_history")
     
     # Handle special commands
     if message.content.strip().lower() in ["/clear", "/reset", "/new"]:
-        cl.user_session.set("conversation_history", [])
+        conversation_history.clear()
         await cl.Message(content="🔄 Conversation history cleared. Starting fresh!").send()
         return
     
@@ -57,20 +81,15 @@ async def on_message(message: cl.Message):
     await response_message.send()
     
     try:
-        # Build input for this turn - include conversation history if it exists
-        if conversation_history:
-            # Add the new user message to the conversation history
-            current_input = conversation_history + [{"role": "user", "content": message.content}]
-        else:
-            # First turn - just use the message content
-            current_input = message.content
+        # Build input for this turn - carried-over state, recent turns and the new message
+        current_input = conversation_history.build_input(message.content)
         
         # Use streaming for better user experience with Azure OpenAI configuration
         result = Runner.run_streamed(
             starting_agent=agent,
             input=current_input,
             run_config=run_config,
-            max_turns=100# Pass the Azure OpenAI configuration
+            max_turns=int(os.environ.get("OPENAI_AGENTS_MAX_TURNS", 100))
         )
         
         # Stream the response as it comes in
@@ -78,11 +97,13 @@ async def on_message(message: cl.Message):
         active_steps = {}  # Track active steps by call_id
         buffered_tokens = []  # Buffer tokens during tool execution
         in_tool_execution = False  # Track if we're currently executing tools
+        structured_output = False  # Agents with an output type stream JSON, rendered once complete
         
         async for event in result.stream_events():
             # When the agent updates, print that
             if event.type == "agent_updated_stream_event":
                 print(f"Agent updated: {event.new_agent.name}")
+                structured_output = event.new_agent.output_type not in (None, str)
                 continue
             # When items are generated, print them
             elif event.type == "run_item_stream_event":
@@ -133,19 +154,21 @@ async def on_message(message: cl.Message):
                 and (token := event.data.delta)
             ):
                 # If we're in tool execution, buffer the token instead of streaming immediately
+                if structured_output:
+                    continue
                 if in_tool_execution:
                     buffered_tokens.append(token)
                 else:
                     await response_message.stream_token(token)
         
-        # Update conversation history for chat threads
-        # Note: We need to collect the complete result for conversation history
-        # For now, we'll store the user input and final response
-        updated_history = conversation_history.copy() if conversation_history else []
-        updated_history.append({"role": "user", "content": message.content})
-        if content:
-            updated_history.append({"role": "assistant", "content": content})
-        cl.user_session.set("conversation_history", updated_history)
+        # Typed member predictions are shown as markdown and carried forward as state
+        prediction = result.final_output if isinstance(result.final_output, MemberPrediction) else None
+        if prediction is not None:
+            content = prediction.to_markdown()
+            await response_message.stream_token(content)
+        
+        # Record the turn; tool calls update the model, members and MQL carried forward
+        conversation_history.record(message.content, content, result.new_items, prediction)
             
     except Exception as e:
         # Handle different types of errors appropriately
@@ -1,8 +1,15 @@
-from utils import vena_client as vc
+from utils.async_vena_client import get_async_client
+from utils.prefetch import start_prefetch
+from typing import List
+from utils.context_packing import compact, pack_members, pack_model, pack_models, pack_search_results, pack_subtree
 from agents import function_tool
+from utils.tracing import traced
+
+# Async function tools: the runner awaits them, so other sessions keep streaming while Vena answers
 
 @function_tool
-def get_model_info(id: int, model_name: str) -> str:
+@traced("tool")
+async def get_model_info(id: int, model_name: str) -> str:
     """Get information about a specific model by its ID
     Args:
         id: int - The ID of the model to get information about
@@ -10,20 +17,25 @@ def get_model_info(id: int, model_name: str) -> str:
     Returns:
         str: JSON string containing model information with id, name, and description
     """
-    return vc.get_model(id, model_name)
+    model = await get_async_client().get_model(id, model_name)
+    # Top-level members of the usual dimensions are fetched during the agent's next model call
+    start_prefetch(id, model_name)
+    return pack_model(model)
 
 @function_tool
-def list_models() -> str:
+@traced("tool")
+async def list_models() -> str:
     """List all available models with their basic information.
     Args:
         None
     Returns:
         str: JSON string containing list of models with id, name, and description
     """
-    return vc.list_models()
+    return pack_models(await get_async_client().list_models())
 
 @function_tool
-def get_top_level_members(model_id: int, dimension_number: int) -> str:
+@traced("tool")
+async def get_top_level_members(model_id: int, dimension_number: int) -> str:
     """Fetch top-level members from a dimension.
     
     Args:
@@ -32,10 +44,11 @@ def get_top_level_members(model_id: int, dimension_number: int) -> str:
     Returns:
         str: JSON string containing list top-level members with id, name, alias, and numChildren
     """
-    return vc.get_children_of_member(model_id, dimension_number, "root")
+    return pack_members(await get_async_client().get_children_of_member(model_id, dimension_number, "root"))
 
 @function_tool
-def get_children_of_member(model_id: int, dimension_number: int, member_id: str) -> str:
+@traced("tool")
+async def get_children_of_member(model_id: int, dimension_number: int, member_id: str) -> str:
     """Fetch child members of a member from a dimension.
     
     Args:
@@ -45,10 +58,26 @@ def get_children_of_member(model_id: int, dimension_number: int, member_id: str)
     Returns:
         str: JSON string containing list child members with id, name, alias, and numChildren
     """
-    return vc.get_children_of_member(model_id, dimension_number, member_id)
+    return pack_members(await get_async_client().get_children_of_member(model_id, dimension_number, member_id))
+
+@function_tool
+@traced("tool")
+async def get_children_of_members(model_id: int, dimension_number: int, member_ids: List[str], depth: int = 1) -> str:
+    """Fetch the children of several members at once, optionally several levels deep.
+    
+    Args:
+        model_id: int - The ID of the model to get child members from
+        dimension_number: int - The number of the dimension to get child members from
+        member_ids: List[str] - The IDs of the members to get child members from
+        depth: int - How many levels below each member to return (default 1)
+    Returns:
+        str: JSON string containing rows of parent, id, name, alias, and numChildren
+    """
+    return pack_subtree(await get_async_client().get_children_of_members(model_id, dimension_number, member_ids, depth))
 
 @function_tool
-def search_members(model_id: int, dimension_id: int, query: str) -> str:
+@traced("tool")
+async def search_members(model_id: int, dimension_id: int, query: str) -> str:
     """Search for members in a model given model ID, dimension ID, and a search query.
     If the query is unclear, use one of the top-level members from the dimension.
     Args:
@@ -58,4 +87,16 @@ def search_members(model_id: int, dimension_id: int, query: str) -> str:
     Returns:
         str: JSON string containing list of members with id, name, alias, and numChildren
     """
-    return vc.search_members(model_id, dimension_id, query) 
\ No newline at end of file
+    return pack_search_results(await get_async_client().search_members(model_id, dimension_id, query))
+
+@function_tool
+@traced("tool")
+async def evaluate_mql(model_id: int, mql: str) -> str:
+    """Count the members an MQL query selects in each dimension, using the local hierarchy.
+    Args:
+        model_id: int - The ID of the model the MQL targets
+        mql: str - The MQL expression to evaluate
+    Returns:
+        str: JSON string containing the member count and example members per dimension
+    """
+    return compact(await get_async_client().evaluate_mql(model_id, mql))
\ No newline at end of file
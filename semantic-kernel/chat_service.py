@@ -3,6 +3,7 @@ from openai import AsyncOpenAI
 from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion, AzureChatCompletion
 from azure.identity import EnvironmentCredential, get_bearer_token_provider
 from dotenv import load_dotenv
+from utils.tracing import instrument_openai
 
 load_dotenv()
 
@@ -12,11 +13,20 @@ model_deployment_name=os.getenv("OPENAI_DEPLOYMENT_NAME")
 api_version=os.getenv("OPENAI_API_VERSION")
 provider = get_bearer_token_provider(EnvironmentCredential(), "https://cognitiveservices.azure.com/.default")
 
+# One service (and HTTP client) shared by every agent in the process, built on first use
+chat_service = None
+
 def get_chat_service():
+    global chat_service
+    if chat_service is None:
+        chat_service = create_chat_service()
+    return chat_service
+
+def create_chat_service():
     if local_model_override:
         chat_service = OpenAIChatCompletion(service_id="chat_service", ai_model_id=local_model_override, async_client=AsyncOpenAI(
             api_key="localhost",
-            base_url="http://localhost:11434/v1"
+            base_url=os.environ.get("LOCAL_MODEL_BASE_URL", "http://localhost:11434/v1")
         ))
     else:
         chat_service = AzureChatCompletion(
@@ -26,4 +36,6 @@ def get_chat_service():
             deployment_name=model_deployment_name,
             api_version=api_version
         )
+    # Every completion is timed and its token usage recorded as an "llm" trace span
+    instrument_openai(chat_service.client)
     return chat_service
\ No newline at end of file
@@ -22,7 +22,7 @@ def get_member_prediction_agent():
         Phase 2: Member Search
         2. If a member looks promising, you can use the search_members(model_id: int, dimension_id: int, query: str) function to search members until you have a list of all relevant members.
         3. If you require more information, the query is unclear or there are no obvious candidates, call the get_top_level_members(model_id: int, dimension_number: int) function to start your search from the root of the dimension hierarchy (this will return the top-level members of the dimension).
-        4. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member.
+        4. If none of the top-level members look promising, you can call the get_children_of_member(model_id: int, dimension_number: int, member_id: str) function to continue drilling down to get the child members of each top-level member. To expand several members (or several levels) at once, call get_children_of_members(model_id: int, dimension_number: int, member_ids: list[str], depth: int) instead of one call per member.
         5. Once you have a list of members, reflect on the user's question and evaluate if you have enough information to answer the question.
         </instructions>
         
@@ -1,67 +1,90 @@
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
-import sys
-import os
-
-# Add the utils directory to the path to import vena_client
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils'))
-import vena_client as vc
+from utils.tracing import traced
+from utils.async_vena_client import get_async_client
+from utils.prefetch import start_prefetch
+from typing import List
+from utils.context_packing import pack_members, pack_model, pack_models, pack_search_results, pack_subtree
 
 class ModelQueryPlugin:
-    """Plugin for querying and searching model information"""
+    """Plugin for querying and searching model information
+
+    Kernel functions are async so a slow search does not hold up other sessions' streams.
+    """
 
     @kernel_function(
         description="Get information about a specific model by its ID",
         name="get_model_info"
     )
-    def get_model_info(
+    @traced("tool")
+    async def get_model_info(
         self, 
         id: int,
         model_name: str,
     ) -> str:
-        return vc.get_model(id, model_name)
+        model = await get_async_client().get_model(id, model_name)
+        start_prefetch(id, model_name)
+        return pack_model(model)
 
     @kernel_function(
         description="List all available models with their basic information",
         name="list_models"
     )
-    def list_models(self) -> str:
+    @traced("tool")
+    async def list_models(self) -> str:
         """
         List all available models with their basic information.
         
         Returns:
             str: JSON string containing list of models with id, name, and description
         """
-        return vc.list_models()
+        return pack_models(await get_async_client().list_models())
     
     @kernel_function(
         description="Fetch top-level members from a dimension",
         name="get_top_level_members"
     )
-    def get_top_level_members(self, model_id: int, dimension_number: int) -> str:
+    @traced("tool")
+    async def get_top_level_members(self, model_id: int, dimension_number: int) -> str:
         """
         Fetch top-level members from a dimension.
         
         Returns:
             str: JSON string containing list top-level members with id, name, alias, and numChildren
         """
-        return vc.get_children_of_member(model_id, dimension_number, "root")
+        return pack_members(await get_async_client().get_children_of_member(model_id, dimension_number, "root"))
     
     @kernel_function(
         description="Fetch child members of a member from a dimension",
         name="get_children_of_member"
     )
-    def get_children_of_member(self, model_id: int, dimension_number: int, member_id: str) -> str:
+    @traced("tool")
+    async def get_children_of_member(self, model_id: int, dimension_number: int, member_id: str) -> str:
         """
         Fetch child members of a member from a dimension.
         
         Returns:
             str: JSON string containing list child members with id, name, alias, and numChildren
         """
-        return vc.get_children_of_member(model_id, dimension_number, member_id)
+        return pack_members(await get_async_client().get_children_of_member(model_id, dimension_number, member_id))
+    
+    @kernel_function(
+        description="Fetch the children of several members of a dimension at once, optionally several levels deep (depth, default 1)",
+        name="get_children_of_members"
+    )
+    @traced("tool")
+    async def get_children_of_members(self, model_id: int, dimension_number: int, member_ids: List[str], depth: int = 1) -> str:
+        """
+        Fetch the children of several members at once.
+        
+        Returns:
+            str: JSON string containing rows of parent, id, name, alias, and numChildren
+        """
+        return pack_subtree(await get_async_client().get_children_of_members(model_id, dimension_number, member_ids, depth))
     
     @kernel_function(
         description="Search for members in a model given model ID, dimension ID, and a search query.  If the query is unclear, use one of the top-level members from the dimension.",
         name="search_members"
     )
-    def search_members(self, model_id: int, dimension_id: int, query: str) -> str:
-        return vc.search_members(model_id, dimension_id, query)
\ No newline at end of file
+    @traced("tool")
+    async def search_members(self, model_id: int, dimension_id: int, query: str) -> str:
+        return pack_search_results(await get_async_client().search_members(model_id, dimension_id, query))
\ No newline at end of file
@@ -1,15 +1,26 @@
 from semantic_kernel.agents import ChatCompletionAgent
 from chat_service import get_chat_service
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
-from utils import vena_client as vc
+from utils.tracing import traced
+from utils.async_vena_client import get_async_client
+from utils.context_packing import compact
 
 class MQLValidationPlugin:
     @kernel_function(
         description="Validate an MQL query against a model given the model ID and MQL expression to ensure it is correct",
         name="validate_mql"
     )
-    def validate_mql(self, model_id: int, mql: str) -> str:
-        return vc.validate_mql(model_id, mql)
+    @traced("tool")
+    async def validate_mql(self, model_id: int, mql: str) -> str:
+        return await get_async_client().validate_mql(model_id, mql)
+
+    @kernel_function(
+        description="Count the members a valid MQL query selects in each dimension of the model, with a few example members",
+        name="evaluate_mql"
+    )
+    @traced("tool")
+    async def evaluate_mql(self, model_id: int, mql: str) -> str:
+        return compact(await get_async_client().evaluate_mql(model_id, mql))
 
 def get_mql_agent():
     return ChatCompletionAgent(
@@ -26,6 +37,7 @@ def get_mql_agent():
         dimension("<Dimension Name>": <Member Expression>)
     • Separate multiple dimension clauses and multiple items inside a clause with a single space.  
     • You can use the validate_mql(model_id: int, mql: str) function to validate the MQL expression.
+    • Once the MQL is valid, use the evaluate_mql(model_id: int, mql: str) function to check how many members it selects per dimension.
 
     ### Function behaviour
     children            → direct children of the member  
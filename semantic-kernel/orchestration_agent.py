@@ -1,11 +1,30 @@
 from semantic_kernel import Kernel
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
+from utils.tracing import traced
 from mql_agent import get_mql_agent
 from member_prediction_agent import get_member_prediction_agent
 from semantic_kernel.agents import ChatCompletionAgent
 from chat_service import get_chat_service
 import chainlit as cl
-from utils import vena_client as vc
+from utils.async_vena_client import get_async_client
+from utils.context_packing import pack_model, pack_models
+
+# Delegate agents hold no conversation state (that lives in the session's thread), so one
+# instance of each serves every session instead of being rebuilt on every delegated call
+agent_factories = {
+    "member_prediction": get_member_prediction_agent,
+    "mql": get_mql_agent
+}
+shared_agents = {}
+
+def get_shared_agent(name: str) -> ChatCompletionAgent:
+    agent = shared_agents.get(name)
+    if agent is None:
+        agent = agent_factories[name]()
+        # The filter resolves the current Chainlit session when a function runs, so it is attached once
+        cl.SemanticKernelFilter(kernel=agent.kernel)
+        shared_agents[name] = agent
+    return agent
 
 class OrchestrationPlugin:
     
@@ -13,25 +32,27 @@ class OrchestrationPlugin:
         description="Get information about a specific model by its ID",
         name="get_model_info"
     )
-    def get_model_info(
+    @traced("tool")
+    async def get_model_info(
         self, 
         id: int,
         model_name: str,
     ) -> str:
-        return vc.get_model(id, model_name)
+        return pack_model(await get_async_client().get_model(id, model_name))
 
     @kernel_function(
         description="List all available models with their basic information",
         name="list_models"
     )
-    def list_models(self) -> str:
+    @traced("tool")
+    async def list_models(self) -> str:
         """
         List all available models with their basic information.
         
         Returns:
             str: JSON string containing list of models with id, name, and description
         """
-        return vc.list_models()
+        return pack_models(await get_async_client().list_models())
     
     @kernel_function(
         description="""
@@ -40,14 +61,13 @@ class OrchestrationPlugin:
         """,
         name="get_member_prediction"
     )
-    def get_member_prediction(
+    @traced("tool")
+    async def get_member_prediction(
         self, 
         query: str,
     ) -> str:
         thread = cl.user_session.get("thread")
-        member_prediction_agent = get_member_prediction_agent()
-        cl.SemanticKernelFilter(kernel=member_prediction_agent.kernel)
-        return member_prediction_agent.get_response(message=query, thread=thread)
+        return await get_shared_agent("member_prediction").get_response(message=query, thread=thread)
     
     @kernel_function(
         description="""
@@ -58,12 +78,11 @@ class OrchestrationPlugin:
         """,
         name="generate_mql"
     )
-    def generate_mql(self, query: str, members: list[dict]) -> str:
+    @traced("tool")
+    async def generate_mql(self, query: str, members: list[dict]) -> str:
         thread = cl.user_session.get("thread")
-        mql_agent = get_mql_agent()
-        cl.SemanticKernelFilter(kernel=mql_agent.kernel)
         request = f"Given the user query: {query} and the list of members: {members}, generate syntactically-correct Vena MQL"
-        return mql_agent.get_response(message=request, thread=thread)
+        return await get_shared_agent("mql").get_response(message=request, thread=thread)
     
 def get_orchestration_agent():
     return ChatCompletionAgent(
@@ -5,6 +5,11 @@ from semantic_kernel.contents import ChatMessageContent
 from semantic_kernel.connectors.mcp import MCPStdioPlugin
 from semantic_kernel.contents import ChatHistory
 from orchestration_agent import get_orchestration_agent
+from utils.async_vena_client import close_async_client
+from utils.prefetch import stop_prefetch
+from utils.prewarm import start_prewarm, stop_prewarm
+from utils.snapshot_store import load_snapshots, start_snapshot_reload, stop_snapshot_reload
+from utils.tracing import close_tracer, print_trace_stats, traced
 
 # Globals for plugin and its context manager
 time_plugin: MCPStdioPlugin | None = None
@@ -16,6 +21,18 @@ def agent_response_callback(message: ChatMessageContent) -> None:
 @cl.on_app_startup
 async def on_app_startup():
     global time_plugin
+    # Memory-map stored hierarchy snapshots so member lookups are served locally from the first turn
+    load_snapshots()
+    start_snapshot_reload()
+    exit_stack.push_async_callback(stop_snapshot_reload)
+    # Warm models, dimensions and top-level members in the background, refreshed periodically
+    exit_stack.push_async_callback(close_async_client)
+    exit_stack.push_async_callback(stop_prefetch)
+    start_prewarm()
+    exit_stack.push_async_callback(stop_prewarm)
+    # Print where the time went per stage on shutdown, then flush the trace sinks
+    exit_stack.callback(close_tracer)
+    exit_stack.callback(print_trace_stats)
     time_plugin = await exit_stack.enter_async_context(
         MCPStdioPlugin(
             name="Time",
@@ -58,6 +75,7 @@ async def on_chat_start():
     cl.user_session.set("thread", thread)
 
 @cl.on_message
+@traced("turn", "semantic-kernel")
 async def on_message(message: cl.Message):
     agent: ChatCompletionAgent = cl.user_session.get("agent")
     thread: ChatHistoryAgentThread = cl.user_session.get("thread")
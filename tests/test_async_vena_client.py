@@ -0,0 +1,37 @@
+import tempfile
+import httpx
+import pytest
+from utils import async_vena_client
+from utils.async_vena_client import AsyncVenaClient
+
+class BrokenStream(httpx.AsyncByteStream):
+    """A hierarchy export whose connection drops after the first block"""
+
+    async def __aiter__(self):
+        yield b"_dim,_member_id,_member_name\n"
+        raise httpx.ReadTimeout("connection dropped")
+
+def client(transport: httpx.MockTransport) -> AsyncVenaClient:
+    vena = AsyncVenaClient(endpoint="http://vena.test", user="test", key="test")
+    vena.client = httpx.AsyncClient(base_url=vena.endpoint, transport=transport)
+    return vena
+
+async def test_failed_hierarchy_stream_closes_the_spool(monkeypatch):
+    spools = []
+    temporary_file = tempfile.TemporaryFile
+    def spool():
+        spools.append(temporary_file())
+        return spools[-1]
+    monkeypatch.setattr(async_vena_client.tempfile, "TemporaryFile", spool)
+    vena = client(httpx.MockTransport(lambda request: httpx.Response(200, stream=BrokenStream())))
+    with pytest.raises(httpx.ReadTimeout):
+        await vena.spool_hierarchy(7)
+    await vena.client.aclose()
+    assert len(spools) == 1
+    assert spools[0].closed
+
+async def test_hierarchy_stream_is_spooled_from_the_start():
+    vena = client(httpx.MockTransport(lambda request: httpx.Response(200, content=b"_dim\nAccount\n")))
+    with await vena.spool_hierarchy(7) as spool:
+        assert spool.read() == b"_dim\nAccount\n"
+    await vena.client.aclose()
@@ -0,0 +1,120 @@
+"""Other sessions keep streaming while one session's member search waits on Vena
+
+The fake Vena API answers searches slowly while simulated sessions stream a token every few
+milliseconds on the event loop. A tool that blocks the loop freezes every stream for about
+as long as the search takes, so the longest gap between tokens must stay far below it.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import time
+import pytest
+from utils import vena_client
+from utils.async_vena_client import close_async_client, get_async_client
+from utils.context_packing import get_encoding
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+from fake_vena import start_fake_vena
+
+SEARCH_LATENCY = 1.0
+INTERVAL = 0.02
+SESSIONS = 8
+# Streams may pause for scheduling noise, but never for a large share of the search
+ALLOWED_GAP = INTERVAL + max(INTERVAL * 5, SEARCH_LATENCY * 0.25)
+# Account dimension of the first synthetic model
+SEARCH = {"model_id": 1, "dimension_id": 101, "query": "Revenue"}
+
+def load(framework: str, module: str):
+    """A framework's module under a unique name, since the frameworks share module names"""
+    spec = importlib.util.spec_from_file_location(f"{framework}_{module}".replace("-", "_"), os.path.join(ROOT, framework, f"{module}.py"))
+    loaded = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(loaded)
+    return loaded
+
+def agno_search():
+    pytest.importorskip("agno")
+    tools = load("agno", "vena_tools").VenaTools()
+    return lambda: tools.search_members(**SEARCH)
+
+def openai_agents_search():
+    pytest.importorskip("agents")
+    from agents.tool_context import ToolContext
+    tool = load("openai-agents", "vena_tools").search_members
+    return lambda: tool.on_invoke_tool(ToolContext(context=None, tool_call_id="test"), json.dumps(SEARCH))
+
+def semantic_kernel_search():
+    pytest.importorskip("semantic_kernel")
+    plugin = load("semantic-kernel", "model_query_plugin").ModelQueryPlugin()
+    return lambda: plugin.search_members(**SEARCH)
+
+async def blocking_search():
+    # The synchronous client called on the loop, as the tools used to
+    return vena_client.search_members(**SEARCH)
+
+SEARCHES = {
+    "agno": agno_search,
+    "openai-agents": openai_agents_search,
+    "semantic-kernel": semantic_kernel_search
+}
+
+@pytest.fixture(scope="module")
+def vena():
+    server = start_fake_vena(latency=0, route_latency={"search": SEARCH_LATENCY})
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+async def slow_vena(vena, monkeypatch):
+    monkeypatch.setenv("VENA_ENDPOINT", vena.url)
+    monkeypatch.setenv("VENA_USER", "test")
+    monkeypatch.setenv("VENA_KEY", "test")
+    # The shared async client reads the endpoint when it is created, and creating it loads
+    # certificates on the loop, so a fresh one is built before anything is timed
+    await close_async_client()
+    get_async_client()
+    # So does loading the tokenizer that packs tool results, once per process
+    get_encoding()
+    yield vena
+    await close_async_client()
+
+async def stream(stop: asyncio.Event) -> list:
+    """One session streaming tokens; returns the gaps between consecutive tokens"""
+    gaps = []
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(INTERVAL)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+    return gaps
+
+async def search_while_streaming(search) -> tuple:
+    """Seconds the search took and the longest gap between streamed tokens meanwhile"""
+    stop = asyncio.Event()
+    streams = [asyncio.create_task(stream(stop)) for _ in range(SESSIONS)]
+    await asyncio.sleep(INTERVAL * 10)
+    started = time.perf_counter()
+    await search()
+    seconds = time.perf_counter() - started
+    await asyncio.sleep(INTERVAL * 10)
+    stop.set()
+    gaps = [gap for gaps in await asyncio.gather(*streams) for gap in gaps]
+    return seconds, max(gaps)
+
+@pytest.mark.parametrize("framework", SEARCHES)
+async def test_search_tool_keeps_other_sessions_streaming(framework, slow_vena):
+    # Importing and building the tools blocks for a while, so it happens before anything is timed
+    search = SEARCHES[framework]()
+    seconds, max_gap = await search_while_streaming(search)
+    # The fake Vena API varies its latency by up to a fifth
+    assert seconds >= SEARCH_LATENCY * 0.75
+    assert max_gap <= ALLOWED_GAP
+
+async def test_blocking_search_stalls_streams(slow_vena):
+    # The probe itself: a search on the loop does show up as a stall
+    seconds, max_gap = await search_while_streaming(blocking_search)
+    assert max_gap >= SEARCH_LATENCY * 0.5
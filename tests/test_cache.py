@@ -0,0 +1,39 @@
+import time
+from utils.cache import TTLCache
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set(("model", 1), "a")
+    cache.set(("model", 2), "b")
+    assert cache.get(("model", 1)) == "a"
+    cache.set(("model", 3), "c")
+    assert cache.get(("model", 2)) is None
+    assert cache.get(("model", 1)) == "a"
+    assert cache.stats()["evictions"] == 1
+
+def test_expired_entries_are_misses():
+    cache = TTLCache(ttl=60)
+    cache.set(("models",), "fresh")
+    cache.set(("model", 1), "stale", ttl=-1)
+    assert cache.get(("models",)) == "fresh"
+    assert cache.get(("model", 1)) is None
+    assert cache.stats()["size"] == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+def test_invalidate_drops_a_key_prefix():
+    cache = TTLCache()
+    cache.set(("model", 1), "a")
+    cache.set(("children", 1, 101, "root"), "b")
+    cache.set(("children", 2, 101, "root"), "c")
+    assert cache.invalidate("children", 1) == 1
+    assert cache.get(("children", 2, 101, "root")) == "c"
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+def test_ttl_is_measured_from_the_last_set():
+    cache = TTLCache(ttl=0.05)
+    cache.set(("model", 1), "a")
+    time.sleep(0.06)
+    assert cache.get(("model", 1)) is None
+    cache.set(("model", 1), "b")
+    assert cache.get(("model", 1)) == "b"
@@ -0,0 +1,36 @@
+import json
+from utils.context_packing import count_tokens, pack_records, pack_search_results
+
+def members(count: int) -> list:
+    return [
+        {"type": "MEMBER", "id": str(number), "name": f"Department {number}", "alias": f"Dept {number}", "numChildren": 0, "score": number}
+        for number in range(count)
+    ]
+
+def attributes(count: int) -> list:
+    return [{"type": "ATTRIBUTE", "name": f"Region Attribute {number}"} for number in range(count)]
+
+def test_rows_beyond_the_budget_are_counted_as_omitted():
+    packed = json.loads(pack_records(members(200), ["id", "name"], budget=100))
+    assert packed["fields"] == ["id", "name"]
+    assert 0 < len(packed["rows"]) < 200
+    assert packed["omitted"] == 200 - len(packed["rows"])
+
+def test_search_results_rank_members_by_score():
+    packed = json.loads(pack_search_results(members(3)))
+    assert [row[0] for row in packed["rows"]] == ["2", "1", "0"]
+    assert "attributes" not in packed
+
+def test_large_attribute_lists_stay_within_the_budget():
+    packed = pack_search_results(members(50) + attributes(500), budget=300)
+    assert count_tokens(packed) <= 300
+    result = json.loads(packed)
+    assert 0 < len(result["attributes"]) < 500
+    assert result["attributes_omitted"] == 500 - len(result["attributes"])
+    # Members keep most of the budget
+    assert len(result["rows"]) > len(result["attributes"])
+
+def test_few_attributes_are_kept_whole():
+    result = json.loads(pack_search_results(members(2) + attributes(3)))
+    assert result["attributes"] == ["Region Attribute 0", "Region Attribute 1", "Region Attribute 2"]
+    assert "attributes_omitted" not in result
@@ -0,0 +1,53 @@
+import pandas as pd
+from utils.hierarchy_index import HIERARCHY_COLUMNS, HierarchyIndex, get_hierarchy_index, register_hierarchy_index, unregister_hierarchy_index
+
+DIMENSIONS = [{"name": "Account", "number": 1, "id": 101}]
+# Export order, with Service Sales shared under Revenue and Expenses
+RECORDS = [
+    ("Account", 1, "Net Income", None, None, None),
+    ("Account", 2, "Revenue", "Rev", 1, None),
+    ("Account", 3, "Product Sales", None, 2, None),
+    ("Account", 4, "Service Sales", None, 2, None),
+    ("Account", 5, "Expenses", None, 1, None),
+    ("Account", 6, "Salaries", None, None, "Expenses"),
+    ("Account", 4, "Service Sales", None, 5, None)
+]
+
+def build():
+    return HierarchyIndex.from_records(7, DIMENSIONS, RECORDS)
+
+def test_nodes_are_laid_out_in_preorder():
+    dimension = build().dimension_by_name("account")
+    assert list(dimension.names) == ["Net Income", "Revenue", "Product Sales", "Service Sales", "Expenses", "Salaries", "Service Sales"]
+    revenue = dimension.find_by_name("Revenue")
+    assert list(dimension.descendants(revenue)) == [2, 3]
+    assert dimension.ancestors(dimension.find_by_name("Salaries")) == [4, 0]
+    assert [dimension.names[node] for node in dimension.bottom_level(0)] == ["Product Sales", "Service Sales", "Salaries", "Service Sales"]
+
+def test_lookups_by_name_alias_and_id():
+    dimension = build().dimension_by_id(101)
+    assert dimension.find_by_name(" rev ") == dimension.find_by_name("Revenue") == 1
+    assert dimension.find_by_id("5") == 4
+    assert dimension.find_by_id("not a number") is None
+    # A shared member resolves to its first placement
+    assert dimension.find_by_id(4) == 3
+
+def test_children_match_the_vena_api_shape():
+    index = build()
+    assert index.get_children(1, "root") == [{"id": "1", "name": "Net Income", "alias": "Net Income", "numChildren": 2}]
+    assert [member["name"] for member in index.get_children(1, "5")] == ["Salaries", "Service Sales"]
+    assert index.get_children(1, "999") is None
+    assert index.get_children(2, "root") is None
+
+def test_dataframe_chunks_build_the_same_index():
+    frames = [pd.DataFrame(RECORDS[:3], columns=HIERARCHY_COLUMNS), pd.DataFrame(RECORDS[3:], columns=HIERARCHY_COLUMNS)]
+    index = HierarchyIndex.from_frames(7, DIMENSIONS, frames)
+    assert list(index.dimension(1).names) == list(build().dimension(1).names)
+
+def test_registered_indexes_serve_lookups_by_model_id():
+    register_hierarchy_index(build())
+    try:
+        assert get_hierarchy_index("7") is not None
+    finally:
+        unregister_hierarchy_index(7)
+    assert get_hierarchy_index(7) is None
@@ -0,0 +1,38 @@
+import importlib.util
+import os
+from utils.context_packing import count_tokens
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+spec = importlib.util.spec_from_file_location("openai_agents_history", os.path.join(ROOT, "openai-agents", "history.py"))
+history = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(history)
+
+def words(count: int, word: str = "revenue") -> str:
+    return " ".join(f"{word}{number}" for number in range(count))
+
+def test_old_turns_fold_into_the_summary():
+    conversation = history.ConversationHistory(window_tokens=60, summary_tokens=1000)
+    for turn in range(4):
+        conversation.record(f"Question {turn} {words(10)}", f"Answer {turn} {words(10, 'expense')}")
+    assert len(conversation) == 4
+    assert conversation.tokens() <= 60
+    assert conversation.summary[0].startswith("User: Question 0")
+    assert conversation.build_input("Next")[-1] == {"role": "user", "content": "Next"}
+
+def test_long_question_is_clipped_and_keeps_the_start_of_the_answer():
+    conversation = history.ConversationHistory(window_tokens=100)
+    question = "Start of the question " + words(400)
+    answer = "Top revenue was in Sales. " + words(400, "expense")
+    conversation.record(question, answer)
+    user, assistant = conversation.turns[0]
+    assert user["content"].startswith("Start of the question")
+    assert assistant["content"].startswith("Top revenue was in Sales.")
+    assert count_tokens(assistant["content"]) >= 45
+    assert conversation.tokens() <= 105
+
+def test_short_question_leaves_the_rest_of_the_window_to_the_answer():
+    conversation = history.ConversationHistory(window_tokens=100)
+    conversation.record("Top revenue?", words(400))
+    user, assistant = conversation.turns[0]
+    assert user["content"] == "Top revenue?"
+    assert count_tokens(assistant["content"]) >= 90
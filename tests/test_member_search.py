@@ -0,0 +1,126 @@
+import pytest
+from utils import vena_client
+from utils.cache import metadata_cache
+from utils.hierarchy_index import HierarchyIndex, register_hierarchy_index, unregister_hierarchy_index
+from utils.member_search import MemberSearchIndex, get_search_index, learn_attributes, set_attributes
+from utils.mql_evaluator import resolve_mql
+
+DIMENSIONS = [{"name": "Department", "number": 1, "id": 101}]
+MEMBERS = [
+    (1, "All Departments", None),
+    (2, "Sales", 1),
+    (3, "Marketing", 1),
+    (4, "Finance", 1)
+]
+SUGGESTIONS = [
+    {"type": "ATTRIBUTE", "name": "Customer Facing", "numMembers": 2, "members": ["Sales", "Marketing"]},
+    # Truncated membership is suggested but not kept for MQL
+    {"type": "ATTRIBUTE", "name": "Cost Center", "numMembers": 40, "members": ["Finance"]}
+]
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
+
+def build():
+    return HierarchyIndex.from_records(7, DIMENSIONS, [
+        ("Department", member_id, name, None, parent_id, None) for member_id, name, parent_id in MEMBERS
+    ])
+
+def accounts():
+    # Revenue is shared under Total Revenue and Operating Expenses
+    return MemberSearchIndex(HierarchyIndex.from_records(7, [{"name": "Account", "number": 1, "id": 101}], [
+        ("Account", 1, "Total Revenue", None, None, None),
+        ("Account", 2, "Revenue", "Sales Revenue", 1, None),
+        ("Account", 3, "Product Revenue", None, 1, None),
+        ("Account", 4, "Operating Expenses", "OpEx", None, None),
+        ("Account", 2, "Revenue", "Sales Revenue", 4, None)
+    ]).dimension_by_name("Account"))
+
+def test_exact_names_and_aliases_rank_first():
+    search_index = accounts()
+    assert [result["name"] for result in search_index.search("revenue")] == ["Revenue", "Total Revenue", "Product Revenue"]
+    assert search_index.search("OPEX")[0]["name"] == "Operating Expenses"
+    assert search_index.search("sales")[0]["name"] == "Revenue"
+    # Shared members are found once
+    assert [result["id"] for result in search_index.search("revenue")].count("2") == 1
+
+def test_typos_and_partial_words_still_match():
+    search_index = accounts()
+    assert "Revenue" in [result["name"] for result in search_index.search("Revnue", 2)]
+    assert search_index.search("oper")[0]["name"] == "Operating Expenses"
+    assert search_index.search("") == []
+    assert len(search_index.search("revenue", 1)) == 1
+
+def test_attributes_are_searched_by_name():
+    dimension = build().dimension_by_name("Department")
+    set_attributes(dimension, {"Customer Facing": [2, 3]})
+    results = get_search_index(dimension).search("customer")
+    assert results[-1] == {"type": "ATTRIBUTE", "name": "Customer Facing", "numMembers": 2, "members": ["Sales", "Marketing"]}
+    assert get_search_index(dimension).complete_attributes
+
+def test_learned_attributes_are_added_without_losing_known_ones():
+    dimension = build().dimension_by_name("Department")
+    set_attributes(dimension, {"Back Office": [4]}, complete=False)
+    assert learn_attributes(dimension, SUGGESTIONS) == 1
+    search_index = get_search_index(dimension)
+    assert set(search_index.attribute_members) == {"Back Office", "Customer Facing"}
+    assert not search_index.complete_attributes
+
+def test_indexed_search_still_suggests_vena_attributes(monkeypatch):
+    index = build()
+    calls = []
+    def fetch(model_id, dimension_id, query, payload=vena_client.search_payload):
+        calls.append(payload(model_id, dimension_id, query))
+        return SUGGESTIONS
+    monkeypatch.setattr(vena_client, "fetch_search_results", fetch)
+    register_hierarchy_index(index)
+    try:
+        results = vena_client.search_members(7, 101, "Sales")
+        # Repeated queries are cached, and attributes learned from the suggestions are answered locally
+        assert vena_client.search_members(7, 101, "Sales") == results
+        customer = vena_client.search_members(7, 101, "customer")
+    finally:
+        unregister_hierarchy_index(7)
+    assert results[0]["name"] == "Sales"
+    assert [result["name"] for result in results if result["type"] == "ATTRIBUTE"] == ["Customer Facing", "Cost Center"]
+    assert [result["name"] for result in customer if result["type"] == "ATTRIBUTE"] == ["Customer Facing"]
+    # Only the attributes are asked for, once; the members come from the local index
+    assert len(calls) == 1
+    assert [query["type"] for query in calls[0]] == ["ATTRIBUTE"]
+
+def test_vena_attribute_suggestions_are_capped_at_the_search_limit(monkeypatch):
+    suggestions = [{"type": "ATTRIBUTE", "name": f"Region {number}", "numMembers": 0} for number in range(500)]
+    monkeypatch.setenv("VENA_SEARCH_LIMIT", "5")
+    monkeypatch.setattr(vena_client, "fetch_search_results", lambda *args, **kwargs: suggestions)
+    register_hierarchy_index(build())
+    try:
+        results = vena_client.search_members(7, 101, "Region")
+    finally:
+        unregister_hierarchy_index(7)
+    assert len([result for result in results if result["type"] == "ATTRIBUTE"]) == 5
+
+def test_failed_attribute_search_keeps_the_local_members(monkeypatch):
+    def fail(*args, **kwargs):
+        raise Exception("Vena is down")
+    monkeypatch.setattr(vena_client, "fetch_search_results", fail)
+    register_hierarchy_index(build())
+    try:
+        results = vena_client.search_members(7, 101, "Finance")
+    finally:
+        unregister_hierarchy_index(7)
+    assert [result["name"] for result in results] == ["Finance"]
+
+def test_mql_attribute_resolves_through_vena_suggestions(monkeypatch):
+    index = build()
+    monkeypatch.setattr(vena_client, "fetch_search_results", lambda *args, **kwargs: SUGGESTIONS)
+    register_hierarchy_index(index)
+    try:
+        summary = vena_client.evaluate_mql(7, "dimension('Department': attribute(@'Customer Facing'))")
+    finally:
+        unregister_hierarchy_index(7)
+    assert summary["dimensions"][0]["sample"] == ["Sales", "Marketing"]
+    selection = resolve_mql("dimension('Department': attribute(@'customer facing'))", index)
+    assert selection["Department"].member_ids() == [2, 3]
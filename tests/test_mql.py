@@ -0,0 +1,62 @@
+import pytest
+from utils.hierarchy_index import HierarchyIndex
+from utils.mql import Attribute, Function, Member, MQLError, Operator, extract_mql, parse_mql, validate_locally, walk
+
+DIMENSIONS = [{"name": "Account", "number": 1, "id": 101}, {"name": "Year", "number": 2, "id": 102}]
+
+def build():
+    return HierarchyIndex.from_records(7, DIMENSIONS, [
+        ("Account", 1, "Revenue", None, None, None),
+        ("Account", 2, "Product Sales", None, 1, None),
+        ("Year", 10, "2022", "FY22", None, None)
+    ])
+
+def test_clauses_parse_into_an_expression_tree():
+    query = parse_mql("dimension('Account': union(children('Revenue') attribute(@'Customer Facing')))\ndimension('Year': '2022')")
+    assert [clause.dimension for clause in query.clauses] == ["Account", "Year"]
+    nodes = list(walk(query.clauses[0].expression))
+    assert [type(node) for node in nodes] == [Operator, Function, Member, Attribute]
+    assert nodes[2].name == "Revenue"
+    assert nodes[3].name == "Customer Facing"
+
+def test_quotes_are_escaped_by_doubling():
+    assert parse_mql("'Owner''s Equity'").expression.name == "Owner's Equity"
+
+def test_bare_member_expression_for_calculated_members():
+    query = parse_mql("subtract('Revenue' 'Product Sales')")
+    assert query.clauses == []
+    assert [operand.name for operand in query.expression.operands] == ["Revenue", "Product Sales"]
+
+@pytest.mark.parametrize("mql, message", [
+    ("dimension('Account' 'Revenue')", "Expected ':' but found 'Revenue' at line 1, column 21"),
+    ("dimension('Account': children('Revenue')", "Expected ')' but found end of query"),
+    ("dimension('Account': 'Revenue)", "Unterminated quoted name"),
+    ("dimension('Account': sibling('Revenue'))", "Unknown function or operator 'sibling'"),
+    ("dimension('Account': subtract('Revenue'))", "subtract() takes exactly 2 arguments, got 1"),
+    ("'Revenue' 'Product Sales'", "Unexpected 'Product Sales' after the member expression")
+])
+def test_syntax_errors_name_the_position(mql, message):
+    with pytest.raises(MQLError) as error:
+        parse_mql(mql)
+    assert message in str(error.value)
+
+def test_errors_on_later_lines_report_the_line():
+    with pytest.raises(MQLError) as error:
+        parse_mql("dimension('Account': 'Revenue')\ndimension('Year': ?)")
+    assert (error.value.line, error.value.column) == (2, 19)
+
+def test_local_validation_checks_names_against_the_index():
+    index = build()
+    assert validate_locally("dimension('account': children('revenue')) dimension('Year': 'FY22')", index) == []
+    errors = validate_locally("dimension('Account': 'Revnue') dimension('Period': '2022') dimension('Account': 'Revenue')", index)
+    assert [error.message for error in errors] == [
+        "Unknown dimension 'Period' (known dimensions: 'Account', 'Year')",
+        "Dimension 'Account' appears more than once",
+        "Member 'Revnue' does not exist in dimension 'Account'"
+    ]
+    # Without an index only the syntax is checked
+    assert validate_locally("dimension('Period': '2022')") == []
+
+def test_code_fences_are_stripped():
+    assert extract_mql("Here it is:\n```mql\ndimension('Year': '2022')\n```") == "dimension('Year': '2022')"
+    assert extract_mql("  'Revenue'  ") == "'Revenue'"
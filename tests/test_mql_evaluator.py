@@ -0,0 +1,76 @@
+import pytest
+from utils.hierarchy_index import HierarchyIndex
+from utils.mql import MQLError
+from utils.mql_evaluator import iter_bits, resolve_mql, summarize_selection, to_bits
+
+DIMENSIONS = [{"name": "Account", "number": 1, "id": 101}, {"name": "Department", "number": 2, "id": 102}]
+
+def build():
+    # Service Sales is shared under Revenue and Expenses
+    return HierarchyIndex.from_records(7, DIMENSIONS, [
+        ("Account", 1, "Net Income", None, None, None),
+        ("Account", 2, "Revenue", None, 1, None),
+        ("Account", 3, "Product Sales", None, 2, None),
+        ("Account", 4, "Service Sales", None, 2, None),
+        ("Account", 5, "Expenses", None, 1, None),
+        ("Account", 6, "Salaries", None, 5, None),
+        ("Account", 4, "Service Sales", None, 5, None),
+        ("Department", 10, "All Departments", None, None, None),
+        ("Department", 11, "Sales", None, 10, None),
+        ("Department", 12, "Finance", None, 10, None)
+    ])
+
+def accounts(expression: str) -> list:
+    return resolve_mql(f"dimension('Account': {expression})", build())["Account"].member_ids()
+
+@pytest.mark.parametrize("expression, member_ids", [
+    ("'Revenue'", [2]),
+    ("children('Revenue')", [3, 4]),
+    ("ichildren('Revenue')", [2, 3, 4]),
+    # Shared members are counted once
+    ("descendants('Net Income')", [2, 3, 4, 5, 6]),
+    ("children('Expenses')", [4, 6]),
+    ("bottomlevel('Net Income')", [3, 4, 6]),
+    ("parents('Service Sales')", [2, 5]),
+    ("iancestors('Salaries')", [1, 5, 6]),
+    ("union('Revenue' 'Expenses')", [2, 5]),
+    ("intersection(descendants('Revenue') descendants('Expenses'))", [4]),
+    ("subtract(idescendants('Revenue') 'Product Sales')", [2, 4]),
+    ("not(descendants('Net Income'))", [1])
+])
+def test_expressions_select_members_in_hierarchy_order(expression, member_ids):
+    assert accounts(expression) == member_ids
+
+def test_dimensions_without_a_clause_select_everything():
+    selection = resolve_mql("dimension('Account': children('Revenue'))", build())
+    summary = summarize_selection(selection)
+    assert summary == {
+        "dimensions": [
+            {"dimension": "Account", "count": 2, "all_members": False, "sample": ["Product Sales", "Service Sales"]},
+            {"dimension": "Department", "count": 3, "all_members": True, "sample": []}
+        ],
+        "combinations": 6
+    }
+    assert 4 in selection["Account"]
+    assert 6 not in selection["Account"]
+
+def test_bare_expression_is_evaluated_in_the_dimension_of_its_first_member():
+    selection = resolve_mql("children('All Departments')", build())
+    assert selection["Department"].member_ids() == [11, 12]
+    assert not selection["Account"].restricted
+
+@pytest.mark.parametrize("mql, message", [
+    ("dimension('Period': '2022')", "Unknown dimension 'Period'"),
+    ("dimension('Account': 'Sales')", "Member 'Sales' does not exist in dimension 'Account'"),
+    ("dimension('Account': attribute(@'Customer Facing'))", "Attribute 'Customer Facing' is not known"),
+    ("children('Nothing')", "Cannot tell which dimension")
+])
+def test_unresolvable_queries_raise(mql, message):
+    with pytest.raises(MQLError) as error:
+        resolve_mql(mql, build())
+    assert message in str(error.value)
+
+def test_bitsets_round_trip():
+    nodes = [0, 7, 8, 63, 64, 1000]
+    assert list(iter_bits(to_bits(nodes, 1001))) == nodes
+    assert list(iter_bits(0)) == []
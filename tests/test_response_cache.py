@@ -0,0 +1,65 @@
+from utils.hierarchy_index import HierarchyIndex, register_hierarchy_index, unregister_hierarchy_index
+from utils.response_cache import ResponseCache
+
+QUERY = "What is top revenue across all departments in 2022?"
+ANSWER = {
+    "model": {"id": 1, "name": "Foundation", "description": ""},
+    "members": [{"name": "Revenue", "alias": "Revenue", "dimension": "Account"}, {"name": "2022", "alias": "2022", "dimension": "Year"}],
+    "mql": "dimension('Account': 'Revenue') dimension('Year': '2022')",
+    "selection": None
+}
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    cache.set(QUERY, 1, ANSWER)
+    assert cache.get("what is TOP revenue across all departments in 2022", 1)["mql"] == ANSWER["mql"]
+    assert cache.get(QUERY, 2) is None
+
+def test_exact_hit_without_model_needs_a_single_model():
+    cache = ResponseCache()
+    cache.set(QUERY, 1, ANSWER)
+    assert cache.get(QUERY) is not None
+    cache.set(QUERY, 2, ANSWER)
+    assert cache.get(QUERY) is None
+
+def test_similar_query_with_another_year_misses():
+    cache = ResponseCache(threshold=0.9)
+    cache.set(QUERY, 1, ANSWER)
+    assert cache.get("What is top revenue across all departments in 2023?", 1) is None
+
+def test_similar_query_with_same_terms_hits():
+    cache = ResponseCache(threshold=0.9)
+    cache.set(QUERY, 1, ANSWER)
+    assert cache.get("What is the top revenue across all departments in 2022", 1) is not None
+    assert cache.stats()["similar_hits"] == 1
+
+def test_similar_tier_needs_the_model():
+    cache = ResponseCache(threshold=0.9)
+    cache.set(QUERY, 1, ANSWER)
+    assert cache.get("What is the top revenue across all departments in 2022") is None
+
+def test_similar_query_naming_another_member_misses():
+    index = HierarchyIndex.from_records(1, [{"name": "Department", "number": 1, "id": 101}], [
+        ("Department", 1, "Sales", None, None, None),
+        ("Department", 2, "Marketing", None, None, None)
+    ])
+    register_hierarchy_index(index)
+    try:
+        cache = ResponseCache(threshold=0.8)
+        cache.set("Show salaries for Sales in 2021", 1, ANSWER)
+        assert cache.get("Show salaries for Marketing in 2021", 1) is None
+        assert cache.get("Show the salaries for Sales in 2021", 1) is not None
+    finally:
+        unregister_hierarchy_index(1)
+
+def test_changed_snapshot_version_drops_answers():
+    index = HierarchyIndex.from_records(1, [], [("Account", 1, "Revenue", None, None, None)])
+    index.version = "v1"
+    register_hierarchy_index(index)
+    try:
+        cache = ResponseCache()
+        cache.set(QUERY, 1, ANSWER)
+        index.version = "v2"
+        assert cache.get(QUERY, 1) is None
+    finally:
+        unregister_hierarchy_index(1)
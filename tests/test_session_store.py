@@ -0,0 +1,67 @@
+import importlib.util
+import os
+import sqlite3
+import pytest
+
+pytest.importorskip("agno")
+from agno.storage.session.agent import AgentSession
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+spec = importlib.util.spec_from_file_location("agno_session_store", os.path.join(ROOT, "agno", "session_store.py"))
+session_store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(session_store)
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = session_store.ConnectionPool(str(tmp_path / "sessions.db"), size=2)
+    yield pool
+    pool.close()
+
+def session(session_id: str, user_id: str = "user", runs: int = 1) -> AgentSession:
+    return AgentSession(session_id=session_id, user_id=user_id, agent_id="agent", memory={"runs": list(range(runs))})
+
+def test_sessions_round_trip_and_filter_by_user(pool):
+    store = session_store.SqliteSessionStore(pool)
+    store.upsert(session("a", "alice"))
+    store.upsert(session("b", "bob"))
+    store.upsert(session("a", "alice", runs=2))
+    assert store.read("a").memory == {"runs": [0, 1]}
+    assert store.read("a", "bob") is None
+    assert store.get_all_session_ids("bob") == ["b"]
+    assert sorted(store.get_all_session_ids(entity_id="agent")) == ["a", "b"]
+    store.delete_session("b")
+    assert store.read("b") is None
+
+def test_modes_share_the_table_without_mixing(pool):
+    agents = session_store.SqliteSessionStore(pool, mode="agent")
+    teams = session_store.SqliteSessionStore(pool, mode="team")
+    agents.upsert(session("a"))
+    assert teams.read("a") is None
+    assert teams.get_all_sessions() == []
+
+def test_batched_writes_are_coalesced_and_readable_before_the_flush(pool):
+    writer = session_store.SessionWriter(interval=60)
+    store = session_store.BatchedSessionStore(session_store.SqliteSessionStore(pool), writer)
+    try:
+        for runs in range(1, 4):
+            store.upsert(session("a", runs=runs))
+        assert writer.stats()["pending"] == 1
+        assert store.inner.read("a") is None
+        assert store.read("a").memory == {"runs": [0, 1, 2]}
+        # Listing flushes, so it never misses a pending session
+        assert store.get_all_session_ids() == ["a"]
+        assert store.inner.read("a").memory == {"runs": [0, 1, 2]}
+        assert writer.stats()["pending"] == 0
+    finally:
+        writer.close()
+
+def test_compact_deletes_idle_sessions(pool):
+    store = session_store.SqliteSessionStore(pool)
+    store.upsert(session("old"))
+    store.upsert(session("new"))
+    connection = sqlite3.connect(pool.db_file)
+    connection.execute(f"UPDATE {store.table_name} SET updated_at = 0 WHERE session_id = 'old'")
+    connection.commit()
+    connection.close()
+    assert store.compact(86400) == 1
+    assert store.get_all_session_ids() == ["new"]
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+import pytest
+from utils.single_flight import SingleFlight
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    def fetch(model_id):
+        calls.append(model_id)
+        time.sleep(0.1)
+        return {"id": model_id}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(("model", 1), fetch, 1))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [{"id": 1}] * 5
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = SingleFlight()
+    def fail():
+        raise ValueError("Vena is down")
+    with pytest.raises(ValueError):
+        flight.do(("models",), fail)
+    assert flight.do(("models",), lambda: "back") == "back"
+
+async def test_concurrent_tasks_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    async def fetch(query):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return [query]
+
+    results = await asyncio.gather(*[flight.do_async(("search", "Revenue"), fetch, "Revenue") for _ in range(5)])
+    assert calls == ["Revenue"]
+    assert results == [["Revenue"]] * 5
+    assert flight.stats()["in_flight"] == 0
+    # Nothing is kept once the call returns
+    await flight.do_async(("search", "Revenue"), fetch, "Revenue")
+    assert len(calls) == 2
+
+async def test_cancelled_caller_leaves_the_call_running_for_the_others():
+    flight = SingleFlight()
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flight.do_async(("model", 1), fetch))
+    second = asyncio.create_task(flight.do_async(("model", 1), fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
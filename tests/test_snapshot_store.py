@@ -0,0 +1,56 @@
+import os
+import pytest
+from utils import snapshot_store
+from utils.hierarchy_index import HierarchyIndex, get_hierarchy_index, unregister_hierarchy_index
+from utils.response_cache import response_cache
+from utils.snapshot_store import SnapshotStore, load_snapshots, reload_snapshots
+
+DIMENSIONS = [{"name": "Account", "number": 1, "id": 101}]
+
+def build(names):
+    return HierarchyIndex.from_records(7, DIMENSIONS, [
+        ("Account", number, name, None, None, None) for number, name in enumerate(names, start=1)
+    ])
+
+def test_save_and_load_round_trip(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    version = store.save(build(["Revenue", "Expenses"]), {"id": 7, "name": "Model", "dimensions": DIMENSIONS}, "a" * 64)
+    index = store.load(7)
+    assert index.version == version
+    assert [member["name"] for member in index.get_children(1, "root")] == ["Revenue", "Expenses"]
+
+def test_reload_registers_new_version_and_drops_cached_answers(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    model = {"id": 7, "name": "Model", "dimensions": DIMENSIONS}
+    store.save(build(["Revenue"]), model, "a" * 64)
+    try:
+        assert load_snapshots(str(tmp_path)) == {7: store.current_version(7)}
+        assert reload_snapshots(str(tmp_path)) == {}
+
+        response_cache.set("revenue", 7, {"model": model, "members": [], "mql": "", "selection": None})
+        version = store.save(build(["Revenue", "Expenses"]), model, "b" * 64)
+        assert reload_snapshots(str(tmp_path)) == {7: version}
+        assert get_hierarchy_index(7).version == version
+        assert response_cache.get("revenue", 7) is None
+    finally:
+        unregister_hierarchy_index(7)
+        response_cache.invalidate_model(7)
+
+def test_repeated_saves_of_an_unchanged_model_get_distinct_versions(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path), keep=5)
+    model = {"id": 7, "name": "Model", "dimensions": DIMENSIONS}
+    monkeypatch.setattr(snapshot_store.time, "time", lambda: 1700000000.5)
+    versions = [store.save(build(["Revenue"]), model, "a" * 64) for _ in range(3)]
+    assert len(set(versions)) == 3
+    assert store.current_version(7) == versions[-1]
+    assert set(os.listdir(store.model_dir(7))) == {"CURRENT", *versions}
+
+def test_failed_save_removes_its_staging_directory(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path))
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(snapshot_store.json, "dump", fail)
+    with pytest.raises(OSError):
+        store.save(build(["Revenue"]), {"id": 7, "name": "Model", "dimensions": DIMENSIONS}, "a" * 64)
+    assert os.listdir(store.model_dir(7)) == []
+    assert store.current_version(7) is None
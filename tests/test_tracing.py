@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from utils.tracing import Tracer, current_span
+
+class ListSink:
+    def __init__(self):
+        self.spans = []
+
+    def start(self, span):
+        pass
+
+    def end(self, span):
+        self.spans.append(span)
+
+async def test_cancelled_span_is_ended_as_an_error():
+    sink = ListSink()
+    tracer = Tracer([sink])
+
+    async def slow():
+        with tracer.span("vena", "search_members"):
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(slow())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert [span.error for span in sink.spans] == ["CancelledError: "]
+    assert tracer.stats()["vena"]["errors"] == 1
+    assert current_span.get() is None
+
+async def test_generator_closed_early_is_not_an_error():
+    sink = ListSink()
+    tracer = Tracer([sink])
+
+    async def tokens():
+        with tracer.span("llm", "stream"):
+            for token in ("a", "b", "c"):
+                yield token
+
+    stream = tokens()
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+    assert [span.error for span in sink.spans] == [None]
@@ -7,7 +7,83 @@ from .vena_client import (
     list_models,
     get_model,
     get_children_of_member,
+    get_children_of_members,
     get_member,
     search_members,
-    validate_mql
+    validate_mql,
+    evaluate_mql,
+    get_hierarchy,
+    iter_hierarchy,
+    export_hierarchy,
+    load_hierarchy_index
+)
+from .async_vena_client import (
+    AsyncVenaClient,
+    get_async_client,
+    close_async_client
+)
+from .cache import (
+    TTLCache,
+    metadata_cache,
+    invalidate_model
+)
+from .hierarchy_index import (
+    HierarchyIndex,
+    DimensionIndex,
+    get_hierarchy_index,
+    register_hierarchy_index,
+    unregister_hierarchy_index
+)
+from .member_search import (
+    MemberSearchIndex,
+    get_search_index,
+    set_attributes
+)
+from .snapshot_store import (
+    SnapshotStore,
+    load_snapshots,
+    refresh_snapshots
+)
+from .mql import (
+    MQLError,
+    parse_mql,
+    check_mql,
+    validate_locally
+)
+from .mql_evaluator import (
+    MemberSet,
+    resolve_mql,
+    summarize_selection
+)
+from .response_cache import (
+    ResponseCache,
+    response_cache,
+    normalize_query
+)
+from .prewarm import (
+    prewarm,
+    start_prewarm,
+    stop_prewarm,
+    get_readiness
+)
+from .prefetch import (
+    start_prefetch,
+    stop_prefetch
+)
+from .single_flight import (
+    SingleFlight,
+    vena_calls
+)
+from .tracing import (
+    Tracer,
+    span,
+    traced,
+    annotate,
+    instrument_openai,
+    get_trace_stats
+)
+from .structured_output import (
+    MemberPrediction,
+    PredictedMember,
+    repair_json
 )
\ No newline at end of file
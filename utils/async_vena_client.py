@@ -0,0 +1,318 @@
+import asyncio
+import os
+import tempfile
+import time
+import httpx
+import pandas as pd
+from .cache import metadata_cache
+from .hierarchy_index import HierarchyIndex, get_hierarchy_index, register_hierarchy_index
+from .member_search import get_search_index, get_search_limit
+from .single_flight import vena_calls
+from .tracing import annotate, count, traced
+from .vena_client import (
+    get_header,
+    to_models,
+    to_model,
+    to_member,
+    search_payload,
+    attribute_payload,
+    attributes_key,
+    known_attributes,
+    remember_attributes,
+    subtree_level,
+    MAX_SUBTREE_DEPTH,
+    validate_mql_locally,
+    evaluate_mql,
+    read_hierarchy_chunks,
+    concat_hierarchy,
+    write_hierarchy_columns,
+    HIERARCHY_EXPORT
+)
+
+class AsyncVenaClient:
+    """Async Vena API client backed by a single keep-alive connection pool
+
+    One instance is meant to be shared by every chat session in a process so that
+    concurrent tool calls reuse pooled connections and never block the event loop.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = None,
+        user: str = None,
+        key: str = None,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        max_concurrency: int = None,
+        timeout: float = None,
+        connect_timeout: float = None
+    ):
+        self.endpoint = endpoint or os.environ.get("VENA_ENDPOINT")
+        self.header = get_header(user or os.environ.get("VENA_USER"), key or os.environ.get("VENA_KEY"))
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.environ.get("VENA_MAX_CONNECTIONS", 20)),
+            max_keepalive_connections=max_keepalive_connections or int(os.environ.get("VENA_MAX_KEEPALIVE_CONNECTIONS", 10))
+        )
+        self.timeout = httpx.Timeout(
+            timeout or float(os.environ.get("VENA_TIMEOUT", 30)),
+            connect=connect_timeout or float(os.environ.get("VENA_CONNECT_TIMEOUT", 5))
+        )
+        # Caps in-flight requests independently of the pool size so a burst of sessions queues here
+        self.semaphore = asyncio.Semaphore(max_concurrency or int(os.environ.get("VENA_MAX_CONCURRENCY", 10)))
+        self.client = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                headers=self.header,
+                limits=self.limits,
+                timeout=self.timeout
+            )
+        return self.client
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        queued = time.perf_counter()
+        async with self.semaphore:
+            started = time.perf_counter()
+            response = await self.get_client().request(method, path, **kwargs)
+        # Time spent waiting for a free slot shows up separately from the request itself
+        annotate(
+            status=response.status_code,
+            queued_ms=round((started - queued) * 1000, 3),
+            request_ms=round((time.perf_counter() - started) * 1000, 3),
+            request_bytes=len(response.request.content),
+            response_bytes=len(response.content)
+        )
+        return response
+
+    @traced("vena")
+    async def list_models(self) -> list:
+        cached = metadata_cache.get(("models",))
+        if cached is not None:
+            return cached
+
+        # Concurrent sessions that all miss the cache wait on one shared request
+        return await vena_calls.do_async(("models",), self.fetch_models)
+
+    async def fetch_models(self) -> list:
+        response = await self.request("GET", "/api/models/withDimensions")
+        if response.status_code != 200:
+            raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+        models = to_models(response.json())
+        metadata_cache.set(("models",), models)
+        return models
+
+    @traced("vena")
+    async def get_model(self, id: int, model_name: str) -> dict:
+        cached = metadata_cache.get(("model", int(id)))
+        if cached is not None:
+            return {**cached, "name": model_name}
+
+        return {**await vena_calls.do_async(("model", int(id)), self.fetch_model, id, model_name), "name": model_name}
+
+    async def fetch_model(self, id: int, model_name: str) -> dict:
+        response = await self.request(
+            "GET",
+            f"/api/models/{id}/dimensions",
+            params={"incMembers": "false", "incAttributes": "false"}
+        )
+        if response.status_code != 200:
+            raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+        model = to_model(id, model_name, response.json())
+        metadata_cache.set(("model", int(id)), model)
+        return model
+
+    @traced("vena")
+    async def get_children_of_member(self, model_id: int, dimension_number: int, member_id: str) -> list:
+        index = get_hierarchy_index(model_id)
+        if index is not None:
+            children = index.get_children(dimension_number, member_id)
+            if children is not None:
+                count(index_hits=1)
+                return children
+
+        key = ("children", int(model_id), int(dimension_number), str(member_id))
+        cached = metadata_cache.get(key)
+        if cached is not None:
+            return cached
+
+        return await vena_calls.do_async(key, self.fetch_children_of_member, model_id, dimension_number, member_id)
+
+    async def fetch_children_of_member(self, model_id: int, dimension_number: int, member_id: str) -> list:
+        response = await self.request(
+            "GET",
+            f"/api/models/{model_id}/dimensions/{dimension_number}/members/{member_id}/children"
+        )
+        if response.status_code != 200:
+            raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+        children = [to_member(member) for member in response.json()]
+        metadata_cache.set(("children", int(model_id), int(dimension_number), str(member_id)), children)
+        return children
+
+    @traced("vena")
+    async def get_children_of_members(self, model_id: int, dimension_number: int, member_ids: list, depth: int = 1) -> list:
+        """Children of many members at once, down to depth levels, each level fetched concurrently"""
+        depth = max(1, min(int(depth or 1), MAX_SUBTREE_DEPTH))
+        parents = [str(member_id) for member_id in dict.fromkeys(member_ids)]
+        subtree = []
+        for level in range(1, depth + 1):
+            if not parents:
+                break
+            results = await asyncio.gather(*[
+                self.get_children_of_member(model_id, dimension_number, member_id) for member_id in parents
+            ], return_exceptions=True)
+            parents = subtree_level(parents, results, level, subtree)
+        return subtree
+
+    @traced("vena")
+    async def get_member(self, model_id: int, dimension_number: int, member_id: str) -> dict:
+        key = ("member", int(model_id), int(dimension_number), str(member_id))
+        return await vena_calls.do_async(key, self.fetch_member, model_id, dimension_number, member_id)
+
+    async def fetch_member(self, model_id: int, dimension_number: int, member_id: str) -> dict:
+        response = await self.request(
+            "GET",
+            f"/api/models/{model_id}/dimensions/{dimension_number}/members/{member_id}"
+        )
+        if response.status_code != 200:
+            raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+        return to_member(response.json())
+
+    @traced("vena")
+    async def search_members(self, model_id: int, dimension_id: int, query: str):
+        index = get_hierarchy_index(model_id)
+        dimension = index.dimension_by_id(dimension_id) if index is not None else None
+        if dimension is not None:
+            count(index_hits=1)
+            # Building the search index for a large dimension is CPU bound, only the first call pays for it
+            search_index = await asyncio.to_thread(get_search_index, dimension)
+            if search_index.complete_attributes:
+                return search_index.search(query, get_search_limit())
+            # The export has no attributes, so those come from Vena (cached per query) while the members are ranked locally
+            attributes = asyncio.ensure_future(self.search_attributes(model_id, dimension, query))
+            return search_index.search(query, get_search_limit(), attributes=False) + await attributes
+
+        key = ("search", int(model_id), int(dimension_id), query)
+        return await vena_calls.do_async(key, self.fetch_search_results, model_id, dimension_id, query)
+
+    async def search_attributes(self, model_id: int, dimension, query: str) -> list:
+        """ATTRIBUTE suggestions for a locally indexed dimension: matching attributes it already knows, else Vena's"""
+        known = known_attributes(dimension, query)
+        if known:
+            return known
+        key = attributes_key(model_id, dimension, query)
+        cached = metadata_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            results = await vena_calls.do_async(key, self.fetch_search_results, model_id, dimension.id, query, attribute_payload)
+        except Exception as e:
+            # The local member results still stand
+            annotate(attribute_error=str(e))
+            return []
+        return remember_attributes(key, dimension, results)
+
+    async def fetch_search_results(self, model_id: int, dimension_id: int, query: str, payload=search_payload) -> list:
+        response = await self.request(
+            "POST",
+            "/api/search/suggestions",
+            json=payload(model_id, dimension_id, query)
+        )
+        if response.status_code != 200:
+            raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+        return response.json()
+
+    @traced("vena")
+    async def validate_mql(self, model_id: int, mql: str) -> str:
+        validate_mql_locally(model_id, mql)
+
+        response = await self.request(
+            "POST",
+            f"/api/models/{model_id}/mql/validate",
+            content=mql
+        )
+        if response.status_code == 204 or response.status_code == 200:
+            return "MQL is valid"
+        else:
+            raise Exception("MQL is NOT VALID due to: " + response.text + ".  Try searching for members again then generating the MQL.")
+
+    async def evaluate_mql(self, model_id: int, mql: str) -> dict:
+        # Purely local, but the first evaluation of a dimension builds its bitsets, so keep it off the event loop
+        return await asyncio.to_thread(evaluate_mql, model_id, mql)
+
+    async def spool_hierarchy(self, model_id: int):
+        """Stream the hierarchy export into a temporary file instead of buffering it in memory"""
+        async with self.semaphore:
+            async with self.get_client().stream(
+                "POST",
+                f"/api/models/{model_id}/etl/query/hierarchies",
+                json=HIERARCHY_EXPORT
+            ) as response:
+                if response.status_code != 204 and response.status_code != 200:
+                    await response.aread()
+                    raise Exception("Failed to retrieve hierarchy CSV due to: " + response.text)
+                spool = tempfile.TemporaryFile()
+                try:
+                    async for block in response.aiter_bytes():
+                        spool.write(block)
+                except BaseException:
+                    # A timeout, dropped connection or cancellation mid-stream must not leak the file
+                    spool.close()
+                    raise
+        spool.seek(0)
+        return spool
+
+    @traced("vena")
+    async def get_hierarchy(self, model_id: int, chunksize: int = None) -> pd.DataFrame:
+        with await self.spool_hierarchy(model_id) as spool:
+            # CSV parsing is CPU bound, keep it off the event loop
+            return await asyncio.to_thread(concat_hierarchy, read_hierarchy_chunks(spool, chunksize))
+
+    @traced("vena")
+    async def export_hierarchy(self, model_id: int, directory: str, chunksize: int = None) -> int:
+        """Stream the hierarchy export into columnar files under directory, returns the row count"""
+        with await self.spool_hierarchy(model_id) as spool:
+            return await asyncio.to_thread(write_hierarchy_columns, read_hierarchy_chunks(spool, chunksize), directory)
+
+    @traced("vena")
+    async def load_hierarchy_index(self, model_id: int) -> HierarchyIndex:
+        """Export the model's hierarchy and register a local index that serves member lookups"""
+        model = await self.get_model(model_id, "")
+        with await self.spool_hierarchy(model_id) as spool:
+            index = await asyncio.to_thread(
+                HierarchyIndex.from_frames, model_id, model["dimensions"], read_hierarchy_chunks(spool)
+            )
+        register_hierarchy_index(index)
+        return index
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+# Global instance - initialize lazily so the pool is created inside the running event loop
+async_client = None
+
+def get_async_client() -> AsyncVenaClient:
+    global async_client
+    if async_client is None:
+        async_client = AsyncVenaClient()
+    return async_client
+
+async def close_async_client():
+    global async_client
+    if async_client is not None:
+        await async_client.aclose()
+        async_client = None
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from .tracing import count
+
+class TTLCache:
+    """Bounded in-memory cache with per-entry TTL expiry and LRU eviction
+
+    Keys are tuples such as ("model", model_id) so that a whole family of entries can be
+    dropped with a single prefix via invalidate(). Safe to share between the event loop
+    and worker threads. Hits and misses are also counted on the current trace span.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                count(cache_misses=1)
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.misses += 1
+                count(cache_misses=1)
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            count(cache_hits=1)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *prefix) -> int:
+        """Drop every entry whose key starts with prefix (everything if no prefix is given)"""
+        with self.lock:
+            keys = [key for key in self.entries if key[:len(prefix)] == prefix]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+# Shared cache for model, dimension and member metadata across every session in the process
+metadata_cache = TTLCache(
+    maxsize=int(os.environ.get("VENA_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("VENA_CACHE_TTL", 900))
+)
+
+def invalidate_model(model_id: int = None):
+    """Invalidation hook for when a model's metadata or hierarchy changes"""
+    metadata_cache.invalidate("models")
+    if model_id is None:
+        metadata_cache.invalidate("model")
+        metadata_cache.invalidate("children")
+        metadata_cache.invalidate("attributes")
+    else:
+        metadata_cache.invalidate("model", model_id)
+        metadata_cache.invalidate("children", model_id)
+        metadata_cache.invalidate("attributes", model_id)
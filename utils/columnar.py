@@ -0,0 +1,174 @@
+import json
+import mmap
+import os
+from array import array
+from typing import Dict, Iterable, Optional
+
+# Column types: fixed width int64, dictionary encoded category (int32 codes) and variable length utf-8 string
+INT_COLUMN = "int64"
+CATEGORY_COLUMN = "category"
+STRING_COLUMN = "string"
+
+INT_NULL = -(2 ** 63)
+CATEGORY_NULL = -1
+MANIFEST_FILE = "columns.json"
+
+def is_missing(value) -> bool:
+    """True for None, NaN and pandas NA/NaT (which refuse to be compared)"""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        return True
+
+class StringColumn:
+    """Read-only sequence of strings stored as one utf-8 blob plus int64 end offsets"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if start == end:
+            return None
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class CategoryColumn:
+    """Read-only sequence of dictionary-encoded strings"""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        code = self.codes[i]
+        return None if code == CATEGORY_NULL else self.categories[code]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class ColumnarWriter:
+    """Appends chunks of rows to per-column binary files under a directory
+
+    Files are written incrementally so a streamed export never has to be held in memory,
+    and are laid out so open_columns can memory-map them back without parsing.
+    """
+
+    def __init__(self, directory: str, schema: Dict[str, str]):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.schema = schema
+        self.rows = 0
+        self.files = {}
+        self.string_sizes = {}
+        self.categories = {}
+        for name, kind in schema.items():
+            if kind == STRING_COLUMN:
+                self.files[name] = open(os.path.join(directory, f"{name}.utf8"), "wb")
+                self.files[f"{name}.offsets"] = open(os.path.join(directory, f"{name}.offsets.i64"), "wb")
+                array("q", [0]).tofile(self.files[f"{name}.offsets"])
+                self.string_sizes[name] = 0
+            elif kind == CATEGORY_COLUMN:
+                self.files[name] = open(os.path.join(directory, f"{name}.codes.i32"), "wb")
+                self.categories[name] = {}
+            else:
+                self.files[name] = open(os.path.join(directory, f"{name}.i64"), "wb")
+
+    def append(self, columns: Dict[str, Iterable], length: int):
+        for name, kind in self.schema.items():
+            values = columns.get(name)
+            if values is None:
+                values = [None] * length
+            if kind == STRING_COLUMN:
+                offsets = array("q")
+                size = self.string_sizes[name]
+                blob = self.files[name]
+                for value in values:
+                    if not is_missing(value):
+                        encoded = str(value).encode("utf-8")
+                        blob.write(encoded)
+                        size += len(encoded)
+                    offsets.append(size)
+                offsets.tofile(self.files[f"{name}.offsets"])
+                self.string_sizes[name] = size
+            elif kind == CATEGORY_COLUMN:
+                lookup = self.categories[name]
+                codes = array("i", (
+                    CATEGORY_NULL if is_missing(value) else lookup.setdefault(str(value), len(lookup))
+                    for value in values
+                ))
+                codes.tofile(self.files[name])
+            else:
+                array("q", (INT_NULL if is_missing(value) else int(value) for value in values)).tofile(self.files[name])
+        self.rows += length
+
+    def append_frame(self, df):
+        self.append({name: df[name] for name in self.schema if name in df.columns}, len(df))
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        manifest = {
+            "rows": self.rows,
+            "columns": self.schema,
+            "categories": {name: list(lookup) for name, lookup in self.categories.items()}
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def map_file(path: str, typecode: str = None, use_mmap: bool = True):
+    """Memory-map a file read-only, optionally viewed as fixed width integers"""
+    size = os.path.getsize(path)
+    if size == 0 or not use_mmap:
+        with open(path, "rb") as f:
+            data = f.read()
+        if typecode is None:
+            return data
+        values = array(typecode)
+        values.frombytes(data)
+        return values
+    with open(path, "rb") as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return view.cast(typecode) if typecode else view
+
+def read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def open_columns(directory: str, use_mmap: bool = True) -> Dict[str, object]:
+    """Open every column written by ColumnarWriter, memory-mapped by default"""
+    manifest = read_manifest(directory)
+    columns = {}
+    for name, kind in manifest["columns"].items():
+        if kind == STRING_COLUMN:
+            columns[name] = StringColumn(
+                map_file(os.path.join(directory, f"{name}.utf8"), use_mmap=use_mmap),
+                map_file(os.path.join(directory, f"{name}.offsets.i64"), "q", use_mmap)
+            )
+        elif kind == CATEGORY_COLUMN:
+            columns[name] = CategoryColumn(
+                map_file(os.path.join(directory, f"{name}.codes.i32"), "i", use_mmap),
+                manifest["categories"][name]
+            )
+        else:
+            columns[name] = map_file(os.path.join(directory, f"{name}.i64"), "q", use_mmap)
+    return columns
@@ -0,0 +1,140 @@
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Fields the agents actually need from each kind of tool result
+MODEL_FIELDS = ["id", "name", "description"]
+DIMENSION_FIELDS = ["id", "number", "name", "typeDefinition"]
+MEMBER_FIELDS = ["id", "name", "alias", "numChildren"]
+SEARCH_FIELDS = ["id", "name", "alias", "numChildren"]
+SUBTREE_FIELDS = ["parent", "id", "name", "alias", "numChildren"]
+
+encoding = None
+
+def get_encoding():
+    """tiktoken's cl100k encoding when available (it ships with langchain-openai), else None"""
+    global encoding
+    if encoding is None:
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            encoding = False
+    return encoding or None
+
+def count_tokens(text: str) -> int:
+    enc = get_encoding()
+    if enc is None:
+        # Roughly four characters per token for English and JSON
+        return (len(text) + 3) // 4
+    return len(enc.encode(text))
+
+def get_token_budget() -> int:
+    return int(os.environ.get("VENA_CONTEXT_TOKENS", 1500))
+
+def compact(value: Any) -> str:
+    """JSON without indentation or spaces after separators"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def project(record: Dict[str, Any], fields: List[str]) -> List[Any]:
+    row = [record.get(field) for field in fields]
+    # An alias identical to the name carries no information
+    if "alias" in fields and "name" in fields:
+        alias = fields.index("alias")
+        if row[alias] == row[fields.index("name")]:
+            row[alias] = None
+    return row
+
+def pack_records(
+    records: Iterable[Dict[str, Any]],
+    fields: List[str],
+    budget: int = None,
+    rank: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    extra: Dict[str, Any] = None
+) -> str:
+    """Encode records as {"fields": [...], "rows": [[...], ...]}, keeping the best rows that fit the token budget
+
+    Records are kept in their given order unless rank is supplied (lower sorts first).
+    When rows are dropped the result says how many in "omitted".
+    """
+    budget = budget or get_token_budget()
+    records = [record for record in records if isinstance(record, dict)]
+    if rank is not None:
+        records = sorted(records, key=rank)
+
+    header = {**(extra or {}), "fields": fields}
+    used = count_tokens(compact(header)) + 8
+    rows = []
+    for record in records:
+        row = project(record, fields)
+        cost = count_tokens(compact(row)) + 1
+        if used + cost > budget:
+            break
+        rows.append(row)
+        used += cost
+
+    packed = {**header, "rows": rows}
+    if len(rows) < len(records):
+        packed["omitted"] = len(records) - len(rows)
+    return compact(packed)
+
+def pack_models(models: List[Dict[str, Any]], budget: int = None) -> str:
+    return pack_records(models, MODEL_FIELDS, budget)
+
+def pack_model(model: Dict[str, Any], budget: int = None) -> str:
+    return pack_records(
+        model.get("dimensions", []),
+        DIMENSION_FIELDS,
+        budget,
+        extra={"id": model.get("id"), "name": model.get("name")}
+    )
+
+def pack_members(members: List[Dict[str, Any]], budget: int = None) -> str:
+    return pack_records(members, MEMBER_FIELDS, budget)
+
+def fit_names(names: List[Any], budget: int) -> List[Any]:
+    """The leading names whose JSON fits the token budget"""
+    kept = []
+    used = 2
+    for name in names:
+        cost = count_tokens(compact(name)) + 1
+        if used + cost > budget:
+            break
+        kept.append(name)
+        used += cost
+    return kept
+
+def pack_search_results(results: Any, budget: int = None) -> str:
+    """Ranked member hits first (by score when present), then attribute matches
+
+    Attribute names get at most a quarter of the budget; when some are dropped the result
+    says how many in "attributes_omitted".
+    """
+    if not isinstance(results, list):
+        return compact(results)
+    budget = budget or get_token_budget()
+    members = [result for result in results if isinstance(result, dict) and result.get("type", "MEMBER") == "MEMBER"]
+    attributes = [result.get("name") for result in results if isinstance(result, dict) and result.get("type") == "ATTRIBUTE"]
+    extra = {}
+    if attributes:
+        extra["attributes"] = fit_names(attributes, budget // 4)
+        if len(extra["attributes"]) < len(attributes):
+            extra["attributes_omitted"] = len(attributes) - len(extra["attributes"])
+    return pack_records(
+        members,
+        SEARCH_FIELDS,
+        budget,
+        rank=lambda result: -(result.get("score") or 0),
+        extra=extra
+    )
+
+def pack_subtree(subtree: List[Dict[str, Any]], budget: int = None) -> str:
+    """Flat parent-linked rows from get_children_of_members; the budget cuts the deepest levels first"""
+    members = [row for row in subtree if "id" in row]
+    extra = {}
+    errors = {row["parent"]: row["error"] for row in subtree if "error" in row}
+    if errors:
+        extra["errors"] = errors
+    if any(row.get("truncated") for row in subtree):
+        extra["truncated"] = True
+    return pack_records(members, SUBTREE_FIELDS, budget, extra=extra)
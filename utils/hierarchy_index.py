@@ -0,0 +1,312 @@
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from .columnar import INT_COLUMN, CATEGORY_COLUMN, STRING_COLUMN, INT_NULL, is_missing
+
+# Columns of the ETL hierarchy export (POST /etl/query/hierarchies with exportMemberIds)
+DIMENSION_COLUMN = "_dim"
+MEMBER_ID_COLUMN = "_member_id"
+MEMBER_NAME_COLUMN = "_member_name"
+MEMBER_ALIAS_COLUMN = "_member_alias"
+PARENT_ID_COLUMN = "_parent_id"
+PARENT_NAME_COLUMN = "_parent_name"
+
+HIERARCHY_COLUMNS = [
+    DIMENSION_COLUMN,
+    MEMBER_ID_COLUMN,
+    MEMBER_NAME_COLUMN,
+    MEMBER_ALIAS_COLUMN,
+    PARENT_ID_COLUMN,
+    PARENT_NAME_COLUMN
+]
+
+# On-disk layout of the export: repeated dimension/parent names are dictionary encoded, ids are int64
+HIERARCHY_SCHEMA = {
+    DIMENSION_COLUMN: CATEGORY_COLUMN,
+    MEMBER_ID_COLUMN: INT_COLUMN,
+    MEMBER_NAME_COLUMN: STRING_COLUMN,
+    MEMBER_ALIAS_COLUMN: STRING_COLUMN,
+    PARENT_ID_COLUMN: INT_COLUMN,
+    PARENT_NAME_COLUMN: CATEGORY_COLUMN
+}
+
+def clean(value) -> Optional[str]:
+    """Normalize a CSV cell to a stripped string, or None when empty/NaN"""
+    if is_missing(value) or value == INT_NULL:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+class DimensionIndex:
+    """Read-only tree of one dimension's hierarchy laid out in preorder
+
+    Node i is the i-th member in depth-first order, so the descendants of node i are exactly
+    the nodes i+1 .. subtree_end[i]-1. Children are stored as CSR adjacency arrays
+    (child_offsets/child_nodes). A shared member appearing under several parents becomes
+    one node per placement, with its subtree expanded under the first placement only.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        member_ids: array,
+        names: List[str],
+        aliases: List[str],
+        parents: array,
+        depths: array,
+        subtree_end: array,
+        child_offsets: array,
+        child_nodes: array,
+        number: int = None,
+        id: int = None
+    ):
+        self.name = name
+        self.number = number
+        self.id = id
+        self.member_ids = member_ids
+        self.names = names
+        self.aliases = aliases
+        self.parents = parents
+        self.depths = depths
+        self.subtree_end = subtree_end
+        self.child_offsets = child_offsets
+        self.child_nodes = child_nodes
+        self.lookup_lock = threading.Lock()
+        self.id_lookup = None
+        self.name_lookup = None
+
+    def __len__(self) -> int:
+        return len(self.member_ids)
+
+    def build_lookups(self):
+        with self.lookup_lock:
+            if self.name_lookup is not None:
+                return
+            id_lookup = {}
+            name_lookup = {}
+            for node in range(len(self.member_ids)):
+                id_lookup.setdefault(self.member_ids[node], node)
+                name_lookup.setdefault(self.names[node].lower(), node)
+                alias = self.aliases[node]
+                if alias:
+                    name_lookup.setdefault(alias.lower(), node)
+            self.id_lookup = id_lookup
+            self.name_lookup = name_lookup
+
+    def find_by_id(self, member_id) -> Optional[int]:
+        if self.id_lookup is None:
+            self.build_lookups()
+        try:
+            return self.id_lookup.get(int(member_id))
+        except (TypeError, ValueError):
+            return None
+
+    def find_by_name(self, name: str) -> Optional[int]:
+        """Resolve a member name or alias (case-insensitive) to its primary node"""
+        if self.name_lookup is None:
+            self.build_lookups()
+        return self.name_lookup.get(name.strip().lower())
+
+    def is_leaf(self, node: int) -> bool:
+        return self.subtree_end[node] == node + 1
+
+    def top_level(self) -> List[int]:
+        return list(self.roots())
+
+    def roots(self) -> Iterable[int]:
+        node = 0
+        while node < len(self.member_ids):
+            yield node
+            node = self.subtree_end[node]
+
+    def children(self, node: int) -> List[int]:
+        return list(self.child_nodes[self.child_offsets[node]:self.child_offsets[node + 1]])
+
+    def descendants(self, node: int) -> range:
+        return range(node + 1, self.subtree_end[node])
+
+    def bottom_level(self, node: int) -> List[int]:
+        return [n for n in range(node + 1, self.subtree_end[node]) if self.subtree_end[n] == n + 1]
+
+    def ancestors(self, node: int) -> List[int]:
+        result = []
+        parent = self.parents[node]
+        while parent != -1:
+            result.append(parent)
+            parent = self.parents[parent]
+        return result
+
+    def to_member(self, node: int) -> dict:
+        return {
+            "id": str(self.member_ids[node]),
+            "name": self.names[node],
+            "alias": self.aliases[node],
+            "numChildren": self.child_offsets[node + 1] - self.child_offsets[node]
+        }
+
+    def get_children(self, member_id: str) -> Optional[List[dict]]:
+        """Same shape as vena_client.get_children_of_member, or None if the member is unknown"""
+        if str(member_id).lower() == "root":
+            nodes = self.top_level()
+        else:
+            node = self.find_by_id(member_id)
+            if node is None:
+                return None
+            nodes = self.children(node)
+        return [self.to_member(child) for child in nodes]
+
+    @classmethod
+    def build(cls, name: str, rows: List[Tuple], number: int = None, id: int = None) -> "DimensionIndex":
+        """Build from (member_id, name, alias, parent_id, parent_name) tuples in export order"""
+        keys = {}
+        for position, (member_id, member_name, _, _, _) in enumerate(rows):
+            keys.setdefault(("id", member_id), position)
+            keys.setdefault(("name", member_name.lower()), position)
+
+        children_of = {}
+        roots = []
+        for position, (member_id, _, _, parent_id, parent_name) in enumerate(rows):
+            parent = None
+            if parent_id is not None:
+                parent = keys.get(("id", parent_id))
+            if parent is None and parent_name is not None:
+                parent = keys.get(("name", parent_name.lower()))
+            if parent is None or parent == position:
+                roots.append(position)
+            else:
+                children_of.setdefault(rows[parent][0], []).append(position)
+
+        member_ids = array("q")
+        names = []
+        aliases = []
+        parents = array("q")
+        depths = array("q")
+        subtree_end = array("q")
+        node_children = []
+        expanded = set()
+
+        # Iterative preorder walk; (position, parent node, depth) on the stack, reversed to keep export order
+        stack = [(position, -1, 0) for position in reversed(roots)]
+        open_nodes = []
+        while stack:
+            position, parent, depth = stack.pop()
+            while open_nodes and depths[open_nodes[-1]] >= depth:
+                subtree_end[open_nodes.pop()] = len(member_ids)
+            member_id, member_name, alias, _, _ = rows[position]
+            node = len(member_ids)
+            member_ids.append(member_id)
+            names.append(member_name)
+            aliases.append(alias or member_name)
+            parents.append(parent)
+            depths.append(depth)
+            subtree_end.append(node + 1)
+            node_children.append([])
+            if parent != -1:
+                node_children[parent].append(node)
+            open_nodes.append(node)
+            if member_id not in expanded:
+                expanded.add(member_id)
+                for child in reversed(children_of.get(member_id, [])):
+                    stack.append((child, node, depth + 1))
+        while open_nodes:
+            subtree_end[open_nodes.pop()] = len(member_ids)
+
+        child_offsets = array("q", [0])
+        child_nodes = array("q")
+        for nodes in node_children:
+            child_nodes.extend(nodes)
+            child_offsets.append(len(child_nodes))
+
+        return cls(name, member_ids, names, aliases, parents, depths, subtree_end, child_offsets, child_nodes, number, id)
+
+class HierarchyIndex:
+    """Per-model collection of DimensionIndex objects built from the ETL hierarchy export"""
+
+    def __init__(self, model_id: int, dimensions: Dict[str, DimensionIndex], version: str = None):
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self.version = version
+        self.by_number = {dim.number: dim for dim in dimensions.values() if dim.number is not None}
+        self.by_id = {dim.id: dim for dim in dimensions.values() if dim.id is not None}
+
+    def dimension(self, dimension_number: int) -> Optional[DimensionIndex]:
+        return self.by_number.get(int(dimension_number))
+
+    def dimension_by_id(self, dimension_id: int) -> Optional[DimensionIndex]:
+        return self.by_id.get(int(dimension_id))
+
+    def dimension_by_name(self, name: str) -> Optional[DimensionIndex]:
+        name = name.strip().lower()
+        return next((dim for key, dim in self.dimensions.items() if key.lower() == name), None)
+
+    def get_children(self, dimension_number: int, member_id: str) -> Optional[List[dict]]:
+        dimension = self.dimension(dimension_number)
+        if dimension is None:
+            return None
+        return dimension.get_children(member_id)
+
+    @classmethod
+    def from_records(cls, model_id: int, dimensions: List[dict], records: Iterable[Tuple]) -> "HierarchyIndex":
+        """Build from (dimension, member_id, name, alias, parent_id, parent_name) tuples
+
+        dimensions is the "dimensions" list returned by get_model, used to map the dimension
+        names in the export onto the dimension numbers/ids the tools are called with.
+        """
+        rows_by_dimension = {}
+        for dimension, member_id, name, alias, parent_id, parent_name in records:
+            dimension, member_id, name = clean(dimension), clean(member_id), clean(name)
+            if dimension is None or member_id is None or name is None:
+                continue
+            parent_id = clean(parent_id)
+            rows_by_dimension.setdefault(dimension, []).append((
+                int(member_id),
+                name,
+                clean(alias),
+                int(parent_id) if parent_id is not None else None,
+                clean(parent_name)
+            ))
+
+        metadata = {dim["name"].lower(): dim for dim in dimensions or []}
+        indexes = {}
+        for dimension, rows in rows_by_dimension.items():
+            meta = metadata.get(dimension.lower(), {})
+            indexes[dimension] = DimensionIndex.build(dimension, rows, meta.get("number"), meta.get("id"))
+        return cls(model_id, indexes)
+
+    @classmethod
+    def from_dataframe(cls, model_id: int, dimensions: List[dict], df) -> "HierarchyIndex":
+        return cls.from_frames(model_id, dimensions, [df])
+
+    @classmethod
+    def from_frames(cls, model_id: int, dimensions: List[dict], frames: Iterable) -> "HierarchyIndex":
+        """Build from an iterator of DataFrame chunks, e.g. vena_client.iter_hierarchy"""
+        return cls.from_records(model_id, dimensions, records_from_frames(frames))
+
+    @classmethod
+    def from_columns(cls, model_id: int, dimensions: List[dict], columns: Dict[str, object]) -> "HierarchyIndex":
+        """Build from columns opened with columnar.open_columns"""
+        length = len(columns[MEMBER_ID_COLUMN])
+        return cls.from_records(model_id, dimensions, zip(*[
+            columns[column] if column in columns else [None] * length for column in HIERARCHY_COLUMNS
+        ]))
+
+def records_from_frames(frames: Iterable):
+    for df in frames:
+        yield from zip(*[df[column] if column in df.columns else [None] * len(df) for column in HIERARCHY_COLUMNS])
+
+# Loaded indexes by model id; vena_client serves hierarchy lookups from here when present
+hierarchy_indexes: Dict[int, HierarchyIndex] = {}
+
+def get_hierarchy_index(model_id: int) -> Optional[HierarchyIndex]:
+    try:
+        return hierarchy_indexes.get(int(model_id))
+    except (TypeError, ValueError):
+        return None
+
+def register_hierarchy_index(index: HierarchyIndex):
+    hierarchy_indexes[int(index.model_id)] = index
+
+def unregister_hierarchy_index(model_id: int):
+    hierarchy_indexes.pop(int(model_id), None)
@@ -0,0 +1,210 @@
+import math
+import os
+import re
+import threading
+import weakref
+from collections import defaultdict
+from typing import Dict, Iterable, List
+from .hierarchy_index import DimensionIndex
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower()) if text else []
+
+def trigrams(text: str) -> set:
+    grams = set()
+    for word in words(text):
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class MemberSearchIndex:
+    """Offline ranked search over one dimension's member names and aliases
+
+    Ranking combines BM25 over name/alias words, character-trigram overlap for typos and
+    partial words, and bonuses for exact and prefix matches. Attributes, when supplied as
+    {attribute name: member ids}, get their own inverted index and are searched by name.
+    Unless they are complete, callers keep asking Vena for attribute suggestions.
+    """
+
+    k1 = 1.2
+    b = 0.75
+    trigram_weight = 2.0
+    exact_bonus = 5.0
+    prefix_bonus = 1.0
+    max_candidates = 200
+
+    def __init__(self, dimension: DimensionIndex, attributes: Dict[str, Iterable] = None, complete: bool = False):
+        self.dimension = dimension
+        self.complete_attributes = complete
+        self.word_postings = defaultdict(dict)
+        self.trigram_postings = defaultdict(list)
+        self.trigram_counts = {}
+        self.lengths = {}
+        self.keys = {}
+
+        seen = set()
+        for node in range(len(dimension)):
+            member_id = dimension.member_ids[node]
+            # Shared members have one node per placement, only the primary one is searchable
+            if member_id in seen:
+                continue
+            seen.add(member_id)
+            name, alias = dimension.names[node], dimension.aliases[node]
+            text = name if alias == name else f"{name} {alias}"
+            tokens = words(text)
+            for token in tokens:
+                self.word_postings[token][node] = self.word_postings[token].get(node, 0) + 1
+            grams = trigrams(text)
+            for gram in grams:
+                self.trigram_postings[gram].append(node)
+            self.trigram_counts[node] = len(grams)
+            self.lengths[node] = len(tokens)
+            self.keys[node] = (name.lower(), alias.lower(), " ".join(words(name)), " ".join(words(alias)))
+
+        self.document_count = len(self.lengths) or 1
+        self.average_length = (sum(self.lengths.values()) / self.document_count) or 1
+
+        self.attribute_members = {}
+        self.attribute_postings = defaultdict(set)
+        self.add_attributes(attributes or {})
+
+    def add_attributes(self, attributes: Dict[str, Iterable]):
+        # Copied and swapped in, so searches running on other threads never see them half updated
+        members = dict(self.attribute_members)
+        postings = defaultdict(set, {token: set(names) for token, names in self.attribute_postings.items()})
+        for attribute, member_ids in attributes.items():
+            members[attribute] = [node for node in (self.dimension.find_by_id(member_id) for member_id in member_ids) if node is not None]
+            for token in words(attribute):
+                postings[token].add(attribute)
+        self.attribute_members, self.attribute_postings = members, postings
+
+    def idf(self, token: str) -> float:
+        frequency = len(self.word_postings.get(token, ()))
+        return math.log(1 + (self.document_count - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, limit: int = 10, attributes: bool = True) -> List[dict]:
+        query_words = words(query)
+        query_grams = trigrams(query)
+        if not query_words:
+            return []
+
+        # Very common trigrams carry little signal but dominate the cost, so they are skipped
+        common = max(1000, self.document_count // 20)
+        overlap = defaultdict(int)
+        for gram in query_grams:
+            postings = self.trigram_postings.get(gram, ())
+            if len(postings) > common:
+                continue
+            for node in postings:
+                overlap[node] += 1
+        candidates = set(sorted(overlap, key=overlap.get, reverse=True)[:self.max_candidates])
+        for token in query_words:
+            candidates.update(self.word_postings.get(token, {}))
+
+        normalized = " ".join(query_words)
+        prefix = query.lower().strip()
+        scored = []
+        for node in candidates:
+            score = 0.0
+            length = self.lengths[node]
+            for token in query_words:
+                frequency = self.word_postings.get(token, {}).get(node)
+                if frequency:
+                    score += self.idf(token) * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * (1 - self.b + self.b * length / self.average_length)
+                    )
+            # Dice coefficient over character trigrams tolerates typos and partial words
+            score += self.trigram_weight * 2 * overlap.get(node, 0) / (len(query_grams) + self.trigram_counts[node])
+            name, alias, name_words, alias_words = self.keys[node]
+            if normalized == name_words or normalized == alias_words:
+                score += self.exact_bonus
+            elif name.startswith(prefix) or alias.startswith(prefix):
+                score += self.prefix_bonus
+            scored.append((score, node))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        results = []
+        for score, node in scored[:limit]:
+            member = self.dimension.to_member(node)
+            member["type"] = "MEMBER"
+            member["score"] = round(score, 3)
+            results.append(member)
+        return results + self.search_attributes(query_words, limit) if attributes else results
+
+    def search_attributes(self, query_words: List[str], limit: int) -> List[dict]:
+        matches = set()
+        for token in query_words:
+            matches.update(self.attribute_postings.get(token, ()))
+        results = []
+        for attribute in sorted(matches, key=lambda name: -sum(token in words(name) for token in query_words))[:limit]:
+            nodes = self.attribute_members[attribute]
+            results.append({
+                "type": "ATTRIBUTE",
+                "name": attribute,
+                "numMembers": len(nodes),
+                "members": [self.dimension.names[node] for node in nodes[:limit]]
+            })
+        return results
+
+# Search indexes are built lazily per dimension and dropped together with their hierarchy index
+search_indexes = weakref.WeakKeyDictionary()
+search_lock = threading.Lock()
+
+def get_search_limit() -> int:
+    return int(os.environ.get("VENA_SEARCH_LIMIT", 10))
+
+def get_search_index(dimension: DimensionIndex) -> MemberSearchIndex:
+    with search_lock:
+        index = search_indexes.get(dimension)
+        if index is None:
+            index = MemberSearchIndex(dimension)
+            search_indexes[dimension] = index
+        return index
+
+def set_attributes(dimension: DimensionIndex, attributes: Dict[str, Iterable], complete: bool = True):
+    """Attach attribute membership ({attribute name: member ids}) to a dimension's search index
+
+    Incomplete attributes, such as those learned from Vena's suggestions, are added to the ones
+    already known without rebuilding the member index.
+    """
+    with search_lock:
+        index = search_indexes.get(dimension)
+        if complete or index is None:
+            search_indexes[dimension] = MemberSearchIndex(dimension, attributes, complete)
+        else:
+            index.add_attributes(attributes)
+
+def has_attribute(dimension: DimensionIndex, name: str) -> bool:
+    index = search_indexes.get(dimension)
+    name = name.strip().lower()
+    return index is not None and any(attribute.strip().lower() == name for attribute in index.attribute_members)
+
+def learn_attributes(dimension: DimensionIndex, results: List[dict]) -> int:
+    """Keep the membership of ATTRIBUTE suggestions that list all of their members, returns how many
+
+    Members may be given by name or as member records with an id.
+    """
+    attributes = {}
+    for result in results:
+        if not isinstance(result, dict) or result.get("type") != "ATTRIBUTE" or not result.get("name"):
+            continue
+        members = result.get("members")
+        if not isinstance(members, list) or len(members) < (result.get("numMembers") or 0):
+            continue
+        member_ids = []
+        for member in members:
+            if isinstance(member, dict):
+                node = dimension.find_by_id(member.get("id"))
+                if node is None and member.get("name"):
+                    node = dimension.find_by_name(str(member["name"]))
+            else:
+                node = dimension.find_by_name(str(member))
+            if node is not None:
+                member_ids.append(dimension.member_ids[node])
+        if len(member_ids) == len(members):
+            attributes[result["name"]] = member_ids
+    if attributes:
+        set_attributes(dimension, attributes, complete=False)
+    return len(attributes)
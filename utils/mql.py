@@ -0,0 +1,232 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+from .hierarchy_index import HierarchyIndex
+
+FUNCTIONS = {
+    "children",
+    "ichildren",
+    "descendants",
+    "idescendants",
+    "bottomlevel",
+    "ancestors",
+    "iancestors",
+    "parents"
+}
+OPERATORS = {"union", "intersection", "subtract", "not"}
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+    |(?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+    |(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<symbol>[():@])
+""", re.VERBOSE)
+
+class MQLError(Exception):
+    """Syntax or semantic error in an MQL query, with the character offset it was found at"""
+
+    def __init__(self, message: str, position: int, text: str = ""):
+        self.message = message
+        self.position = position
+        self.line = text.count("\n", 0, position) + 1
+        self.column = position - (text.rfind("\n", 0, position) + 1) + 1
+        super().__init__(f"{message} at line {self.line}, column {self.column}")
+
+@dataclass
+class Member:
+    name: str
+    position: int
+
+@dataclass
+class Attribute:
+    name: str
+    position: int
+
+@dataclass
+class Function:
+    name: str
+    argument: "Expression"
+    position: int
+
+@dataclass
+class Operator:
+    name: str
+    operands: List["Expression"]
+    position: int
+
+Expression = Union[Member, Attribute, Function, Operator]
+
+@dataclass
+class DimensionClause:
+    dimension: str
+    expression: Expression
+    position: int
+
+@dataclass
+class Query:
+    """A parsed query: dimension clauses, or a bare member expression for calculated members"""
+    clauses: List[DimensionClause] = field(default_factory=list)
+    expression: Optional[Expression] = None
+
+@dataclass
+class Token:
+    kind: str
+    value: str
+    position: int
+
+def tokenize(text: str) -> List[Token]:
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            if text[position] in "'\"":
+                raise MQLError("Unterminated quoted name", position, text)
+            raise MQLError(f"Unexpected character {text[position]!r}", position, text)
+        kind = match.lastgroup
+        if kind != "space":
+            value = match.group()
+            if kind == "string":
+                value = value[1:-1].replace(value[0] * 2, value[0])
+            tokens.append(Token(kind, value, position))
+        position = match.end()
+    tokens.append(Token("end", "", len(text)))
+    return tokens
+
+class Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def peek(self) -> Token:
+        return self.tokens[self.index]
+
+    def next(self) -> Token:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def describe(self, token: Token) -> str:
+        if token.kind == "end":
+            return "end of query"
+        if token.kind == "string":
+            return f"'{token.value}'"
+        return repr(token.value)
+
+    def expect(self, kind: str, value: str = None) -> Token:
+        token = self.next()
+        if token.kind != kind or (value is not None and token.value != value):
+            expected = repr(value) if value else {"string": "a quoted name", "name": "a keyword"}.get(kind, kind)
+            raise MQLError(f"Expected {expected} but found {self.describe(token)}", token.position, self.text)
+        return token
+
+    def parse(self) -> Query:
+        query = Query()
+        if self.peek().kind == "name" and self.peek().value.lower() == "dimension":
+            while self.peek().kind != "end":
+                query.clauses.append(self.parse_clause())
+        else:
+            query.expression = self.parse_expression()
+            if self.peek().kind != "end":
+                token = self.peek()
+                raise MQLError(f"Unexpected {self.describe(token)} after the member expression", token.position, self.text)
+        return query
+
+    def parse_clause(self) -> DimensionClause:
+        keyword = self.expect("name")
+        if keyword.value.lower() != "dimension":
+            raise MQLError(f"Expected 'dimension' but found {self.describe(keyword)}", keyword.position, self.text)
+        self.expect("symbol", "(")
+        dimension = self.expect("string")
+        self.expect("symbol", ":")
+        expression = self.parse_expression()
+        self.expect("symbol", ")")
+        return DimensionClause(dimension.value.strip(), expression, keyword.position)
+
+    def parse_expression(self) -> Expression:
+        token = self.next()
+        if token.kind == "string":
+            return Member(token.value.strip(), token.position)
+        if token.kind != "name":
+            raise MQLError(f"Expected a member, attribute, function or operator but found {self.describe(token)}", token.position, self.text)
+
+        name = token.value.lower()
+        if name == "attribute":
+            self.expect("symbol", "(")
+            self.expect("symbol", "@")
+            attribute = self.expect("string")
+            self.expect("symbol", ")")
+            return Attribute(attribute.value.strip(), token.position)
+        if name in FUNCTIONS:
+            self.expect("symbol", "(")
+            argument = self.parse_expression()
+            self.expect("symbol", ")")
+            return Function(name, argument, token.position)
+        if name in OPERATORS:
+            self.expect("symbol", "(")
+            operands = []
+            while self.peek().kind not in ("end",) and not (self.peek().kind == "symbol" and self.peek().value == ")"):
+                operands.append(self.parse_expression())
+            closing = self.expect("symbol", ")")
+            self.check_arity(name, operands, token, closing)
+            return Operator(name, operands, token.position)
+        raise MQLError(f"Unknown function or operator '{token.value}'", token.position, self.text)
+
+    def check_arity(self, name: str, operands: list, token: Token, closing: Token):
+        if name == "not" and len(operands) != 1:
+            raise MQLError(f"not() takes exactly 1 argument, got {len(operands)}", token.position, self.text)
+        if name == "subtract" and len(operands) != 2:
+            raise MQLError(f"subtract() takes exactly 2 arguments, got {len(operands)}", token.position, self.text)
+        if name in ("union", "intersection") and len(operands) < 1:
+            raise MQLError(f"{name}() needs at least 1 argument", closing.position, self.text)
+
+def parse_mql(text: str) -> Query:
+    """Parse MQL into a Query AST, raising MQLError with the offending position"""
+    return Parser(text).parse()
+
+def extract_mql(text: str) -> str:
+    """Strip markdown code fences an LLM may wrap around the query"""
+    match = re.search(r"```[a-zA-Z]*\n?(.*?)```", text, re.DOTALL)
+    return (match.group(1) if match else text).strip()
+
+def walk(expression: Expression):
+    yield expression
+    if isinstance(expression, Function):
+        yield from walk(expression.argument)
+    elif isinstance(expression, Operator):
+        for operand in expression.operands:
+            yield from walk(operand)
+
+def check_mql(query: Query, index: HierarchyIndex, text: str = "") -> List[MQLError]:
+    """Verify dimension and member names against a loaded hierarchy index"""
+    errors = []
+    seen = set()
+    targets = []
+    for clause in query.clauses:
+        dimension = index.dimension_by_name(clause.dimension)
+        if dimension is None:
+            known = ", ".join(f"'{name}'" for name in index.dimensions)
+            errors.append(MQLError(f"Unknown dimension '{clause.dimension}' (known dimensions: {known})", clause.position, text))
+            continue
+        if dimension.name in seen:
+            errors.append(MQLError(f"Dimension '{clause.dimension}' appears more than once", clause.position, text))
+        seen.add(dimension.name)
+        targets.append((clause.expression, [dimension]))
+    if query.expression is not None:
+        targets.append((query.expression, list(index.dimensions.values())))
+
+    for expression, dimensions in targets:
+        for node in walk(expression):
+            if isinstance(node, Member) and not any(dimension.find_by_name(node.name) is not None for dimension in dimensions):
+                where = f"dimension '{dimensions[0].name}'" if len(dimensions) == 1 else "any dimension"
+                errors.append(MQLError(f"Member '{node.name}' does not exist in {where}", node.position, text))
+    return errors
+
+def validate_locally(mql: str, index: HierarchyIndex = None) -> List[MQLError]:
+    """Syntax check, plus a semantic check when a hierarchy index is available"""
+    try:
+        query = parse_mql(mql)
+    except MQLError as e:
+        return [e]
+    return check_mql(query, index, mql) if index is not None else []
@@ -0,0 +1,230 @@
+import threading
+import weakref
+from typing import Dict, Iterable, List, Optional, Union
+from .hierarchy_index import DimensionIndex, HierarchyIndex
+from .member_search import search_indexes
+from .mql import Attribute, Expression, Function, Member, MQLError, Operator, Query, parse_mql, walk
+
+class DimensionSets:
+    """Precomputed bitmasks for one dimension, where bit i is preorder node i
+
+    Shared members have one node per placement; sets only ever hold the primary node of a
+    member, so the set algebra works on members rather than placements.
+    """
+
+    def __init__(self, dimension: DimensionIndex):
+        self.dimension = dimension
+        self.placements = {}
+        for node in range(len(dimension)):
+            self.placements.setdefault(dimension.member_ids[node], []).append(node)
+        self.shared = [
+            (node, nodes[0])
+            for nodes in self.placements.values() if len(nodes) > 1
+            for node in nodes[1:]
+        ]
+        self.universe = ((1 << len(dimension)) - 1) & ~to_bits((node for node, _ in self.shared), len(dimension))
+        # A placement counts as bottom level only if the member itself has no children
+        self.leaves = to_bits(
+            (node for node in range(len(dimension)) if dimension.is_leaf(self.primary(node))),
+            len(dimension)
+        )
+
+    def primary(self, node: int) -> int:
+        return self.placements[self.dimension.member_ids[node]][0]
+
+    def canonical(self, bits: int) -> int:
+        """Replace secondary placements of shared members with their primary node"""
+        for node, primary in self.shared:
+            if bits >> node & 1:
+                bits = (bits & ~(1 << node)) | (1 << primary)
+        return bits
+
+    def descendants(self, node: int) -> int:
+        start, end = node + 1, self.dimension.subtree_end[node]
+        return ((1 << (end - start)) - 1) << start if end > start else 0
+
+    def bottom_level(self, node: int) -> int:
+        return self.leaves & self.descendants(node)
+
+def to_bits(nodes: Iterable[int], size: int) -> int:
+    """Build a bitset from node numbers in one pass (setting bits one by one on an int is quadratic)"""
+    bitmap = bytearray((size + 7) // 8)
+    for node in nodes:
+        bitmap[node >> 3] |= 1 << (node & 7)
+    return int.from_bytes(bitmap, "little")
+
+# Built lazily per dimension and dropped together with their hierarchy index
+dimension_sets = weakref.WeakKeyDictionary()
+sets_lock = threading.Lock()
+
+def get_dimension_sets(dimension: DimensionIndex) -> DimensionSets:
+    with sets_lock:
+        sets = dimension_sets.get(dimension)
+        if sets is None:
+            sets = DimensionSets(dimension)
+            dimension_sets[dimension] = sets
+        return sets
+
+def iter_bits(bits: int):
+    """Set bit positions in ascending order, scanning a byte copy rather than shifting the int"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for position, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (position << 3) + low.bit_length() - 1
+            byte ^= low
+
+class MemberSet:
+    """Members of one dimension selected by an MQL expression, in hierarchy (preorder) order"""
+
+    def __init__(self, dimension: DimensionIndex, bits: int, restricted: bool = True):
+        self.dimension = dimension
+        self.bits = bits
+        self.restricted = restricted
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __contains__(self, member_id) -> bool:
+        node = self.dimension.find_by_id(member_id)
+        return node is not None and bool(self.bits >> node & 1)
+
+    def nodes(self) -> List[int]:
+        return list(iter_bits(self.bits))
+
+    def member_ids(self) -> List[int]:
+        return [self.dimension.member_ids[node] for node in iter_bits(self.bits)]
+
+    def members(self, limit: int = None) -> List[dict]:
+        result = []
+        for node in iter_bits(self.bits):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self.dimension.to_member(node))
+        return result
+
+class Evaluator:
+    """Resolves an MQL expression to a member bitset of one dimension"""
+
+    def __init__(self, dimension: DimensionIndex, text: str = ""):
+        self.dimension = dimension
+        self.sets = get_dimension_sets(dimension)
+        self.text = text
+
+    def evaluate(self, expression: Expression) -> int:
+        if isinstance(expression, Member):
+            node = self.dimension.find_by_name(expression.name)
+            if node is None:
+                raise MQLError(f"Member '{expression.name}' does not exist in dimension '{self.dimension.name}'", expression.position, self.text)
+            return 1 << node
+        if isinstance(expression, Attribute):
+            return self.attribute(expression)
+        if isinstance(expression, Function):
+            return self.sets.canonical(self.function(expression.name, self.evaluate(expression.argument)))
+        return self.operator(expression)
+
+    def attribute(self, expression: Attribute) -> int:
+        search_index = search_indexes.get(self.dimension)
+        attributes = search_index.attribute_members if search_index is not None else {}
+        name = expression.name.lower()
+        nodes = next((nodes for attribute, nodes in attributes.items() if attribute.strip().lower() == name), None)
+        if nodes is None:
+            raise MQLError(f"Attribute '{expression.name}' is not known locally or to Vena for dimension '{self.dimension.name}'", expression.position, self.text)
+        return to_bits(nodes, len(self.dimension))
+
+    def function(self, name: str, argument: int) -> int:
+        dimension, sets = self.dimension, self.sets
+        # Subtrees are contiguous node ranges and OR in as masks, everything else is collected as nodes
+        bits = 0
+        nodes = []
+        for node in iter_bits(argument):
+            if name in ("children", "ichildren"):
+                if not dimension.is_leaf(node):
+                    nodes.extend(dimension.children(node))
+            elif name in ("descendants", "idescendants"):
+                bits |= sets.descendants(node)
+            elif name == "bottomlevel":
+                if dimension.is_leaf(node):
+                    nodes.append(node)
+                else:
+                    bits |= sets.bottom_level(node)
+            else:
+                # ancestors/parents follow every placement of a shared member
+                for placement in sets.placements[dimension.member_ids[node]]:
+                    parent = dimension.parents[placement]
+                    if name == "parents":
+                        if parent != -1:
+                            nodes.append(parent)
+                        continue
+                    while parent != -1:
+                        nodes.append(parent)
+                        parent = dimension.parents[parent]
+            if name in ("ichildren", "idescendants", "iancestors"):
+                nodes.append(node)
+        return bits | to_bits(nodes, len(dimension))
+
+    def operator(self, expression: Operator) -> int:
+        operands = [self.evaluate(operand) for operand in expression.operands]
+        if expression.name == "union":
+            bits = 0
+            for operand in operands:
+                bits |= operand
+            return bits
+        if expression.name == "intersection":
+            bits = operands[0]
+            for operand in operands[1:]:
+                bits &= operand
+            return bits
+        if expression.name == "subtract":
+            return operands[0] & ~operands[1]
+        return self.sets.universe & ~operands[0]
+
+def first_member(expression: Expression) -> Optional[Member]:
+    return next((node for node in walk(expression) if isinstance(node, Member)), None)
+
+def resolve_mql(mql: Union[str, Query], index: HierarchyIndex) -> Dict[str, MemberSet]:
+    """Resolve a query to the selected members of every dimension of the model
+
+    Dimensions without a clause select all of their members. A bare member expression
+    (calculated member) is evaluated in the dimension that contains its first member.
+    """
+    text = mql if isinstance(mql, str) else ""
+    query = parse_mql(mql) if isinstance(mql, str) else mql
+
+    targets = []
+    for clause in query.clauses:
+        dimension = index.dimension_by_name(clause.dimension)
+        if dimension is None:
+            raise MQLError(f"Unknown dimension '{clause.dimension}'", clause.position, text)
+        targets.append((dimension, clause.expression))
+    if query.expression is not None:
+        member = first_member(query.expression)
+        dimension = next((
+            dimension for dimension in index.dimensions.values()
+            if member is not None and dimension.find_by_name(member.name) is not None
+        ), None)
+        if dimension is None:
+            raise MQLError("Cannot tell which dimension the member expression belongs to", 0, text)
+        targets.append((dimension, query.expression))
+
+    selection = {}
+    for dimension, expression in targets:
+        selection[dimension.name] = MemberSet(dimension, Evaluator(dimension, text).evaluate(expression))
+    for name, dimension in index.dimensions.items():
+        if name not in selection:
+            selection[name] = MemberSet(dimension, get_dimension_sets(dimension).universe, restricted=False)
+    return selection
+
+def summarize_selection(selection: Dict[str, MemberSet], sample: int = 5) -> dict:
+    """Cardinality per dimension plus a few example members, for agents and responses"""
+    dimensions = []
+    combinations = 1
+    for name, members in selection.items():
+        combinations *= len(members)
+        dimensions.append({
+            "dimension": name,
+            "count": len(members),
+            "all_members": not members.restricted,
+            "sample": [member["name"] for member in members.members(sample)] if members.restricted else []
+        })
+    return {"dimensions": dimensions, "combinations": combinations}
@@ -0,0 +1,69 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+from .async_vena_client import AsyncVenaClient, get_async_client
+from .tracing import annotate, traced
+
+# In-flight prefetches by model id, also keeping the tasks referenced until they finish
+prefetch_tasks: Dict[int, asyncio.Task] = {}
+
+def is_prefetch_enabled() -> bool:
+    return os.environ.get("VENA_PREFETCH", "1").lower() not in ("0", "false", "no")
+
+def get_prefetch_dimensions() -> List[str]:
+    """Dimension names or types whose top-level members are fetched as soon as a model is picked"""
+    dimensions = os.environ.get("VENA_PREFETCH_DIMENSIONS", "Account,Period,Department")
+    return [dimension.strip().lower() for dimension in dimensions.split(",") if dimension.strip()]
+
+def likely_dimensions(model: dict, names: List[str] = None) -> List[dict]:
+    names = names if names is not None else get_prefetch_dimensions()
+    return [
+        dimension for dimension in model["dimensions"]
+        if dimension["name"].lower() in names or str(dimension.get("typeDefinition", "")).lower() in names
+    ]
+
+@traced("prefetch")
+async def prefetch_model(client: AsyncVenaClient, model_id: int, model_name: str) -> int:
+    """Load a model's dimensions and the top-level members of its likely dimensions into the cache"""
+    model = await client.get_model(model_id, model_name)
+    dimensions = likely_dimensions(model)
+    results = await asyncio.gather(*[
+        client.get_children_of_member(model_id, dimension["number"], "root")
+        for dimension in dimensions
+    ], return_exceptions=True)
+    fetched = sum(1 for result in results if not isinstance(result, Exception))
+    annotate(model_id=int(model_id), dimensions=fetched)
+    return fetched
+
+def start_prefetch(model_id: int, model_name: str = "", client: AsyncVenaClient = None) -> Optional[asyncio.Task]:
+    """Speculatively prefetch a just-selected model in the background, overlapping the next LLM call
+
+    The tools that follow read the same cache entries, so they hit once the prefetch is done.
+    Errors are left for those tools to report; outside a running event loop nothing is started.
+    """
+    if not is_prefetch_enabled():
+        return None
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    model_id = int(model_id)
+    task = prefetch_tasks.get(model_id)
+    if task is None or task.done():
+        task = asyncio.create_task(prefetch_model(client or get_async_client(), model_id, model_name))
+        prefetch_tasks[model_id] = task
+        task.add_done_callback(lambda finished: finish_prefetch(model_id, finished))
+    return task
+
+def finish_prefetch(model_id: int, task: asyncio.Task):
+    if prefetch_tasks.get(model_id) is task:
+        del prefetch_tasks[model_id]
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Vena prefetch of model {model_id} failed: {task.exception()}")
+
+async def stop_prefetch():
+    tasks = list(prefetch_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    prefetch_tasks.clear()
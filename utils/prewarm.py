@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+from .async_vena_client import AsyncVenaClient, get_async_client
+from .cache import metadata_cache
+
+class Readiness:
+    """Progress of the prewarm phase, for startup logs and health checks"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.started_at = None
+        self.finished_at = None
+        self.runs = 0
+        self.models = 0
+        self.dimensions = 0
+        self.errors = []
+
+    @property
+    def ready(self) -> bool:
+        # Once warmed, later background refreshes keep serving from the previous data
+        return self.runs > 0
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "runs": self.runs,
+            "models": self.models,
+            "dimensions": self.dimensions,
+            "errors": list(self.errors),
+            "seconds": round(self.finished_at - self.started_at, 3) if self.finished_at and self.started_at else None
+        }
+
+readiness = Readiness()
+prewarm_task: Optional[asyncio.Task] = None
+
+def get_readiness() -> dict:
+    return readiness.to_dict()
+
+def is_prewarm_enabled() -> bool:
+    return os.environ.get("VENA_PREWARM", "1").lower() not in ("0", "false", "no")
+
+def get_prewarm_interval() -> float:
+    """Seconds between background refreshes, 0 disables them; defaults to just under the cache TTL"""
+    return float(os.environ.get("VENA_PREWARM_INTERVAL", float(os.environ.get("VENA_CACHE_TTL", 900)) * 0.8))
+
+def get_prewarm_models() -> Optional[List[int]]:
+    models = os.environ.get("VENA_PREWARM_MODELS")
+    return [int(model_id) for model_id in models.split(",") if model_id.strip()] if models else None
+
+async def prewarm_model(client: AsyncVenaClient, model: dict, refresh: bool) -> int:
+    """Load one model's dimensions and the top-level members of every dimension, returns the dimension count"""
+    if refresh:
+        metadata_cache.invalidate("model", int(model["id"]))
+        metadata_cache.invalidate("children", int(model["id"]))
+    info = await client.get_model(model["id"], model["name"])
+    results = await asyncio.gather(*[
+        client.get_children_of_member(model["id"], dimension["number"], "root")
+        for dimension in info["dimensions"]
+    ], return_exceptions=True)
+    for dimension, result in zip(info["dimensions"], results):
+        if isinstance(result, Exception):
+            readiness.errors.append(f"model {model['id']} dimension {dimension['name']}: {result}")
+    return len(info["dimensions"])
+
+async def prewarm(client: AsyncVenaClient = None, model_ids: List[int] = None, refresh: bool = False) -> dict:
+    """Concurrently load the model list, every model's dimensions and top-level members into the shared cache"""
+    client = client or get_async_client()
+    model_ids = model_ids or get_prewarm_models()
+    readiness.status = "refreshing" if readiness.ready else "warming"
+    readiness.started_at = time.monotonic()
+    readiness.finished_at = None
+    readiness.errors = []
+    try:
+        # Refreshes drop entries one model at a time just before refetching, never the whole cache at once
+        if refresh:
+            metadata_cache.invalidate("models")
+        models = await client.list_models()
+        if model_ids:
+            models = [model for model in models if int(model["id"]) in model_ids]
+        results = await asyncio.gather(*[prewarm_model(client, model, refresh) for model in models], return_exceptions=True)
+        readiness.models = 0
+        readiness.dimensions = 0
+        for model, result in zip(models, results):
+            if isinstance(result, Exception):
+                readiness.errors.append(f"model {model['id']}: {result}")
+            else:
+                readiness.models += 1
+                readiness.dimensions += result
+        readiness.status = "ready" if not readiness.errors else "degraded"
+    except Exception as e:
+        readiness.errors.append(str(e))
+        readiness.status = "failed"
+    readiness.finished_at = time.monotonic()
+    readiness.runs += 1
+    report = get_readiness()
+    print(f"Vena prewarm {report['status']}: {report['models']} models, {report['dimensions']} dimensions in {report['seconds']}s"
+          + (f" ({len(report['errors'])} errors)" if report["errors"] else ""))
+    return report
+
+async def prewarm_loop(interval: float):
+    await prewarm()
+    while interval > 0:
+        await asyncio.sleep(interval)
+        await prewarm(refresh=True)
+
+def start_prewarm(interval: float = None) -> Optional[asyncio.Task]:
+    """Prewarm in the background without delaying startup, then refresh every interval seconds"""
+    global prewarm_task
+    if not is_prewarm_enabled():
+        return None
+    if prewarm_task is None or prewarm_task.done():
+        prewarm_task = asyncio.create_task(prewarm_loop(get_prewarm_interval() if interval is None else interval))
+    return prewarm_task
+
+async def stop_prewarm():
+    global prewarm_task
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+        try:
+            await prewarm_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        prewarm_task = None
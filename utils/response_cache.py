@@ -0,0 +1,164 @@
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+from .cache import TTLCache
+from .hierarchy_index import get_hierarchy_index
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+EMBEDDING_SIZE = 1024
+# Longest member name, in words, looked up in the hierarchy when comparing similar questions
+MAX_NAME_WORDS = 3
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a key"""
+    return " ".join(WORD_PATTERN.findall(query.lower()))
+
+def embed(text: str) -> Dict[int, float]:
+    """Local sparse embedding: hashed word and character-trigram counts, L2 normalized
+
+    Cheap and dependency free; good enough to match rephrasings that share most of their
+    words, which is all the similarity tier is meant to catch.
+    """
+    features = Counter()
+    for word in text.split():
+        features[zlib.crc32(word.encode()) % EMBEDDING_SIZE] += 2
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_SIZE] += 1
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1
+    return {key: value / norm for key, value in features.items()}
+
+def similarity(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(key, 0) for key, value in a.items())
+
+def member_words(members: List[Dict[str, Any]]) -> Set[str]:
+    """Words of the names and aliases of an answer's members"""
+    words = set()
+    for member in members or []:
+        for name in (member.get("name"), member.get("alias")):
+            words.update(WORD_PATTERN.findall(str(name or "").lower()))
+    return words
+
+def key_terms(normalized: str, words: Set[str], model_id: int) -> Set[str]:
+    """Terms that change what a question selects: numbers, words of the answer's members, and member names in the hierarchy"""
+    tokens = normalized.split()
+    terms = {token for token in tokens if any(c.isdigit() for c in token) or token in words}
+    index = get_hierarchy_index(model_id)
+    if index is not None:
+        for size in range(1, MAX_NAME_WORDS + 1):
+            for i in range(len(tokens) - size + 1):
+                phrase = " ".join(tokens[i:i + size])
+                if any(dimension.find_by_name(phrase) is not None for dimension in index.dimensions.values()):
+                    terms.add(phrase)
+    return terms
+
+class ResponseCache:
+    """End-to-end cache of validated question -> (model, members, MQL) answers
+
+    Lookups try the exact normalized query first, then, when a similarity threshold is
+    configured and the model is known, the closest cached query of that model by local
+    embedding. A similar query only matches when its numbers and member names are the same,
+    so "revenue in 2023" never gets the answer for 2022. Entries remember the hierarchy
+    snapshot version they were produced against and are dropped once it changes.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400, threshold: float = None):
+        self.entries = TTLCache(maxsize, ttl)
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        # Normalized queries per model, with embeddings for the similarity tier
+        self.queries: Dict[int, Dict[str, Dict[int, float]]] = {}
+        self.similar_hits = 0
+
+    def snapshot_version(self, model_id: int) -> Optional[str]:
+        index = get_hierarchy_index(model_id)
+        return index.version if index is not None else None
+
+    def get(self, query: str, model_id: int = None) -> Optional[Dict[str, Any]]:
+        """Cached answer for a query to a model; without a model only an exact query that maps to one model is answered"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        with self.lock:
+            model_ids = [int(model_id)] if model_id is not None else list(self.queries)
+
+        # Exact tier; without a model the query must map to a single model to be unambiguous
+        matches = [entry for entry in (self.lookup(model, normalized) for model in model_ids) if entry is not None]
+        if len(matches) == 1:
+            return matches[0]
+        if matches or self.threshold is None or model_id is None:
+            return None
+
+        model_id = int(model_id)
+        vector = embed(normalized)
+        with self.lock:
+            candidates = list(self.queries.get(model_id, {}).items())
+        scored = sorted(((similarity(vector, other), key) for key, other in candidates), reverse=True)
+        for score, key in scored:
+            if score < self.threshold:
+                break
+            entry = self.lookup(model_id, key)
+            if entry is None:
+                continue
+            words = member_words(entry.get("members"))
+            if key_terms(normalized, words, model_id) == key_terms(key, words, model_id):
+                self.similar_hits += 1
+                return entry
+        return None
+
+    def lookup(self, model_id: int, normalized: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(("response", model_id, normalized))
+        if entry is None:
+            # Expired or evicted, forget the query too
+            with self.lock:
+                self.queries.get(model_id, {}).pop(normalized, None)
+            return None
+        if entry["snapshot_version"] != self.snapshot_version(model_id):
+            self.invalidate_model(model_id)
+            return None
+        return entry
+
+    def set(self, query: str, model_id: int, answer: Dict[str, Any]):
+        """Store a validated answer; answer holds the model, predicted members and MQL"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        model_id = int(model_id)
+        self.entries.set(("response", model_id, normalized), {
+            **answer,
+            "query": query,
+            "model_id": model_id,
+            "snapshot_version": self.snapshot_version(model_id)
+        })
+        with self.lock:
+            self.queries.setdefault(model_id, {})[normalized] = embed(normalized) if self.threshold is not None else {}
+
+    def invalidate_model(self, model_id: int = None) -> int:
+        with self.lock:
+            if model_id is None:
+                self.queries.clear()
+            else:
+                self.queries.pop(int(model_id), None)
+        if model_id is None:
+            return self.entries.invalidate("response")
+        return self.entries.invalidate("response", int(model_id))
+
+    def stats(self) -> dict:
+        return {**self.entries.stats(), "similar_hits": self.similar_hits}
+
+def get_similarity_threshold() -> Optional[float]:
+    threshold = os.environ.get("VENA_RESPONSE_CACHE_SIMILARITY")
+    return float(threshold) if threshold else None
+
+# Shared by every session in the process
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get("VENA_RESPONSE_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("VENA_RESPONSE_CACHE_TTL", 86400)),
+    threshold=get_similarity_threshold()
+)
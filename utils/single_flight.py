@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable
+from .tracing import count
+
+class SingleFlight:
+    """Coalesces identical concurrent calls: while one is in flight, callers with the same key share its result
+
+    Keys name the request, such as ("model", model_id), like the metadata cache keys. Nothing is
+    kept once the call returns, so this only guards bursts; caching stays with TTLCache. Sync
+    callers may be on any thread; async callers share a task per event loop. Each coalesced
+    call is also counted on the current trace span.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.tasks = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, function: Callable[..., Any], *args) -> Any:
+        with self.lock:
+            future = self.futures.get(key)
+            leader = future is None
+            if leader:
+                future = self.futures[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            count(requests_coalesced=1)
+            return future.result()
+
+        try:
+            result = function(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.futures[key]
+
+    async def do_async(self, key: Hashable, function: Callable[..., Awaitable[Any]], *args) -> Any:
+        key = (asyncio.get_running_loop(), key)
+        with self.lock:
+            task = self.tasks.get(key)
+            leader = task is None
+            if leader:
+                task = self.tasks[key] = asyncio.ensure_future(function(*args))
+                task.add_done_callback(lambda done: self.finish(key, done))
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            count(requests_coalesced=1)
+        # A cancelled caller leaves the shared call running for the others
+        return await asyncio.shield(task)
+
+    def finish(self, key: Hashable, task: asyncio.Task):
+        with self.lock:
+            if self.tasks.get(key) is task:
+                del self.tasks[key]
+        # Marks the error as retrieved when every caller was cancelled before it arrived
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "in_flight": len(self.futures) + len(self.tasks),
+                "calls": self.calls,
+                "coalesced": self.coalesced
+            }
+
+# Shared by the sync and async Vena clients, so every session in the process joins the same requests
+vena_calls = SingleFlight()
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from . import vena_client as vc
+from .cache import invalidate_model
+from .response_cache import response_cache
+from .columnar import ColumnarWriter, INT_COLUMN, STRING_COLUMN, open_columns
+from .hierarchy_index import DimensionIndex, HierarchyIndex, get_hierarchy_index, register_hierarchy_index
+
+NODE_SCHEMA = {
+    "member_ids": INT_COLUMN,
+    "names": STRING_COLUMN,
+    "aliases": STRING_COLUMN,
+    "parents": INT_COLUMN,
+    "depths": INT_COLUMN,
+    "subtree_end": INT_COLUMN
+}
+SNAPSHOT_FILE = "snapshot.json"
+CURRENT_FILE = "CURRENT"
+
+def get_data_dir() -> str:
+    return os.environ.get("VENA_DATA_DIR", os.path.join("data", "snapshots"))
+
+def fingerprint(metadata) -> str:
+    """Stable hash of a model's metadata used to decide whether its hierarchy must be re-exported"""
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, default=str).encode()).hexdigest()
+
+class SnapshotStore:
+    """Versioned on-disk hierarchy snapshots, loaded back through memory mapping
+
+    Layout: <data_dir>/hierarchies/<model_id>/<version>/ holds one directory of columnar
+    files per dimension plus snapshot.json, and <model_id>/CURRENT names the live version.
+    New versions are written to a temporary directory and switched in atomically, so worker
+    processes sharing the directory always see a complete snapshot and share page cache.
+    """
+
+    def __init__(self, data_dir: str = None, keep: int = None):
+        self.root = os.path.join(data_dir or get_data_dir(), "hierarchies")
+        self.keep = keep or int(os.environ.get("VENA_SNAPSHOT_KEEP", 2))
+
+    def model_dir(self, model_id: int) -> str:
+        return os.path.join(self.root, str(int(model_id)))
+
+    def model_ids(self) -> List[int]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name) for name in os.listdir(self.root) if name.isdigit())
+
+    def current_version(self, model_id: int) -> Optional[str]:
+        try:
+            with open(os.path.join(self.model_dir(model_id), CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, model_id: int, version: str = None) -> Optional[dict]:
+        version = version or self.current_version(model_id)
+        if version is None:
+            return None
+        with open(os.path.join(self.model_dir(model_id), version, SNAPSHOT_FILE)) as f:
+            return json.load(f)
+
+    def save(self, index: HierarchyIndex, model: dict, model_fingerprint: str) -> str:
+        """Persist a built index as a new version and make it current"""
+        model_dir = self.model_dir(index.model_id)
+        os.makedirs(model_dir, exist_ok=True)
+        version = self.new_version(model_dir, model_fingerprint)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=model_dir)
+
+        try:
+            dimensions = []
+            for position, dimension in enumerate(index.dimensions.values()):
+                path = f"dim_{position}"
+                with ColumnarWriter(os.path.join(staging, path, "nodes"), NODE_SCHEMA) as writer:
+                    writer.append({
+                        "member_ids": dimension.member_ids,
+                        "names": dimension.names,
+                        "aliases": dimension.aliases,
+                        "parents": dimension.parents,
+                        "depths": dimension.depths,
+                        "subtree_end": dimension.subtree_end
+                    }, len(dimension))
+                with ColumnarWriter(os.path.join(staging, path, "child_offsets"), {"values": INT_COLUMN}) as writer:
+                    writer.append({"values": dimension.child_offsets}, len(dimension.child_offsets))
+                with ColumnarWriter(os.path.join(staging, path, "child_nodes"), {"values": INT_COLUMN}) as writer:
+                    writer.append({"values": dimension.child_nodes}, len(dimension.child_nodes))
+                dimensions.append({
+                    "name": dimension.name,
+                    "number": dimension.number,
+                    "id": dimension.id,
+                    "path": path,
+                    "members": len(dimension)
+                })
+
+            with open(os.path.join(staging, SNAPSHOT_FILE), "w") as f:
+                json.dump({
+                    "model_id": int(index.model_id),
+                    "version": version,
+                    "fingerprint": model_fingerprint,
+                    "created_at": time.time(),
+                    "model": model,
+                    "dimensions": dimensions
+                }, f)
+
+            os.replace(staging, os.path.join(model_dir, version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer = os.path.join(model_dir, f".{CURRENT_FILE}.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(model_dir, CURRENT_FILE))
+        self.prune(index.model_id)
+        return version
+
+    def new_version(self, model_dir: str, model_fingerprint: str) -> str:
+        """Sortable version name, unique even for repeated saves of the same model within a second"""
+        now = time.time()
+        version = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}.{int(now % 1 * 1e6):06d}-{model_fingerprint[:8]}"
+        candidate, counter = version, 0
+        while os.path.exists(os.path.join(model_dir, candidate)):
+            counter += 1
+            candidate = f"{version}-{counter}"
+        return candidate
+
+    def load(self, model_id: int, use_mmap: bool = True) -> Optional[HierarchyIndex]:
+        """Open the current snapshot of a model without rebuilding anything, or None if there is none"""
+        manifest = self.manifest(model_id)
+        if manifest is None:
+            return None
+        version_dir = os.path.join(self.model_dir(model_id), manifest["version"])
+        dimensions = {}
+        for meta in manifest["dimensions"]:
+            path = os.path.join(version_dir, meta["path"])
+            nodes = open_columns(os.path.join(path, "nodes"), use_mmap)
+            dimensions[meta["name"]] = DimensionIndex(
+                meta["name"],
+                nodes["member_ids"],
+                nodes["names"],
+                nodes["aliases"],
+                nodes["parents"],
+                nodes["depths"],
+                nodes["subtree_end"],
+                open_columns(os.path.join(path, "child_offsets"), use_mmap)["values"],
+                open_columns(os.path.join(path, "child_nodes"), use_mmap)["values"],
+                meta["number"],
+                meta["id"]
+            )
+        return HierarchyIndex(manifest["model_id"], dimensions, manifest["version"])
+
+    def prune(self, model_id: int):
+        model_dir = self.model_dir(model_id)
+        current = self.current_version(model_id)
+        versions = sorted(
+            name for name in os.listdir(model_dir)
+            if not name.startswith(".") and name != CURRENT_FILE and name != current
+        )
+        for version in versions[:max(0, len(versions) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+
+def load_snapshots(data_dir: str = None) -> Dict[int, str]:
+    """Register the current snapshot of every stored model, returns {model_id: version}"""
+    store = SnapshotStore(data_dir)
+    loaded = {}
+    for model_id in store.model_ids():
+        index = store.load(model_id)
+        if index is not None:
+            register_hierarchy_index(index)
+            loaded[model_id] = index.version
+    return loaded
+
+def reload_snapshots(data_dir: str = None) -> Dict[int, str]:
+    """Register snapshots made current since they were loaded, e.g. by the refresh CLI, returns {model_id: version}"""
+    store = SnapshotStore(data_dir)
+    reloaded = {}
+    for model_id in store.model_ids():
+        version = store.current_version(model_id)
+        loaded = get_hierarchy_index(model_id)
+        if version is None or (loaded is not None and loaded.version == version):
+            continue
+        index = store.load(model_id)
+        if index is None:
+            continue
+        register_hierarchy_index(index)
+        # Metadata and answers cached in this process came from the previous hierarchy
+        invalidate_model(model_id)
+        response_cache.invalidate_model(model_id)
+        reloaded[model_id] = index.version
+    return reloaded
+
+def get_reload_interval() -> float:
+    """Seconds between checks for new snapshot versions in a server process, 0 disables them"""
+    return float(os.environ.get("VENA_SNAPSHOT_RELOAD_INTERVAL", 60))
+
+reload_task: Optional[asyncio.Task] = None
+
+async def reload_loop(interval: float, data_dir: str = None):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for model_id, version in (await asyncio.to_thread(reload_snapshots, data_dir)).items():
+                print(f"Model {model_id}: loaded snapshot {version}")
+        except Exception as e:
+            print(f"Snapshot reload failed: {e}")
+
+def start_snapshot_reload(interval: float = None, data_dir: str = None) -> Optional[asyncio.Task]:
+    """Pick up snapshots refreshed by another process every interval seconds, in the background"""
+    global reload_task
+    interval = get_reload_interval() if interval is None else interval
+    if interval <= 0:
+        return None
+    if reload_task is None or reload_task.done():
+        reload_task = asyncio.create_task(reload_loop(interval, data_dir))
+    return reload_task
+
+async def stop_snapshot_reload():
+    global reload_task
+    if reload_task is not None:
+        reload_task.cancel()
+        try:
+            await reload_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        reload_task = None
+
+def refresh_snapshots(model_ids: List[int] = None, data_dir: str = None, force: bool = False) -> Dict[int, str]:
+    """Re-export only the models whose metadata fingerprint changed, returns {model_id: new version}"""
+    store = SnapshotStore(data_dir)
+    refreshed = {}
+    for metadata in vc.get_models_metadata():
+        model_id = int(metadata["id"])
+        if model_ids and model_id not in model_ids:
+            continue
+        invalidate_model(model_id)
+        model = vc.get_model(model_id, metadata.get("name", ""))
+        model_fingerprint = fingerprint([metadata, model["dimensions"]])
+        current = store.manifest(model_id)
+        if not force and current is not None and current["fingerprint"] == model_fingerprint:
+            continue
+
+        with tempfile.TemporaryDirectory(dir=store.root if os.path.isdir(store.root) else None) as export_dir:
+            vc.export_hierarchy(model_id, export_dir)
+            index = HierarchyIndex.from_columns(model_id, model["dimensions"], open_columns(export_dir))
+            refreshed[model_id] = store.save(index, model, model_fingerprint)
+        register_hierarchy_index(store.load(model_id))
+        # Cached answers were validated against the previous hierarchy
+        response_cache.invalidate_model(model_id)
+    return refreshed
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Manage on-disk Vena hierarchy snapshots")
+    parser.add_argument("command", choices=["refresh", "list"])
+    parser.add_argument("--model", type=int, action="append", help="Limit to this model id (repeatable)")
+    parser.add_argument("--data-dir", default=None, help="Snapshot directory (default: $VENA_DATA_DIR or data/snapshots)")
+    parser.add_argument("--force", action="store_true", help="Re-export even if the metadata is unchanged")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        refreshed = refresh_snapshots(args.model, args.data_dir, args.force)
+        for model_id, version in refreshed.items():
+            print(f"Model {model_id}: exported snapshot {version}")
+        if not refreshed:
+            print("All snapshots are up to date")
+    else:
+        store = SnapshotStore(args.data_dir)
+        for model_id in store.model_ids():
+            manifest = store.manifest(model_id)
+            if manifest is not None:
+                members = sum(dim["members"] for dim in manifest["dimensions"])
+                print(f"Model {model_id}: version {manifest['version']}, {len(manifest['dimensions'])} dimensions, {members} members")
+
+if __name__ == "__main__":
+    main()
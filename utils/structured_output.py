@@ -0,0 +1,151 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+class PredictedMember(BaseModel):
+    """One member picked for a query"""
+    dimension: str
+    name: str
+    alias: Optional[str]
+
+class MemberPrediction(BaseModel):
+    """Typed result of member prediction, shared by the agent frameworks"""
+    model_id: Optional[int]
+    model_name: Optional[str]
+    members: List[PredictedMember]
+    clarification: Optional[str]
+
+    def by_dimension(self) -> Dict[str, List[str]]:
+        members = {}
+        for member in self.members:
+            members.setdefault(member.dimension, []).append(member.name)
+        return members
+
+    def to_markdown(self) -> str:
+        if self.clarification and not self.members:
+            return self.clarification
+        lines = []
+        if self.model_name:
+            lines.append(f"**Model**: {self.model_name}" + (f" (id {self.model_id})" if self.model_id is not None else ""))
+        elif self.model_id is not None:
+            lines.append(f"**Model**: id {self.model_id}")
+        for dimension, names in self.by_dimension().items():
+            lines.append(f"- **{dimension}**: {', '.join(names)}")
+        if self.clarification:
+            lines.append("")
+            lines.append(self.clarification)
+        return "\n".join(lines)
+
+# Largest candidate list turned into an enum; beyond it names are checked after decoding
+MAX_ENUM_SIZE = 500
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAI structured-output response_format for a strict JSON schema"""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+def string_schema(values: List[str] = None) -> Dict[str, Any]:
+    values = sorted(set(values or []))
+    if values and len(values) <= MAX_ENUM_SIZE:
+        return {"type": "string", "enum": values}
+    return {"type": "string"}
+
+def dimension_plan_schema(dimensions: List[str]) -> Dict[str, Any]:
+    """{"dimensions": [{"dimension", "queries"}]} with the dimension limited to the model's names"""
+    return {
+        "type": "object",
+        "properties": {
+            "dimensions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "dimension": string_schema(dimensions),
+                        "queries": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": ["dimension", "queries"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["dimensions"],
+        "additionalProperties": False
+    }
+
+def member_selection_schema(candidates: List[str]) -> Dict[str, Any]:
+    """{"members": [<name>, ...]} with the names limited to the candidates, so picks cannot be invented"""
+    return {
+        "type": "object",
+        "properties": {"members": {"type": "array", "items": string_schema(candidates)}},
+        "required": ["members"],
+        "additionalProperties": False
+    }
+
+FENCE_PATTERN = re.compile(r"```[a-zA-Z]*\n?(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([\]}])")
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+def close_brackets(text: str) -> str:
+    """Close strings, arrays and objects left open by a truncated response"""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            stack.append("]" if char == "[" else "}")
+        elif char in "]}" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = TRAILING_COMMA_PATTERN.sub(r"\1", text.rstrip().rstrip(","))
+    return text + "".join(reversed(stack))
+
+def repair_json(text: str) -> Any:
+    """Parse the JSON in an LLM response, repairing the usual damage, None if nothing is recoverable
+
+    Handles code fences, prose around the value, trailing commas, Python literals,
+    single-quoted strings and truncation, without another LLM call.
+    """
+    if not text:
+        return None
+    match = FENCE_PATTERN.search(text)
+    if match:
+        text = match.group(1)
+    starts = [position for position in (text.find("{"), text.find("[")) if position != -1]
+    if not starts:
+        return None
+    text = text[min(starts):].strip()
+    candidates = [text]
+    end = max(text.rfind("}"), text.rfind("]"))
+    if end != -1:
+        candidates.append(text[:end + 1])
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    repaired = TRAILING_COMMA_PATTERN.sub(r"\1", candidates[-1])
+    repaired = re.sub(r"\b(True|False|None)\b", lambda m: PYTHON_LITERALS[m.group(1)], repaired)
+    if '"' not in repaired:
+        repaired = repaired.replace("'", '"')
+    for candidate in (repaired, close_brackets(repaired), close_brackets(text)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    return None
+
+def parse_items(text: str, key: str) -> List[Any]:
+    """The list under key of a structured response, also accepting a bare list; empty if unusable"""
+    value = repair_json(text)
+    if isinstance(value, dict):
+        value = value.get(key)
+    return value if isinstance(value, list) else []
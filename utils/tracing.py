@@ -0,0 +1,447 @@
+"""Spans and per-stage timing for chat turns, LLM completions, tool invocations and Vena calls
+
+Every finished span is recorded in an in-process histogram per stage and name, see
+get_trace_stats(). Spans are also exported as JSON lines to TRACE_FILE and, with
+TRACE_OTEL=1, to the OpenTelemetry tracer provider the process configured (needs
+opentelemetry-api). Spans nest through a context variable, so the Vena calls a tool
+makes and the completions of a turn share its trace.
+
+    python -m utils.tracing traces.jsonl    # per-stage latency table of an exported file
+"""
+import argparse
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# Upper bounds of the histogram buckets in milliseconds; one more bucket holds everything slower
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# Numeric span attributes that are summed per stage
+COUNTER_SUFFIXES = ("_bytes", "_tokens", "_hits", "_misses", "_coalesced", "_routes")
+
+current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation; counters (bytes, tokens, cache hits) are summed per stage"""
+
+    def __init__(self, stage: str, name: str, attributes: Dict[str, Any] = None, parent: "Span" = None):
+        self.stage = stage
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+        # Per-sink state, e.g. the OpenTelemetry span mirroring this one
+        self.exported = {}
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, **counts):
+        for key, count in counts.items():
+            self.attributes[key] = self.attributes.get(key, 0) + count
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self) -> dict:
+        """OpenTelemetry-style span record"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent else None,
+            "name": f"{self.stage}.{self.name}",
+            "stage": self.stage,
+            "start_time_unix_nano": int(self.start_time * 1e9),
+            "end_time_unix_nano": int((self.start_time + (self.duration or 0)) * 1e9),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": "ERROR" if self.error else "OK",
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+class Histogram:
+    """Fixed-bucket latency histogram plus sums of the spans' counters"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self.totals: Dict[str, float] = {}
+
+    def record(self, duration_ms: float, error: bool = False, attributes: Dict[str, Any] = None):
+        index = next((i for i, bound in enumerate(BUCKETS_MS) if duration_ms <= bound), len(BUCKETS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.total_ms += duration_ms
+        self.min_ms = duration_ms if self.min_ms is None else min(self.min_ms, duration_ms)
+        self.max_ms = duration_ms if self.max_ms is None else max(self.max_ms, duration_ms)
+        for key, value in (attributes or {}).items():
+            if key.endswith(COUNTER_SUFFIXES) and isinstance(value, (int, float)):
+                self.totals[key] = self.totals.get(key, 0) + value
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the quantile, capped at the slowest span seen"""
+        if not self.count:
+            return None
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= fraction * self.count:
+                return min(BUCKETS_MS[index], self.max_ms) if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "min_ms": self.min_ms,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": dict(zip([str(bound) for bound in BUCKETS_MS] + ["inf"], self.buckets)),
+            "totals": dict(self.totals)
+        }
+
+class JsonlSink:
+    """Appends every finished span to a file as one JSON line"""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.file = open(path, "a", buffering=1)
+
+    def start(self, span: Span):
+        pass
+
+    def end(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+class OpenTelemetrySink:
+    """Mirrors spans onto the OpenTelemetry tracer provider, which owns the exporter"""
+
+    def __init__(self):
+        from opentelemetry import trace
+        self.trace = trace
+        self.tracer = trace.get_tracer("bakeoff")
+
+    def start(self, span: Span):
+        parent = span.parent.exported.get("otel") if span.parent else None
+        span.exported["otel"] = self.tracer.start_span(
+            f"{span.stage}.{span.name}",
+            context=self.trace.set_span_in_context(parent) if parent is not None else None,
+            start_time=int(span.start_time * 1e9)
+        )
+
+    def end(self, span: Span):
+        otel_span = span.exported.get("otel")
+        if otel_span is None:
+            return
+        otel_span.set_attributes({
+            key: value for key, value in span.attributes.items() if isinstance(value, (str, bool, int, float))
+        })
+        if span.error:
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
+
+    def close(self):
+        pass
+
+class Tracer:
+    """Creates spans, keeps the per-stage histograms and hands finished spans to the sinks"""
+
+    def __init__(self, sinks: List[Any] = None):
+        self.sinks = list(sinks or [])
+        self.histograms: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def start(self, stage: str, name: str, **attributes) -> Span:
+        """Start a span under the current one without making it current (for work that outlives a block)"""
+        span = Span(stage, name, attributes, current_span.get())
+        for sink in self.sinks:
+            try:
+                sink.start(span)
+            except Exception as e:
+                print(f"Trace sink {type(sink).__name__} failed: {e}")
+        return span
+
+    def end(self, span: Span, error: BaseException = None):
+        span.duration = time.perf_counter() - span.started
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        duration_ms = span.duration * 1000
+        with self.lock:
+            for key in (span.stage, f"{span.stage}.{span.name}"):
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.record(duration_ms, span.error is not None, span.attributes)
+        for sink in self.sinks:
+            try:
+                sink.end(span)
+            except Exception as e:
+                print(f"Trace sink {type(sink).__name__} failed: {e}")
+
+    @contextmanager
+    def span(self, stage: str, name: str, **attributes):
+        span = self.start(stage, name, **attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except GeneratorExit:
+            # A generator closed early inside the block, which is not a failure
+            self.end(span)
+            raise
+        except BaseException as e:
+            # Cancellation and interrupts end the span too, as errors
+            self.end(span, e)
+            raise
+        else:
+            self.end(span)
+        finally:
+            current_span.reset(token)
+
+    def stats(self) -> Dict[str, dict]:
+        """Histogram per stage ("vena") and per stage and name ("vena.search_members")"""
+        with self.lock:
+            return {key: histogram.to_dict() for key, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        self.sinks = []
+
+# Global instance - initialized lazily from the environment on the first span
+tracer = None
+tracer_lock = threading.Lock()
+
+def get_trace_file() -> Optional[str]:
+    return os.environ.get("TRACE_FILE") or None
+
+def is_otel_enabled() -> bool:
+    return os.environ.get("TRACE_OTEL", "0").lower() in ("1", "true", "yes")
+
+def get_tracer() -> Tracer:
+    global tracer
+    if tracer is None:
+        with tracer_lock:
+            if tracer is None:
+                sinks = []
+                if get_trace_file():
+                    sinks.append(JsonlSink(get_trace_file()))
+                if is_otel_enabled():
+                    try:
+                        sinks.append(OpenTelemetrySink())
+                    except ImportError:
+                        print("TRACE_OTEL is set but opentelemetry-api is not installed, spans are not exported to it")
+                tracer = Tracer(sinks)
+    return tracer
+
+def close_tracer():
+    global tracer
+    if tracer is not None:
+        tracer.close()
+        tracer = None
+
+def span(stage: str, name: str, **attributes):
+    """Context manager timing a block as a span of the given stage ("turn", "llm", "tool", "vena")"""
+    return get_tracer().span(stage, name, **attributes)
+
+def annotate(**attributes):
+    """Set attributes on the current span, if any"""
+    current = current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+def count(**counts):
+    """Add to counters of the current span, if any"""
+    current = current_span.get()
+    if current is not None:
+        current.add(**counts)
+
+def record_result(current: Span, result: Any):
+    if isinstance(result, str):
+        current.add(result_bytes=len(result.encode()))
+    elif isinstance(result, bytes):
+        current.add(result_bytes=len(result))
+
+def traced(stage: str, name: str = None) -> Callable:
+    """Decorator running a sync or async function inside a span; the signature is preserved for tool schemas"""
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__name__
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, span_name) as current:
+                    result = await function(*args, **kwargs)
+                    record_result(current, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, span_name) as current:
+                result = function(*args, **kwargs)
+                record_result(current, result)
+                return result
+        return wrapper
+    return decorator
+
+def record_usage(current: Span, usage: Any):
+    """Add token counts from an OpenAI usage object or dict to a span"""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    current.add(prompt_tokens=get("prompt_tokens") or 0, completion_tokens=get("completion_tokens") or 0)
+
+class TracedStream:
+    """Passes a streamed completion through, ending its span when the stream is consumed or closed"""
+
+    def __init__(self, stream: Any, tracer: Tracer, current: Span):
+        self.stream = stream
+        self.tracer = tracer
+        self.span = current
+        self.finished = False
+
+    def __getattr__(self, name: str):
+        return getattr(self.stream, name)
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        error = None
+        try:
+            async for chunk in self.stream:
+                if "first_token_ms" not in self.span.attributes:
+                    self.span.set(first_token_ms=round(self.span.elapsed_ms(), 3))
+                record_usage(self.span, getattr(chunk, "usage", None))
+                yield chunk
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.finish(error)
+
+    def finish(self, error: BaseException = None):
+        if not self.finished:
+            self.finished = True
+            self.tracer.end(self.span, error)
+
+    async def __aenter__(self):
+        await self.stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.finish()
+        return await self.stream.__aexit__(*exc)
+
+    async def close(self):
+        self.finish()
+        await self.stream.close()
+
+def instrument_openai(client: Any, name: str = "chat_completion") -> Any:
+    """Trace every chat completion made through an async OpenAI client, returns the client"""
+    completions = client.chat.completions
+    create = completions.create
+    if getattr(create, "traced", False):
+        return client
+
+    @functools.wraps(create)
+    async def traced_create(*args, **kwargs):
+        tracer = get_tracer()
+        current = tracer.start(
+            "llm",
+            name,
+            model=str(kwargs.get("model")),
+            stream=bool(kwargs.get("stream")),
+            structured="response_format" in kwargs,
+            tools=len(kwargs.get("tools") or []),
+            request_bytes=len(json.dumps(kwargs.get("messages"), default=str).encode())
+        )
+        try:
+            response = await create(*args, **kwargs)
+        except BaseException as e:
+            tracer.end(current, e)
+            raise
+        if kwargs.get("stream"):
+            return TracedStream(response, tracer, current)
+        record_usage(current, getattr(response, "usage", None))
+        tracer.end(current)
+        return response
+
+    traced_create.traced = True
+    completions.create = traced_create
+    return client
+
+def get_trace_stats() -> Dict[str, dict]:
+    return get_tracer().stats()
+
+def format_stats(stats: Dict[str, dict]) -> str:
+    lines = [f"{'span':<40} {'count':>7} {'errors':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>9}  totals"]
+    for key, histogram in stats.items():
+        totals = ", ".join(f"{name}={value:g}" for name, value in sorted(histogram["totals"].items()))
+        lines.append(
+            f"{key:<40} {histogram['count']:>7} {histogram['errors']:>6} {histogram['mean_ms']:>9.1f} "
+            f"{histogram['p50_ms']:>8.1f} {histogram['p95_ms']:>8.1f} {histogram['p99_ms']:>8.1f} {histogram['max_ms']:>9.1f}  {totals}"
+        )
+    return "\n".join(lines)
+
+def print_trace_stats():
+    """Print the per-stage table, e.g. on server shutdown"""
+    stats = get_trace_stats()
+    if stats:
+        print(format_stats(stats))
+
+def read_trace_file(path: str) -> Dict[str, dict]:
+    """Rebuild the per-stage histograms from spans exported to a JSON lines file"""
+    histograms: Dict[str, Histogram] = {}
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for key in (record["stage"], record["name"]):
+                histograms.setdefault(key, Histogram()).record(record["duration_ms"], record["status"] == "ERROR", record["attributes"])
+    return {key: histogram.to_dict() for key, histogram in sorted(histograms.items())}
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency of spans exported to a JSON lines file")
+    parser.add_argument("path", nargs="?", default=get_trace_file(), help="Trace file (default: $TRACE_FILE)")
+    parser.add_argument("--json", action="store_true", help="Print the histograms as JSON")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no trace file given and TRACE_FILE is not set")
+
+    stats = read_trace_file(args.path)
+    print(json.dumps(stats, indent=2) if args.json else format_stats(stats))
+
+if __name__ == "__main__":
+    main()
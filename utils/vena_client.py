@@ -2,7 +2,26 @@ import requests
 import base64
 import os
 import pandas as pd
-import io
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from .cache import metadata_cache
+from .columnar import ColumnarWriter
+from .hierarchy_index import (
+    HierarchyIndex,
+    HIERARCHY_COLUMNS,
+    HIERARCHY_SCHEMA,
+    DIMENSION_COLUMN,
+    MEMBER_ID_COLUMN,
+    PARENT_ID_COLUMN,
+    PARENT_NAME_COLUMN,
+    get_hierarchy_index,
+    register_hierarchy_index
+)
+from .member_search import get_search_index, get_search_limit, has_attribute, learn_attributes, words
+from .mql import Attribute, MQLError, parse_mql, validate_locally, walk
+from .mql_evaluator import resolve_mql, summarize_selection
+from .single_flight import vena_calls
+from .tracing import annotate, count, traced
 
 def get_header(venaUser, venaKey):
     token = base64.b64encode(f'{venaUser}:{venaKey}'.encode()).decode()
@@ -10,17 +29,31 @@ def get_header(venaUser, venaKey):
         'Authorization': f'VenaBasic {token}',
         'Content-Type': 'application/json'
     }
-    
-def list_models() -> str:
-    header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.get(
-        f'{os.environ.get("VENA_ENDPOINT")}/api/models/withDimensions',
-        headers=header
+
+def get_pool_size() -> int:
+    return int(os.environ.get("VENA_MAX_CONNECTIONS", 20))
+
+def record_response(response, *args, **kwargs):
+    """Response hook adding the status and payload sizes of each Vena request to the current trace span"""
+    body = response.request.body
+    annotate(
+        status=response.status_code,
+        request_bytes=len(body) if body else 0,
+        # Streamed bodies are not read here, their size is only known from the header
+        response_bytes=int(response.headers.get("Content-Length") or 0) if kwargs.get("stream") else len(response.content)
     )
-    if response.status_code != 200:
-        raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
-    
-    data = response.json()
+
+# Shared keep-alive session so sync callers reuse TCP/TLS connections instead of opening one per call
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=get_pool_size()))
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=get_pool_size()))
+session.hooks["response"].append(record_response)
+
+# Bulk expansion limits: levels below each member, and members returned per call
+MAX_SUBTREE_DEPTH = 5
+MAX_SUBTREE_MEMBERS = 1000
+
+def to_models(data) -> list:
     return [
         {
             "id": model['id'],
@@ -30,16 +63,7 @@ def list_models() -> str:
         for model in data
     ]
 
-def get_model(id: int, model_name: str) -> str:
-    header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.get(
-        f'{os.environ.get("VENA_ENDPOINT")}/api/models/{id}/dimensions?incMembers=false&incAttributes=false',
-        headers=header
-    )
-    if response.status_code != 200:
-        raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
-    
-    data = response.json()
+def to_model(id: int, model_name: str, data) -> dict:
     dimensions = [
         {
             "id": dimension['id'],
@@ -54,89 +78,341 @@ def get_model(id: int, model_name: str) -> str:
         "name": model_name,
         "dimensions": dimensions
     }
-    
+
+def to_member(member) -> dict:
+    return {
+        "id": member['id'],
+        "name": member['name'],
+        "alias": member['alias'],
+        "numChildren": member['numChildren']
+    }
+
+def search_payload(model_id: int, dimension_id: int, query: str) -> list:
+    return [
+        {"name":query,"alias":query,"dimensionId":dimension_id,"modelId":model_id,"limit":500,"type":"MEMBER"}
+    ] + attribute_payload(model_id, dimension_id, query)
+
+def attribute_payload(model_id: int, dimension_id: int, query: str) -> list:
+    return [{"name":query,"dimensionId":dimension_id,"modelId":model_id,"limit":get_search_limit(),"type":"ATTRIBUTE"}]
+
+def known_attributes(dimension, query: str) -> list:
+    """Attributes the dimension's search index already knows that match the query"""
+    return get_search_index(dimension).search_attributes(words(query), get_search_limit())
+
+def attributes_key(model_id: int, dimension, query: str) -> tuple:
+    return ("attributes", int(model_id), int(dimension.id), query)
+
+def remember_attributes(key: tuple, dimension, results: list) -> list:
+    """Learn the memberships Vena's suggestions list and cache the suggestions, capped at the search limit"""
+    learn_attributes(dimension, results)
+    attributes = [result for result in results if isinstance(result, dict) and result.get("type") == "ATTRIBUTE"][:get_search_limit()]
+    metadata_cache.set(key, attributes)
+    return attributes
+
+HIERARCHY_EXPORT = {
+    "destination": "ToCSV",
+    "exportMemberIds": True,
+    "queryString": None
+}
+
+# Compact dtypes for the hierarchy export: repeated names as categoricals, ids as nullable ints
+HIERARCHY_DTYPES = {
+    DIMENSION_COLUMN: "category",
+    MEMBER_ID_COLUMN: "Int64",
+    PARENT_ID_COLUMN: "Int64",
+    PARENT_NAME_COLUMN: "category"
+}
+
+def get_chunk_size() -> int:
+    return int(os.environ.get("VENA_HIERARCHY_CHUNK_SIZE", 100000))
+
+def read_hierarchy_chunks(source, chunksize: int = None):
+    """Parse a hierarchy CSV file-like object incrementally into DataFrame chunks"""
+    with pd.read_csv(
+        source,
+        usecols=lambda column: column in HIERARCHY_COLUMNS,
+        dtype=HIERARCHY_DTYPES,
+        chunksize=chunksize or get_chunk_size()
+    ) as reader:
+        yield from reader
+
+@traced("vena")
+def list_models() -> str:
+    cached = metadata_cache.get(("models",))
+    if cached is not None:
+        return cached
+
+    # Sessions starting together all miss the cache at once; they share one request
+    return vena_calls.do(("models",), fetch_models)
+
+def fetch_models() -> list:
+    header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
+    response = session.get(
+        f'{os.environ.get("VENA_ENDPOINT")}/api/models/withDimensions',
+        headers=header
+    )
+    if response.status_code != 200:
+        raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+    models = to_models(response.json())
+    metadata_cache.set(("models",), models)
+    return models
+
+@traced("vena")
+def get_models_metadata() -> list:
+    """Raw model entries from /api/models/withDimensions, uncached, for change detection"""
+    header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
+    response = session.get(
+        f'{os.environ.get("VENA_ENDPOINT")}/api/models/withDimensions',
+        headers=header
+    )
+    if response.status_code != 200:
+        raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+    return response.json()
+
+@traced("vena")
+def get_model(id: int, model_name: str) -> str:
+    cached = metadata_cache.get(("model", int(id)))
+    if cached is not None:
+        return {**cached, "name": model_name}
+
+    return {**vena_calls.do(("model", int(id)), fetch_model, id, model_name), "name": model_name}
+
+def fetch_model(id: int, model_name: str) -> dict:
+    header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
+    response = session.get(
+        f'{os.environ.get("VENA_ENDPOINT")}/api/models/{id}/dimensions?incMembers=false&incAttributes=false',
+        headers=header
+    )
+    if response.status_code != 200:
+        raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
+
+    model = to_model(id, model_name, response.json())
+    metadata_cache.set(("model", int(id)), model)
+    return model
+
+@traced("vena")
 def get_children_of_member(model_id: int, dimension_number: int, member_id: str) -> str:
+    index = get_hierarchy_index(model_id)
+    if index is not None:
+        children = index.get_children(dimension_number, member_id)
+        if children is not None:
+            count(index_hits=1)
+            return children
+
+    key = ("children", int(model_id), int(dimension_number), str(member_id))
+    cached = metadata_cache.get(key)
+    if cached is not None:
+        return cached
+
+    return vena_calls.do(key, fetch_children_of_member, model_id, dimension_number, member_id)
+
+def fetch_children_of_member(model_id: int, dimension_number: int, member_id: str) -> list:
     url = f'{os.environ.get("VENA_ENDPOINT")}/api/models/{model_id}/dimensions/{dimension_number}/members/{member_id}/children'
     header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.get(
+    response = session.get(
         url,
         headers=header
     )
     if response.status_code != 200:
         raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
-    
-    data = response.json()
-    return [
-        {
-            "id": member['id'],
-            "name": member['name'],
-            "alias": member['alias'],
-            "numChildren": member['numChildren']
-        }
-        for member in data
-    ]
-    
+
+    children = [to_member(member) for member in response.json()]
+    metadata_cache.set(("children", int(model_id), int(dimension_number), str(member_id)), children)
+    return children
+
+def subtree_level(parents: list, results: list, depth: int, subtree: list) -> list:
+    """Append one level of fetched children to a flat subtree, returns the members to expand next"""
+    expand = []
+    for parent, children in zip(parents, results):
+        if isinstance(children, Exception):
+            subtree.append({"parent": parent, "depth": depth, "error": str(children)})
+            continue
+        for child in children:
+            if len(subtree) >= MAX_SUBTREE_MEMBERS:
+                subtree.append({"truncated": True})
+                return []
+            subtree.append({**child, "parent": parent, "depth": depth})
+            if child.get("numChildren"):
+                expand.append(child["id"])
+    return expand
+
+@traced("vena")
+def get_children_of_members(model_id: int, dimension_number: int, member_ids: list, depth: int = 1) -> list:
+    """Children of many members at once, down to depth levels
+
+    Returns a flat, level-ordered list of members, each with its parent id and depth, so one
+    call replaces a get_children_of_member round per node. Members are served from the local
+    index when loaded, otherwise fetched concurrently over the shared session.
+    """
+    depth = max(1, min(int(depth or 1), MAX_SUBTREE_DEPTH))
+    parents = [str(member_id) for member_id in dict.fromkeys(member_ids)]
+    subtree = []
+
+    def fetch(member_id):
+        try:
+            return get_children_of_member(model_id, dimension_number, member_id)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(get_pool_size(), max(1, len(parents)))) as executor:
+        for level in range(1, depth + 1):
+            if not parents:
+                break
+            parents = subtree_level(parents, list(executor.map(fetch, parents)), level, subtree)
+    return subtree
+
+@traced("vena")
 def get_member(model_id: int, dimension_number: int, member_id: str) -> str:
+    key = ("member", int(model_id), int(dimension_number), str(member_id))
+    return vena_calls.do(key, fetch_member, model_id, dimension_number, member_id)
+
+def fetch_member(model_id: int, dimension_number: int, member_id: str) -> dict:
     url = f'{os.environ.get("VENA_ENDPOINT")}/api/models/{model_id}/dimensions/{dimension_number}/members/{member_id}'
     header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.get(
+    response = session.get(
         url,
         headers=header
     )
     if response.status_code != 200:
         raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
-    
-    member = response.json()
-    return {
-        "id": member['id'],
-        "name": member['name'],
-        "alias": member['alias'],
-        "numChildren": member['numChildren']
-    }
-    
+
+    return to_member(response.json())
+
+@traced("vena")
 def search_members(model_id: int, dimension_id: int, query: str) -> str:
+    index = get_hierarchy_index(model_id)
+    dimension = index.dimension_by_id(dimension_id) if index is not None else None
+    if dimension is not None:
+        count(index_hits=1)
+        search_index = get_search_index(dimension)
+        if search_index.complete_attributes:
+            return search_index.search(query, get_search_limit())
+        # The export has no attributes, so those come from Vena, cached per query
+        return search_index.search(query, get_search_limit(), attributes=False) + search_attributes(model_id, dimension, query)
+
+    key = ("search", int(model_id), int(dimension_id), query)
+    return vena_calls.do(key, fetch_search_results, model_id, dimension_id, query)
+
+def search_attributes(model_id: int, dimension, query: str) -> list:
+    """ATTRIBUTE suggestions for a locally indexed dimension: matching attributes it already knows, else Vena's"""
+    known = known_attributes(dimension, query)
+    if known:
+        return known
+    key = attributes_key(model_id, dimension, query)
+    cached = metadata_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        results = vena_calls.do(key, fetch_search_results, model_id, dimension.id, query, attribute_payload)
+    except Exception as e:
+        # The local member results still stand
+        annotate(attribute_error=str(e))
+        return []
+    return remember_attributes(key, dimension, results)
+
+def fetch_search_results(model_id: int, dimension_id: int, query: str, payload=search_payload) -> list:
     header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.post(
+    response = session.post(
         f'{os.environ.get("VENA_ENDPOINT")}/api/search/suggestions',
         headers=header,
-        json=[
-            {"name":query,"alias":query,"dimensionId":dimension_id,"modelId":model_id,"limit":500,"type":"MEMBER"},
-            {"name":query,"dimensionId":dimension_id,"modelId":model_id,"limit":500,"type":"ATTRIBUTE"}
-        ]
+        json=payload(model_id, dimension_id, query)
     )
     if response.status_code != 200:
         raise Exception(f"Error: Received status code {response.status_code}. Message: {response.text}")
-    
+
     return response.json()
 
+def validate_mql_locally(model_id: int, mql: str):
+    """Catch syntax errors and unknown dimensions/members before any network call"""
+    errors = validate_locally(mql, get_hierarchy_index(model_id))
+    if errors:
+        raise Exception("MQL is NOT VALID due to: " + "; ".join(str(error) for error in errors) + ".  Try searching for members again then generating the MQL.")
+
+@traced("vena")
 def validate_mql(model_id: int, mql: str) -> str:
+    validate_mql_locally(model_id, mql)
+
     header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.post(
+    response = session.post(
         f'{os.environ.get("VENA_ENDPOINT")}/api/models/{model_id}/mql/validate',
         headers=header,
         data=mql
     )
-    
+
     if response.status_code == 204 or response.status_code == 200:
         return "MQL is valid"
     else:
         raise Exception("MQL is NOT VALID due to: " + response.text + ".  Try searching for members again then generating the MQL.")
-    
-def get_hierarchy(model_id: int) -> pd.DataFrame:
+
+@traced("vena")
+def evaluate_mql(model_id: int, mql: str) -> dict:
+    """Resolve MQL against the local hierarchy index and report how many members it selects per dimension"""
+    index = get_hierarchy_index(model_id)
+    if index is None:
+        raise Exception(f"No hierarchy snapshot is loaded for model {model_id}, the MQL cannot be evaluated locally.")
+    load_attributes(model_id, index, mql)
+    return summarize_selection(resolve_mql(mql, index))
+
+def load_attributes(model_id: int, index: HierarchyIndex, mql: str):
+    """Ask Vena for the members of attributes the MQL uses that the local index does not know yet"""
+    try:
+        query = parse_mql(mql)
+    except MQLError:
+        # resolve_mql reports it with its position
+        return
+    for clause in query.clauses:
+        dimension = index.dimension_by_name(clause.dimension)
+        if dimension is None or get_search_index(dimension).complete_attributes:
+            continue
+        for node in walk(clause.expression):
+            if isinstance(node, Attribute) and not has_attribute(dimension, node.name):
+                search_attributes(model_id, dimension, node.name)
+
+def iter_hierarchy(model_id: int, chunksize: int = None):
+    """Stream the hierarchy export, yielding DataFrame chunks without buffering the whole CSV"""
     header = get_header(os.environ.get("VENA_USER"), os.environ.get("VENA_KEY"))
-    response = requests.post(
+    with session.post(
         f'{os.environ.get("VENA_ENDPOINT")}/api/models/{model_id}/etl/query/hierarchies',
         headers=header,
-        json={
-            "destination": "ToCSV",
-            "exportMemberIds": True,
-            "queryString": None
-        },
+        json=HIERARCHY_EXPORT,
         stream=True
-    )
-    if response.status_code == 204 or response.status_code == 200:
-        content = response.content
-        return pd.read_csv(io.BytesIO(content))
-    else:
-        raise Exception("Failed to retrieve hierarchy CSV due to: " + response.text)
-    
+    ) as response:
+        if response.status_code == 204 or response.status_code == 200:
+            response.raw.decode_content = True
+            yield from read_hierarchy_chunks(response.raw, chunksize)
+        else:
+            raise Exception("Failed to retrieve hierarchy CSV due to: " + response.text)
+
+def concat_hierarchy(frames) -> pd.DataFrame:
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame(columns=HIERARCHY_COLUMNS)
+    # Chunks carry their own categories, re-categorize after concatenating
+    df = pd.concat(frames, ignore_index=True)
+    return df.astype({column: "category" for column in (DIMENSION_COLUMN, PARENT_NAME_COLUMN) if column in df.columns})
+
+def write_hierarchy_columns(frames, directory: str) -> int:
+    with ColumnarWriter(directory, HIERARCHY_SCHEMA) as writer:
+        for chunk in frames:
+            writer.append_frame(chunk)
+    return writer.rows
+
+@traced("vena")
+def get_hierarchy(model_id: int) -> pd.DataFrame:
+    return concat_hierarchy(iter_hierarchy(model_id))
+
+@traced("vena")
+def export_hierarchy(model_id: int, directory: str, chunksize: int = None) -> int:
+    """Stream the hierarchy export straight into columnar files under directory, returns the row count"""
+    return write_hierarchy_columns(iter_hierarchy(model_id, chunksize), directory)
+
+
+@traced("vena")
+def load_hierarchy_index(model_id: int) -> HierarchyIndex:
+    """Export the model's hierarchy and register a local index that serves member lookups"""
+    model = get_model(model_id, "")
+    index = HierarchyIndex.from_frames(model_id, model["dimensions"], iter_hierarchy(model_id))
+    register_hierarchy_index(index)
+    return index